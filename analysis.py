@@ -0,0 +1,679 @@
+import math
+import os
+import threading
+from collections import Counter, OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from column_profile import MAX_VALUES, QUANTILES, TOP_K
+import file_tables
+from data import get_file_storage_shared, get_file_table_shared, open_file_stream
+
+# -------------------------------
+# Analiza plików większych niż pamięć (przetwarzanie kawałkami)
+# -------------------------------
+# Pliki CSV większe niż próg analizujemy kawałkami zamiast wczytywać w całości
+CHUNKED_THRESHOLD_BYTES = int(os.environ.get("CHUNKED_THRESHOLD_BYTES", str(256 * 1024 * 1024)))
+CHUNK_ROWS = int(os.environ.get("CHUNK_ROWS", "200000"))
+# Kolejności wierszy po sortowaniu podglądu całych plików w pamięci (cache)
+SORT_CACHE_MAX_BYTES = int(os.environ.get("SORT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Podgląd dużego pliku bez tabeli SQL: strony do tylu wierszy (offset + limit)
+# sortujemy kawałkami w pamięci, dalsze szukamy po kluczu sortowania
+PREVIEW_SORT_ROWS = 10_000
+# Wyszukiwanie klucza: próbka kluczy, z której bierzemy punkty podziału
+SEEK_SAMPLE = 4096
+SEEK_PIVOTS = 64
+# Dokładne kwantyle: zawężamy przedział histogramem, aż zostanie w nim
+# najwyżej tyle wartości, ile możemy bezpiecznie zebrać i posortować
+QUANTILE_BINS = 4096
+MAX_CANDIDATES = 1_000_000
+DESCRIBE_PERCENTILES = (0.25, 0.5, 0.75)
+# Liczności wartości kolumny nieliczbowej w przebiegu kawałkami trzymamy dla
+# najwyżej tylu różnych wartości (pamięć nie rośnie z np. kolumną identyfikatorów)
+SCAN_MAX_DISTINCT = int(os.environ.get("SCAN_MAX_DISTINCT", "100000"))
+# Zdarzenie anulowania zadania w procesie roboczym (analysis_pool); przebiegi
+# kawałkami sprawdzają je przed każdym kawałkiem
+cancel_event = None
+
+
+class Interrupted(Exception):
+    pass
+
+
+def _check_cancelled():
+    if cancel_event is not None and cancel_event.is_set():
+        raise Interrupted("Zadanie anulowane")
+
+
+class ChunkedSource:
+    def __init__(self, file_id, user_id, chunk_rows=CHUNK_ROWS):
+        storage = get_file_storage_shared(file_id, user_id)
+        if storage is None:
+            raise PermissionError("Brak dostępu do pliku")
+        self.file_id = file_id
+        self.user_id = user_id
+        self.size, self.has_columnar = storage
+        self.chunk_rows = chunk_rows
+        # Tabela SQL z wierszami pliku: filtry i agregacje liczy wtedy baza,
+        # a do Pythona trafia tylko wynik (bez niej - przebieg kawałkami w pandas)
+        self.table = get_file_table_shared(file_id, user_id)
+
+    def chunks(self, columns=None):
+        # Kopia kolumnowa ma stały schemat i pozwala czytać tylko wybrane
+        # kolumny; CSV czytamy tylko dla plików bez kopii
+        if self.has_columnar:
+            with open_file_stream(self.file_id, self.user_id, columnar=True) as stream:
+                parquet = pq.ParquetFile(stream)
+                for batch in parquet.iter_batches(batch_size=self.chunk_rows, columns=columns):
+                    _check_cancelled()
+                    yield batch.to_pandas()
+        else:
+            with open_file_stream(self.file_id, self.user_id) as stream:
+                for frame in pd.read_csv(stream, chunksize=self.chunk_rows, usecols=columns):
+                    _check_cancelled()
+                    yield frame
+
+    def head(self, rows):
+        chunks = self.chunks()
+        try:
+            return next(chunks).head(rows)
+        except StopIteration:
+            return pd.DataFrame()
+        finally:
+            chunks.close()
+
+
+def is_large(size):
+    return size > CHUNKED_THRESHOLD_BYTES
+
+
+def _frames(source, where=None, columns=None):
+    # Ujednolica DataFrame i ChunkedSource: ciąg (przefiltrowanych) ramek
+    if columns is not None and where is not None:
+        columns = list(dict.fromkeys([*columns, *where.columns]))
+    frames = [source] if isinstance(source, pd.DataFrame) else source.chunks(columns)
+    for frame in frames:
+        yield frame[where(frame)] if where is not None else frame
+
+
+# -------------------------------
+# Statystyki zbierane w jednym przebiegu
+# -------------------------------
+class _Moments:
+    # Liczność, średnia i suma kwadratów odchyleń łączone między kawałkami
+    # (wzór Chana), żeby odchylenie standardowe było stabilne numerycznie
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values):
+        n = len(values)
+        if n == 0:
+            return
+        mean = values.mean()
+        m2 = ((values - mean) ** 2).sum()
+        delta = mean - self.mean
+        total_n = self.count + n
+        self.mean += delta * n / total_n
+        self.m2 += m2 + delta ** 2 * self.count * n / total_n
+        self.count = total_n
+        self.total += values.sum()
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+
+    def std(self):
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else math.nan
+
+
+class _BoundedCounts:
+    # Liczności wartości z ograniczoną pamięcią. Powyżej limit różnych wartości
+    # zostawiamy połowę najczęstszych (jak w algorytmie Misry-Griesa): liczby
+    # różnych wartości już nie znamy, a liczności mogą być zaniżone najwyżej o error.
+    def __init__(self, limit=None):
+        self.limit = limit if limit is not None else SCAN_MAX_DISTINCT
+        self.counts = Counter()
+        # Pierwsze wystąpienia (opcje filtra), najwyżej MAX_VALUES + 1
+        self.first = []
+        self._first_set = set()
+        self.truncated = False
+        self.error = 0
+
+    def update(self, counts):
+        # counts: {wartość: liczność} w kolejności pierwszego wystąpienia
+        for value in counts:
+            if len(self.first) > MAX_VALUES:
+                break
+            if value not in self._first_set:
+                self._first_set.add(value)
+                self.first.append(value)
+        self.counts.update(counts)
+        if len(self.counts) > self.limit:
+            ordered = self.counts.most_common()
+            keep = self.limit // 2
+            self.error += ordered[keep][1]
+            self.counts = Counter(dict(ordered[:keep]))
+            self.truncated = True
+
+    def distinct(self):
+        return None if self.truncated else len(self.counts)
+
+    def ordered(self):
+        # Malejąco po liczności; remisy w kolejności pierwszego wystąpienia (bez przycięcia)
+        return _sorted_counts(self.counts)
+
+
+def _numeric_values(frame, col):
+    values = frame[col].to_numpy(dtype="float64", na_value=np.nan)
+    return values[~np.isnan(values)]
+
+
+def _scan(source, where=None):
+    # Jeden przebieg: rodzaje kolumn (z pierwszego kawałka), momenty kolumn
+    # liczbowych i liczności wartości kolumn pozostałych (_BoundedCounts)
+    kinds, moments, counts, nulls, rows = None, {}, {}, {}, 0
+    for frame in _frames(source, where):
+        if kinds is None:
+            numeric = set(frame.select_dtypes(include='number').columns)
+            objects = set(frame.select_dtypes(include='object').columns)
+            kinds = {col: "number" if col in numeric else "object" if col in objects else "other"
+                     for col in frame.columns}
+            moments = {col: _Moments() for col, kind in kinds.items() if kind == "number"}
+            counts = {col: _BoundedCounts() for col, kind in kinds.items() if kind != "number"}
+            nulls = Counter()
+        rows += len(frame)
+        for col in frame.columns:
+            nulls[col] += int(frame[col].isna().sum())
+        for col, acc in moments.items():
+            acc.update(_numeric_values(frame, col))
+        for col, counter in counts.items():
+            # sort=False zachowuje kolejność pierwszego wystąpienia, jak value_counts()
+            counter.update(frame[col].value_counts(sort=False).to_dict())
+    return {"kinds": kinds or {}, "moments": moments, "counts": counts, "nulls": nulls, "rows": rows}
+
+
+def _sorted_counts(counter):
+    # Malejąco po liczności; remisy w kolejności pierwszego wystąpienia
+    return sorted(counter.items(), key=lambda item: -item[1])
+
+
+# -------------------------------
+# Dokładne kwantyle bez wczytywania całej kolumny
+# -------------------------------
+def _select_ranks(source, targets, where=None):
+    # targets: {(kolumna, ranga): (min, max, liczność)}; zwraca {(kolumna, ranga): wartość},
+    # gdzie ranga to pozycja w posortowanych (bez NaN) wartościach kolumny.
+    # Każdy przebieg dzieli przedział kandydatów na QUANTILE_BINS kubełków
+    # i przechodzi do kubełka z szukaną rangą, aż kandydatów jest na tyle
+    # mało, żeby je zebrać i posortować.
+    result = {}
+    # stan: [dolna granica, górna granica (obie włącznie), wartości poniżej, liczność w przedziale]
+    states = {}
+    for key, (lo, hi, count) in targets.items():
+        if lo == hi:
+            result[key] = lo
+        else:
+            states[key] = [lo, hi, 0, count]
+
+    while states:
+        intervals = {}
+        for (col, _), (lo, hi, _, count) in states.items():
+            intervals[(col, lo, hi)] = count
+        collect = {key: [] for key, count in intervals.items() if count <= MAX_CANDIDATES}
+        hist = {key: (np.linspace(key[1], key[2], QUANTILE_BINS + 1),
+                      np.zeros(QUANTILE_BINS, dtype="int64"),
+                      np.full(QUANTILE_BINS, np.inf),
+                      np.full(QUANTILE_BINS, -np.inf))
+                for key, count in intervals.items() if count > MAX_CANDIDATES}
+        columns = sorted({key[0] for key in intervals})
+
+        for frame in _frames(source, where, columns):
+            for col, lo, hi in intervals:
+                values = _numeric_values(frame, col)
+                values = values[(values >= lo) & (values <= hi)]
+                if (col, lo, hi) in collect:
+                    collect[(col, lo, hi)].append(values)
+                    continue
+                edges, counts, bin_min, bin_max = hist[(col, lo, hi)]
+                idx = np.clip(np.searchsorted(edges, values, side="right") - 1, 0, QUANTILE_BINS - 1)
+                counts += np.bincount(idx, minlength=QUANTILE_BINS)
+                np.minimum.at(bin_min, idx, values)
+                np.maximum.at(bin_max, idx, values)
+
+        for key, (lo, hi, below, count) in list(states.items()):
+            interval = (key[0], lo, hi)
+            if interval in collect:
+                values = np.sort(np.concatenate(collect[interval]))
+                result[key] = values[key[1] - below]
+                del states[key]
+                continue
+            _, counts, bin_min, bin_max = hist[interval]
+            cumulative = np.cumsum(counts)
+            i = int(np.searchsorted(cumulative, key[1] - below, side="right"))
+            new_below = below + (int(cumulative[i - 1]) if i > 0 else 0)
+            # Przedział zawężamy do faktycznych wartości w kubełku, więc
+            # zawiera dokładnie te same wartości co kubełek
+            if bin_min[i] == bin_max[i]:
+                result[key] = bin_min[i]
+                del states[key]
+            else:
+                states[key] = [bin_min[i], bin_max[i], new_below, int(counts[i])]
+    return result
+
+
+def _lerp(a, b, t):
+    # Interpolacja liniowa w wariancie numpy (np.quantile, method="linear")
+    diff = b - a
+    return b - diff * (1 - t) if t >= 0.5 else a + diff * t
+
+
+def _quantiles(source, moments, quantiles, where=None):
+    # {kolumna: {q: wartość}} - te same liczby co Series.quantile(q)
+    targets, positions = {}, {}
+    for col, acc in moments.items():
+        n = acc.count
+        for q in quantiles:
+            if n == 0:
+                continue
+            h = (n - 1) * q
+            k = math.floor(h)
+            positions[(col, q)] = (k, min(k + 1, n - 1), h - k)
+            for rank in (k, min(k + 1, n - 1)):
+                targets[(col, rank)] = (acc.min, acc.max, n)
+    values = _select_ranks(source, targets, where)
+    result = {}
+    for col in moments:
+        result[col] = {}
+        for q in quantiles:
+            if (col, q) not in positions:
+                result[col][q] = math.nan
+                continue
+            k, k1, t = positions[(col, q)]
+            result[col][q] = float(_lerp(values[(col, k)], values[(col, k1)], t))
+    return result
+
+
+# -------------------------------
+# Operacje analizy (DataFrame albo ChunkedSource)
+# -------------------------------
+def _describe_from_scan(source, scan, where=None):
+    moments = scan["moments"]
+    if moments:
+        quantiles = _quantiles(source, moments, DESCRIBE_PERCENTILES, where)
+        index = ["count", "mean", "std", "min"] + [f"{int(q * 100)}%" for q in DESCRIBE_PERCENTILES] + ["max"]
+        data = {}
+        for col, acc in moments.items():
+            empty = acc.count == 0
+            data[col] = [float(acc.count),
+                         acc.total / acc.count if not empty else math.nan,
+                         acc.std(),
+                         acc.min if not empty else math.nan,
+                         *[quantiles[col][q] for q in DESCRIBE_PERCENTILES],
+                         acc.max if not empty else math.nan]
+        return pd.DataFrame(data, index=index, dtype="float64")
+
+    # Brak kolumn liczbowych: describe() opisuje kolumny tekstowe
+    data = {}
+    for col, counter in scan["counts"].items():
+        ordered = counter.ordered()
+        count = scan["rows"] - scan["nulls"][col]
+        distinct = counter.distinct()
+        data[col] = [count, distinct if distinct is not None else np.nan,
+                     ordered[0][0] if ordered else np.nan, ordered[0][1] if ordered else np.nan]
+    return pd.DataFrame(data, index=["count", "unique", "top", "freq"], dtype="object")
+
+
+def describe(source, where=None):
+    if isinstance(source, pd.DataFrame):
+        frame = source[where(source)] if where is not None else source
+        return frame.describe()
+    return _describe_from_scan(source, _scan(source, where), where)
+
+
+def _category_counts(values):
+    # value_counts() dla category pomija kategorie bez wystąpień i remisy
+    # układa jak dla object (kolejność pierwszego wystąpienia), a nie według kategorii
+    codes = values.cat.codes.to_numpy()
+    codes = codes[codes >= 0]
+    present, first = np.unique(codes, return_index=True)
+    counts = np.bincount(codes)[present] if len(codes) else np.zeros(0, dtype="int64")
+    order = np.lexsort((first, -counts))
+    return pd.Series(counts[order], index=pd.Index(values.cat.categories[present[order]], name=values.name),
+                     name="count", dtype="int64")
+
+
+def value_counts(source, col, where=None):
+    # Przebieg kawałkami trzyma najwyżej SCAN_MAX_DISTINCT wartości
+    # (_BoundedCounts); gdy było ich więcej, wynik ma tylko najczęstsze, a
+    # attrs["error"] to górna granica zaniżenia liczności
+    if isinstance(source, pd.DataFrame):
+        frame = source[where(source)] if where is not None else source
+        if isinstance(frame[col].dtype, pd.CategoricalDtype):
+            return _category_counts(frame[col])
+        return frame[col].value_counts()
+    if source.table is not None:
+        return file_tables.value_counts(source.table, col, where)
+    counter = _BoundedCounts()
+    for frame in _frames(source, where, [col]):
+        counter.update(frame[col].value_counts(sort=False).to_dict())
+    ordered = counter.ordered()
+    counts = pd.Series([c for _, c in ordered], index=pd.Index([v for v, _ in ordered], name=col),
+                       name="count", dtype="int64")
+    if counter.truncated:
+        counts.attrs["error"] = counter.error
+    return counts
+
+
+def histogram(source, col, bins, value_range, where=None):
+    # Zwraca (liczności, krawędzie przedziałów) jak np.histogram
+    edges = np.histogram_bin_edges([], bins=bins, range=value_range)
+    if not isinstance(source, pd.DataFrame) and source.table is not None:
+        return file_tables.histogram(source.table, col, edges, where), edges
+    counts = np.zeros(len(edges) - 1, dtype="int64")
+    for frame in _frames(source, where, [col]):
+        counts += np.histogram(_numeric_values(frame, col), bins=edges)[0]
+    return counts, edges
+
+
+def groupby_agg(source, group_col, agg_col, agg_func, where=None):
+    # Odpowiednik df.groupby(group_col)[agg_col].agg(agg_func).reset_index()
+    # dla agg_func w (sum, mean, count)
+    if isinstance(source, pd.DataFrame):
+        frame = source[where(source)] if where is not None else source
+        return frame.groupby(group_col, observed=True)[agg_col].agg(agg_func).reset_index()
+    if source.table is not None:
+        return file_tables.groupby_agg(source.table, group_col, agg_col, agg_func, where)
+    sums, counts = Counter(), Counter()
+    for frame in _frames(source, where, [group_col, agg_col]):
+        grouped = frame.groupby(group_col)[agg_col].agg(["sum", "count"])
+        sums.update(grouped["sum"].to_dict())
+        counts.update(grouped["count"].to_dict())
+    keys = list(counts)
+    try:
+        keys.sort()
+    except TypeError:
+        pass
+    if agg_func == "sum":
+        values = [sums[k] for k in keys]
+    elif agg_func == "mean":
+        values = [sums[k] / counts[k] if counts[k] else math.nan for k in keys]
+    else:
+        values = [counts[k] for k in keys]
+    return pd.DataFrame({group_col: keys, agg_col: values})
+
+
+def scatter_points(source, x, y, max_points, ranges, bins, where=None):
+    # Jeden przebieg: zbiera punkty, dopóki mieszczą się w budżecie, a przy
+    # okazji liczy histogram 2D (bins x bins) w zakresach ranges.
+    # Zwraca (punkty, None) albo - gdy punktów jest więcej - (None, (liczności, krawędzie x, krawędzie y))
+    edges_x = np.histogram_bin_edges([], bins=bins, range=ranges[0])
+    edges_y = np.histogram_bin_edges([], bins=bins, range=ranges[1])
+    counts = np.zeros((bins, bins), dtype="int64")
+    points, total = [], 0
+    for frame in _frames(source, where, [x, y]):
+        frame = frame[[x, y]].dropna()
+        total += len(frame)
+        if total <= max_points:
+            points.append(frame)
+        else:
+            points = None
+        counts += np.histogram2d(frame[x].to_numpy(dtype="float64"), frame[y].to_numpy(dtype="float64"),
+                                 bins=(edges_x, edges_y))[0].astype("int64")
+    if points is not None:
+        return (pd.concat(points, ignore_index=True) if points else pd.DataFrame(columns=[x, y])), None
+    return None, (counts, edges_x, edges_y)
+
+
+def filtered_frames(source, where=None, chunk_rows=CHUNK_ROWS):
+    # Przefiltrowane wiersze kawałkami (w pamięci jest jeden kawałek wyniku, nie cały plik)
+    if isinstance(source, pd.DataFrame):
+        frame = source[where(source)] if where is not None else source
+        if frame.empty:
+            yield frame
+        for start in range(0, len(frame), chunk_rows):
+            yield frame.iloc[start:start + chunk_rows]
+    elif source.table is not None:
+        yield from file_tables.filtered_frames(source.table, where, source.chunk_rows)
+    else:
+        yield from _frames(source, where)
+
+
+# -------------------------------
+# Podgląd: okno wierszy (strona) z sortowaniem po stronie serwera
+# -------------------------------
+class SortCache:
+    def __init__(self, max_bytes=SORT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        # (file_id, content_hash, kolumna, rosnąco) -> pozycje wierszy po sortowaniu
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            order = self._entries.get(key)
+            if order is not None:
+                self._entries.move_to_end(key)
+            return order
+
+    def put(self, key, order):
+        if order.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._entries[key] = order
+            self._bytes += order.nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+
+sort_cache = SortCache()
+
+
+def _sort_order(frame, col, ascending, cache_key):
+    # Stabilne sortowanie (remisy w kolejności pliku), puste wartości na końcu
+    key = None if cache_key is None else (*cache_key, col, ascending)
+    order = sort_cache.get(key) if key is not None else None
+    if order is None:
+        order = frame[col].reset_index(drop=True).sort_values(
+            ascending=ascending, kind="stable", na_position="last").index.to_numpy()
+        if key is not None:
+            sort_cache.put(key, order)
+    return order
+
+
+def preview_window(source, offset, limit, sort_col=None, ascending=True, cache_key=None):
+    # Wiersze [offset, offset + limit) pliku (albo po sortowaniu po sort_col);
+    # indeks to numer wiersza w pliku. cache_key=(file_id, content_hash)
+    # tylko dla ramki z całym plikiem.
+    if isinstance(source, pd.DataFrame):
+        if sort_col is None:
+            return source.iloc[offset:offset + limit]
+        return source.iloc[_sort_order(source, sort_col, ascending, cache_key)[offset:offset + limit]]
+    if source.table is not None:
+        return file_tables.window(source.table, offset, limit, sort_col, ascending)
+    if sort_col is not None and offset + limit > PREVIEW_SORT_ROWS:
+        return _seek_window(source, offset, limit, sort_col, ascending)
+    # Bez tabeli SQL: przebieg kawałkami; przy sortowaniu z każdego kawałka
+    # zostaje tylko offset + limit pierwszych wierszy
+    parts, position = [], 0
+    for frame in source.chunks():
+        frame = frame.set_axis(pd.RangeIndex(position, position + len(frame)), axis=0)
+        position += len(frame)
+        if sort_col is None:
+            if position > offset:
+                parts.append(frame.iloc[max(offset - frame.index[0], 0):])
+                if sum(len(part) for part in parts) >= limit:
+                    break
+        else:
+            parts.append(frame.sort_values(sort_col, ascending=ascending, kind="stable",
+                                           na_position="last").head(offset + limit))
+    if not parts:
+        return source.head(0)
+    frames = pd.concat(parts)
+    if sort_col is None:
+        return frames.head(limit)
+    frames = frames.sort_values(sort_col, ascending=ascending, kind="stable", na_position="last")
+    return frames.iloc[offset:offset + limit]
+
+
+# -------------------------------
+# Głębokie strony podglądu: wyszukiwanie po kluczu sortowania
+# -------------------------------
+# Kluczem wiersza jest (wartość, pozycja w pliku) - jest unikalny, a jego
+# porządek to porządek stabilnego sortowania. Klucze na granicach strony
+# znajdujemy jak kwantyle (_select_ranks), zawężając przedział punktami
+# podziału z próbki, a potem jednym przebiegiem zbieramy wiersze strony.
+# Pamięć zależy od limit i MAX_CANDIDATES, a nie od offset.
+def _key_chunks(source, col):
+    # (wartości bez pustych, ich pozycje w pliku, pozycje pustych) kawałkami
+    position = 0
+    for frame in source.chunks([col]):
+        present = frame[col].notna().to_numpy()
+        positions = np.arange(position, position + len(frame))
+        position += len(frame)
+        yield frame[col].to_numpy()[present], positions[present], positions[~present]
+
+
+def _not_after(values, positions, key, ascending):
+    # Maska kluczy (wartość, pozycja) nie dalszych w porządku sortowania niż key
+    value, position = key
+    before = values < value if ascending else values > value
+    return before | ((values == value) & (positions <= position))
+
+
+def _in_range(values, positions, lo, hi, ascending):
+    # Klucze za lo i nie dalej niż hi (None - bez granicy)
+    inside = np.ones(len(values), dtype=bool)
+    if lo is not None:
+        inside &= ~_not_after(values, positions, lo, ascending)
+    if hi is not None:
+        inside &= _not_after(values, positions, hi, ascending)
+    return inside
+
+
+def _sorted_keys(values, positions, ascending):
+    keys = pd.DataFrame({"value": values, "position": positions})
+    keys = keys.sort_values(["value", "position"], ascending=[ascending, True], kind="stable")
+    return list(zip(keys["value"], keys["position"]))
+
+
+def _sample_keys(parts):
+    # SEEK_SAMPLE kluczy o najmniejszych priorytetach z części (wartości, pozycje, priorytety)
+    values = np.concatenate([part[0] for part in parts])
+    positions = np.concatenate([part[1] for part in parts])
+    priorities = np.concatenate([part[2] for part in parts])
+    if len(priorities) > SEEK_SAMPLE:
+        keep = np.argpartition(priorities, SEEK_SAMPLE)[:SEEK_SAMPLE]
+        values, positions, priorities = values[keep], positions[keep], priorities[keep]
+    return values, positions, priorities
+
+
+def _key_at_rank(source, col, ascending, rank):
+    # Klucz wiersza na pozycji rank (0 = pierwszy) wśród niepustych po sortowaniu
+    rng = np.random.default_rng(0)
+    lo, hi, below = None, None, 0
+    while True:
+        # Przebieg 1: liczba kluczy w przedziale, próbka (najmniejsze losowe
+        # priorytety) i - gdy jest ich mało - same klucze
+        count, collected, sample = 0, [], []
+        for values, positions, _ in _key_chunks(source, col):
+            inside = _in_range(values, positions, lo, hi, ascending)
+            values, positions = values[inside], positions[inside]
+            count += len(values)
+            if collected is not None and count <= MAX_CANDIDATES:
+                collected.append((values, positions))
+            else:
+                collected = None
+            sample = [_sample_keys(sample + [(values, positions, rng.random(len(values)))])]
+        if collected is not None:
+            keys = _sorted_keys(np.concatenate([v for v, _ in collected]),
+                                np.concatenate([p for _, p in collected]), ascending)
+            return keys[rank - below]
+        # Przebieg 2: ile kluczy przedziału nie jest dalej niż kolejne punkty podziału
+        sample = _sorted_keys(*sample[0][:2], ascending)
+        pivots = [sample[i] for i in np.linspace(0, len(sample) - 1, min(SEEK_PIVOTS, len(sample))).astype(int)]
+        counts = np.zeros(len(pivots), dtype="int64")
+        for values, positions, _ in _key_chunks(source, col):
+            inside = _in_range(values, positions, lo, hi, ascending)
+            values, positions = values[inside], positions[inside]
+            for i, pivot in enumerate(pivots):
+                counts[i] += np.count_nonzero(_not_after(values, positions, pivot, ascending))
+        i = int(np.searchsorted(counts, rank - below, side="right"))
+        if i < len(pivots):
+            hi = pivots[i]
+        if i > 0:
+            lo = pivots[i - 1]
+            below += int(counts[i - 1])
+
+
+def _seek_window(source, offset, limit, sort_col, ascending):
+    # Jak preview_window dla ChunkedSource, z pamięcią niezależną od offset
+    count = sum(len(values) for values, _, _ in _key_chunks(source, sort_col))
+    end = offset + limit
+    if offset < count:
+        first = _key_at_rank(source, sort_col, ascending, offset)
+        last = _key_at_rank(source, sort_col, ascending, min(end, count) - 1)
+    # Puste wartości są na końcu, w kolejności pliku
+    nulls_from, nulls_to = max(offset - count, 0), max(end - count, 0)
+    parts, nulls_seen, position = [], 0, 0
+    for frame in source.chunks():
+        frame = frame.set_axis(pd.RangeIndex(position, position + len(frame)), axis=0)
+        position += len(frame)
+        present = frame[sort_col].notna().to_numpy()
+        keep = np.zeros(len(frame), dtype=bool)
+        if offset < count:
+            values, positions = frame[sort_col].to_numpy()[present], frame.index.to_numpy()[present]
+            # Klucze od first do last włącznie
+            keep[present] = _in_range(values, positions, first, last, ascending) | \
+                ((values == first[0]) & (positions == first[1]))
+        null_rows = np.flatnonzero(~present)
+        ranks = nulls_seen + np.arange(len(null_rows))
+        keep[null_rows[(ranks >= nulls_from) & (ranks < nulls_to)]] = True
+        nulls_seen += len(null_rows)
+        if keep.any():
+            parts.append(frame[keep])
+    if not parts:
+        return source.head(0)
+    return pd.concat(parts).sort_values(sort_col, ascending=ascending, kind="stable", na_position="last")
+
+
+def build_profile(source):
+    # Profil kolumn (jak column_profile.build_profile) liczony kawałkami;
+    # dla kolumn liczbowych bez liczby różnych wartości i najczęstszych wartości,
+    # a dla kolumn z więcej niż SCAN_MAX_DISTINCT wartościami bez liczby różnych
+    # wartości (najczęstsze wartości są wtedy przybliżone)
+    scan = _scan(source)
+    quantiles = _quantiles(source, scan["moments"], QUANTILES)
+    describe_df = _describe_from_scan(source, scan)
+    columns = []
+    for col, kind in scan["kinds"].items():
+        stats = {"name": col, "kind": kind, "dtype": None, "nulls": scan["nulls"][col],
+                 "count": scan["rows"] - scan["nulls"][col]}
+        if kind == "number":
+            acc = scan["moments"][col]
+            stats.update(dtype="float64", distinct=None, top=[], values=[], values_truncated=False,
+                         min=acc.min if acc.count else math.nan, max=acc.max if acc.count else math.nan,
+                         quantiles={str(q): v for q, v in quantiles[col].items()})
+        else:
+            counter = scan["counts"][col]
+            ordered = counter.ordered()
+            values = counter.first
+            stats.update(dtype="object", distinct=counter.distinct(), top=[[v, c] for v, c in ordered[:TOP_K]],
+                         values=values[:MAX_VALUES], values_truncated=len(values) > MAX_VALUES)
+            if kind != "object" and counter.counts:
+                stats.update(min=min(counter.counts), max=max(counter.counts))
+        columns.append(stats)
+    return {
+        "rows": scan["rows"],
+        "columns": columns,
+        "describe": describe_df.to_json(orient="split", double_precision=15),
+    }
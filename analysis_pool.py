@@ -0,0 +1,344 @@
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+
+import pandas as pd
+import plotly.graph_objects as go
+import pyarrow as pa
+
+import analysis
+import file_tables
+import timing
+from frame_cache import frame_cache
+from query_cache import query_cache
+
+# -------------------------------
+# Pula procesów do ciężkiej analizy (poza wątkiem skryptu)
+# -------------------------------
+# Streamlit wykonuje skrypty wszystkich sesji w wątkach jednego procesu, a
+# pandas (wczytanie pliku, filtry, agregacje) trzyma GIL - analiza dużego
+# pliku przez jednego użytkownika spowalniała strony pozostałych. Zadania
+# (analysis_tasks) trafiają więc do procesów roboczych: kolejka jest
+# ograniczona (MAX_PENDING), a zadanie ma limit czasu (TIMEOUT) - przekroczone
+# kończymy razem z jego procesem (na jego miejsce startuje nowy). Anulowane
+# zadanie (np. po zmianie wyboru) kończy się od razu dla czekającego, a
+# proces dostaje sygnał przerwania (analysis.cancel_event, sprawdzany przed
+# każdym kawałkiem pliku) i wraca do kolejki z ciepłym cache ramek i masek.
+# Zadanie, które nie przerwie się w CANCEL_GRACE (np. wczytuje cały plik),
+# kończymy razem z procesem, więc nieaktualne zadanie nie zajmuje miejsca w
+# puli. Wyniki-ramki wracają jako strumień Arrow IPC, a wykresy Plotly jako
+# słownik specyfikacji.
+# ANALYSIS_WORKERS=0 wykonuje zadania w wątku skryptu, jak wcześniej.
+WORKERS = int(os.environ.get("ANALYSIS_WORKERS", str(min(4, os.cpu_count() or 1))))
+MAX_PENDING = int(os.environ.get("ANALYSIS_MAX_PENDING", "32"))
+TIMEOUT = float(os.environ.get("ANALYSIS_TIMEOUT", "120"))
+# Niższy priorytet procesów roboczych: przy zajętych rdzeniach system daje
+# czas najpierw serwerowi (interakcje), a analiza dostaje resztę
+NICE = int(os.environ.get("ANALYSIS_WORKER_NICE", "10"))
+# Co ile sekund wątek obsługi sprawdza anulowanie i limit czasu
+POLL_INTERVAL = 0.05
+# Ile sekund anulowane zadanie ma na przerwanie się, zanim zakończymy proces
+CANCEL_GRACE = float(os.environ.get("ANALYSIS_CANCEL_GRACE", "2"))
+
+
+class AnalysisError(Exception):
+    pass
+
+
+class PoolBusy(AnalysisError):
+    pass
+
+
+class JobCancelled(AnalysisError):
+    pass
+
+
+class JobTimeout(AnalysisError):
+    pass
+
+
+class WorkerFailed(AnalysisError):
+    pass
+
+
+class TaskFailed(AnalysisError):
+    pass
+
+
+def _task_error(e):
+    # Wyjątek zadania jako AnalysisError: strona pokazuje komunikat zamiast
+    # śladu stosu (np. KeyError dla kolumny, której już nie ma w pliku)
+    if isinstance(e, AnalysisError):
+        return e
+    if isinstance(e, KeyError):
+        error = TaskFailed(f"Brak kolumny w pliku: {e.args[0]}" if e.args else "Brak kolumny w pliku")
+    elif isinstance(e, PermissionError):
+        error = TaskFailed(str(e) or "Brak dostępu do pliku")
+    else:
+        error = TaskFailed(f"Błąd analizy ({type(e).__name__}): {e}")
+    error.__cause__ = e
+    return error
+
+
+# -------------------------------
+# Wyniki jako Arrow IPC
+# -------------------------------
+class ArrowResult:
+    # DataFrame albo Series zakodowane jako strumień Arrow IPC (z indeksem i typami pandas)
+    def __init__(self, value):
+        self.series = isinstance(value, pd.Series)
+        self.name = value.name if self.series else None
+        frame = value.to_frame(name="value") if self.series else value
+        table = pa.Table.from_pandas(frame, preserve_index=True)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        self.buffer = sink.getvalue().to_pybytes()
+
+    def decode(self):
+        frame = pa.ipc.open_stream(self.buffer).read_all().to_pandas()
+        return frame["value"].rename(self.name) if self.series else frame
+
+
+def _encode(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        try:
+            return ArrowResult(value)
+        except (pa.ArrowException, TypeError, ValueError):
+            # Kolumny, których Arrow nie przedstawi (np. mieszane typy) - pickle
+            return value
+    if isinstance(value, go.Figure):
+        # Słownik specyfikacji (st.plotly_chart przyjmuje go bez budowania wykresu od nowa)
+        return value.to_dict()
+    if isinstance(value, tuple):
+        return tuple(_encode(item) for item in value)
+    return value
+
+
+def _decode(value):
+    if isinstance(value, ArrowResult):
+        return value.decode()
+    if isinstance(value, tuple):
+        return tuple(_decode(item) for item in value)
+    return value
+
+
+def _worker_main(conn, frame_cache_bytes, cancel):
+    # Proces roboczy. Zapytania do bazy bez cache (unieważnienia z serwera
+    # tu nie docierają) i bez DuckDB (plik bazy ma otwarty serwer).
+    if NICE and hasattr(os, "nice"):
+        os.nice(NICE)
+    query_cache.max_entries = 0
+    file_tables.ENABLED = False
+    frame_cache.max_bytes = frame_cache_bytes
+    analysis.cancel_event = cancel
+    while True:
+        try:
+            func, args = conn.recv()
+        except EOFError:
+            return
+        # Pomiary zadania wracają z wynikiem (timing.absorb w wątku skryptu)
+        with timing.run(func.__name__, log=False) as task_run:
+            try:
+                with timing.section("analysis", func.__name__):
+                    value = func(*args)
+                with timing.section("pool", "encode"):
+                    result = ["ok", _encode(value)]
+            except Exception as e:
+                result = ["error", e]
+        result.append(task_run.summary() if task_run is not None else None)
+        try:
+            conn.send(tuple(result))
+        except Exception as e:
+            # Wynik albo wyjątek, którego nie da się przesłać
+            conn.send(("error", WorkerFailed(f"Nie udało się przesłać wyniku: {e}"), None))
+
+
+# -------------------------------
+# Zadania i pula
+# -------------------------------
+class AnalysisJob:
+    def __init__(self, func, args):
+        self.func = func
+        self.args = args
+        self.submitted = time.monotonic()
+        self.started = None
+        self.cancelled = False
+        self._done = threading.Event()
+        self._value = None
+        self._error = None
+        # Podsumowanie pomiarów z procesu roboczego (timing.Run.summary) albo None
+        self.timings = None
+        # Funkcja wywoływana z wynikiem przy pierwszym udanym result() (np. zapis do cache wyników)
+        self.on_result = None
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def elapsed(self):
+        return time.monotonic() - self.submitted
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def result(self):
+        self._done.wait()
+        if self._error is not None:
+            raise self._error
+        value = _decode(self._value)
+        if self.on_result is not None:
+            callback, self.on_result = self.on_result, None
+            callback(value)
+        return value
+
+    def _finish(self, value=None, error=None):
+        self._value = value
+        self._error = error
+        self._done.set()
+
+
+def finished_job(value):
+    # Zadanie z gotowym wynikiem (np. z cache wyników), bez udziału puli
+    job = AnalysisJob(None, ())
+    job._finish(value=value)
+    return job
+
+
+class AnalysisPool:
+    def __init__(self, workers=WORKERS, max_pending=MAX_PENDING, timeout=TIMEOUT):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        # spawn: fork wielowątkowego serwera Streamlit mógłby skopiować zablokowane blokady
+        self._context = multiprocessing.get_context("spawn")
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._threads = []
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.timeouts = 0
+        self.rejected = 0
+
+    def start(self):
+        # Uruchamia procesy robocze (inaczej startują przy pierwszym zadaniu)
+        with self._cond:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._serve, name=f"analysis-{len(self._threads)}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, func, *args, inline=False):
+        # func i argumenty muszą dać się przesłać do procesu (funkcja modułu,
+        # małe argumenty). inline=True wykonuje zadanie od razu w tym wątku.
+        job = AnalysisJob(func, args)
+        if inline or self.workers <= 0:
+            try:
+                with timing.section("analysis", func.__name__):
+                    value = func(*args)
+                job._finish(value=value)
+            except Exception as e:
+                job._finish(error=_task_error(e))
+            return job
+        self.start()
+        with self._cond:
+            if len(self._queue) >= self.max_pending:
+                self.rejected += 1
+                raise PoolBusy("Serwer analizy jest przeciążony – spróbuj ponownie za chwilę")
+            self._queue.append(job)
+            self._cond.notify()
+        return job
+
+    def cancel(self, job):
+        # Zadanie z kolejki usuwamy; wykonywane przerywa wątek obsługi (_receive)
+        with self._cond:
+            if job.done or job.cancelled:
+                return
+            job.cancelled = True
+            if job in self._queue:
+                self._queue.remove(job)
+            self.cancelled += 1
+            job._finish(error=JobCancelled("Zadanie anulowane"))
+
+    def _spawn(self):
+        parent, child = self._context.Pipe()
+        cancel = self._context.Event()
+        budget = frame_cache.max_bytes // max(self.workers, 1)
+        process = self._context.Process(target=_worker_main, args=(child, budget, cancel),
+                                        name="analysis-worker", daemon=True)
+        process.start()
+        child.close()
+        return process, parent, cancel
+
+    def _receive(self, job, conn, cancel):
+        # ("ok" | "error", wartość, pomiary), None po przekroczeniu limitu czasu
+        # albo ("stopped", None, None), gdy anulowane zadanie nie przerwało się w CANCEL_GRACE
+        deadline = job.started + self.timeout
+        stop_deadline = None
+        while not conn.poll(POLL_INTERVAL):
+            now = time.monotonic()
+            if now > deadline:
+                return None
+            if job.cancelled:
+                if stop_deadline is None:
+                    cancel.set()
+                    stop_deadline = now + CANCEL_GRACE
+                elif now > stop_deadline:
+                    return ("stopped", None, None)
+        return conn.recv()
+
+    def _serve(self):
+        process, conn, cancel = self._spawn()
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                job = self._queue.popleft()
+                job.started = time.monotonic()
+                self.running += 1
+            try:
+                if not process.is_alive():
+                    process, conn, cancel = self._spawn()
+                # Proces czeka na zadanie, więc sygnał poprzedniego można już zdjąć
+                cancel.clear()
+                conn.send((job.func, job.args))
+                response = self._receive(job, conn, cancel)
+            except (EOFError, OSError):
+                response = ("crashed", None, None)
+            if response is None or response[0] in ("crashed", "stopped"):
+                process.kill()
+                process.join()
+                conn.close()
+                process, conn, cancel = self._spawn()
+            with self._cond:
+                self.running -= 1
+                if job.cancelled:
+                    # Wynik anulowanego zadania (cancel już je zakończył)
+                    continue
+                if response is not None:
+                    job.timings = response[2]
+                if response is None:
+                    self.timeouts += 1
+                    job._finish(error=JobTimeout(f"Analiza trwała dłużej niż {self.timeout:g} s i została przerwana"))
+                elif response[0] == "crashed":
+                    self.failed += 1
+                    job._finish(error=WorkerFailed("Proces analizy zakończył się nieoczekiwanie"))
+                elif response[0] == "error":
+                    self.failed += 1
+                    job._finish(error=_task_error(response[1]))
+                else:
+                    self.completed += 1
+                    job._finish(value=response[1])
+
+    def stats(self):
+        with self._cond:
+            return {"workers": self.workers, "queued": len(self._queue), "running": self.running,
+                    "completed": self.completed, "failed": self.failed, "cancelled": self.cancelled,
+                    "timeouts": self.timeouts, "rejected": self.rejected}
+
+
+analysis_pool = AnalysisPool()
@@ -0,0 +1,216 @@
+import pandas as pd
+import plotly.graph_objects as go
+
+import analysis
+import approx
+import charts
+import column_profile
+import export
+import filters
+import timing
+from analysis_pool import analysis_pool, finished_job
+from data import (get_file_hash_shared, get_file_profile_shared, get_file_storage_shared, get_file_table_shared,
+                  load_file_dataframe, load_file_sample)
+from result_cache import result_cache
+
+# -------------------------------
+# Zadania analizy pliku (wykonywane przez analysis_pool)
+# -------------------------------
+# Zadanie dostaje tylko małe argumenty (id pliku, spec filtra, nazwy kolumn)
+# i samo otwiera plik, więc proces roboczy korzysta z własnego cache ramek i
+# masek filtrów, a do serwera wraca tylko wynik. Dla dużych plików z tabelą
+# DuckDB zadania liczone przez bazę (SQL_TASKS) wykonujemy w wątku skryptu:
+# DuckDB zwalnia GIL na czas zapytania, a plik bazy DuckDB może mieć otwarty
+# tylko jeden proces.
+
+
+def open_source(file_id, user_id, columns=None):
+    # (DataFrame pliku albo ChunkedSource, klucz cache masek filtrów);
+    # columns: kolumny potrzebne zadaniu (None - wszystkie)
+    storage = get_file_storage_shared(file_id, user_id)
+    if storage is None:
+        raise PermissionError("Brak dostępu do pliku")
+    if analysis.is_large(storage[0]):
+        return analysis.ChunkedSource(file_id, user_id), None
+    df = load_file_dataframe(file_id, user_id, columns)
+    if df is None:
+        raise PermissionError("Brak dostępu do pliku")
+    return df, (file_id, get_file_hash_shared(file_id, user_id))
+
+
+def _filtered_source(file_id, user_id, filter_spec, columns=None):
+    # Wczytujemy tylko kolumny zadania i filtra (columns=None - wszystkie)
+    if columns is not None and filter_spec is not None:
+        columns = [*columns, *filters.spec_columns(filter_spec)]
+    source, cache_key = open_source(file_id, user_id, columns)
+    return source, filters.from_spec(filter_spec, cache_key)
+
+
+def profile(file_id, user_id):
+    # Profil kolumn plików zapisanych przed wprowadzeniem profili
+    source, _ = open_source(file_id, user_id)
+    if isinstance(source, pd.DataFrame):
+        return column_profile.build_profile(source)
+    return analysis.build_profile(source)
+
+
+def memory(file_id, user_id):
+    # (bajty w typach domyślnych, bajty po optymalizacji) albo None dla dużych plików
+    source, _ = open_source(file_id, user_id)
+    return source.attrs.get("memory") if isinstance(source, pd.DataFrame) else None
+
+
+def preview(file_id, user_id, offset, limit, sort_col, ascending):
+    source, cache_key = open_source(file_id, user_id)
+    return analysis.preview_window(source, offset, limit, sort_col, ascending, cache_key)
+
+
+# Wykresy budujemy w zadaniu (Plotly Express też trzyma GIL); z procesu
+# roboczego wracają jako słownik specyfikacji wykresu
+def histogram_chart(file_id, user_id, filter_spec, col, value_range):
+    # (wykres, podpis)
+    source, where = _filtered_source(file_id, user_id, filter_spec, [col])
+    return charts.histogram_figure(col, *charts.histogram_data(source, col, value_range, where)), None
+
+
+def category_chart(file_id, user_id, filter_spec, col):
+    # (wykres, podpis)
+    source, where = _filtered_source(file_id, user_id, filter_spec, [col])
+    counts = analysis.value_counts(source, col, where).reset_index()
+    counts.columns = [col, "count"]
+    fig, caption = charts.bar_figure(counts, col, "count")
+    if "error" in counts.attrs:
+        # Liczba kategorii nieznana: przebieg kawałkami zostawił tylko najczęstsze
+        caption = (f"Pokazano {min(len(counts), charts.MAX_BARS)} najczęstszych kategorii (ponad "
+                   f"{analysis.SCAN_MAX_DISTINCT} różnych wartości; liczności zaniżone najwyżej o "
+                   f"{counts.attrs['error']})")
+    return fig, caption
+
+
+def scatter_chart(file_id, user_id, filter_spec, x, y, ranges):
+    # (wykres, podpis)
+    source, where = _filtered_source(file_id, user_id, filter_spec, [x, y])
+    return charts.scatter_figure(x, y, *charts.scatter_data(source, x, y, ranges, where))
+
+
+def groupby_chart(file_id, user_id, filter_spec, group_col, agg_col, agg_func):
+    # (wykres, podpis)
+    source, where = _filtered_source(file_id, user_id, filter_spec, [group_col, agg_col])
+    grouped = analysis.groupby_agg(source, group_col, agg_col, agg_func, where)
+    return charts.bar_figure(grouped, group_col, agg_col)
+
+
+def export_file(file_id, user_id, filter_spec, fmt):
+    source, where = _filtered_source(file_id, user_id, filter_spec)
+    return export.build(source, where, fmt)
+
+
+# -------------------------------
+# Tryb przybliżony: te same wykresy z próbki pliku (approx.py)
+# -------------------------------
+# Liczności i sumy są przeskalowane do liczby wierszy pliku, a słupki
+# błędów to 95% przedziały ufności
+def _sample_source(file_id, user_id, filter_spec):
+    # (approx.Sample, filtr); maski filtrów próbki mają własny klucz w cache
+    frame = load_file_sample(file_id, user_id)
+    profile = get_file_profile_shared(file_id, user_id)
+    if frame is None or profile is None:
+        raise PermissionError("Brak próbki pliku")
+    cache_key = (file_id, (get_file_hash_shared(file_id, user_id), "sample"))
+    return approx.Sample(frame, profile["rows"]), filters.from_spec(filter_spec, cache_key)
+
+
+def _approx_caption(sample, caption=None, errors=True):
+    note = f"≈ Przybliżenie z losowej próbki {sample.n} z {sample.total_rows} wierszy"
+    if errors:
+        note += "; słupki błędów: 95% przedział ufności"
+    return f"{caption}. {note}" if caption else note
+
+
+def approx_rows(file_id, user_id, filter_spec):
+    # (szacowana liczba wierszy spełniających filtr, połowa przedziału ufności)
+    sample, where = _sample_source(file_id, user_id, filter_spec)
+    return sample.rows(where)
+
+
+def approx_histogram_chart(file_id, user_id, filter_spec, col, value_range):
+    sample, where = _sample_source(file_id, user_id, filter_spec)
+    counts, edges = charts.histogram_data(sample.frame, col, value_range, where)
+    estimate, errors = sample.counts(counts)
+    return charts.histogram_figure(col, estimate, edges, errors), _approx_caption(sample)
+
+
+def approx_category_chart(file_id, user_id, filter_spec, col):
+    sample, where = _sample_source(file_id, user_id, filter_spec)
+    counts = analysis.value_counts(sample.frame, col, where)
+    estimate, errors = sample.counts(counts.to_numpy())
+    frame = pd.DataFrame({col: counts.index, "count": estimate, "error": errors})
+    fig, caption = charts.bar_figure(frame, col, "count", error="error")
+    return fig, _approx_caption(sample, caption)
+
+
+def approx_scatter_chart(file_id, user_id, filter_spec, x, y, ranges):
+    # Punkty (albo gęstość) z samej próbki - bez przeskalowania
+    sample, where = _sample_source(file_id, user_id, filter_spec)
+    fig, caption = charts.scatter_figure(x, y, *charts.scatter_data(sample.frame, x, y, ranges, where))
+    return fig, _approx_caption(sample, caption, errors=False)
+
+
+def approx_groupby_chart(file_id, user_id, filter_spec, group_col, agg_col, agg_func):
+    sample, where = _sample_source(file_id, user_id, filter_spec)
+    grouped = sample.groupby_agg(group_col, agg_col, agg_func, where)
+    fig, caption = charts.bar_figure(grouped, group_col, agg_col, error="error")
+    return fig, _approx_caption(sample, caption)
+
+
+# Zadanie dokładne -> jego odpowiednik z próbki
+APPROXIMATE = {
+    histogram_chart: approx_histogram_chart,
+    category_chart: approx_category_chart,
+    scatter_chart: approx_scatter_chart,
+    groupby_chart: approx_groupby_chart,
+}
+# Zadania, które dla pliku z tabelą DuckDB liczy baza
+SQL_TASKS = {preview, histogram_chart, category_chart, groupby_chart, export_file}
+# Zadania, których wynik trafia do result_cache; pierwszy argument po
+# user_id to spec filtra, reszta to kolumny i parametry
+CACHED_TASKS = {histogram_chart, category_chart, groupby_chart,
+                approx_rows, approx_histogram_chart, approx_category_chart, approx_groupby_chart}
+
+
+def _cache_key(task, file_id, user_id, args):
+    # (hash zawartości, spec filtra, operacja, kolumny i parametry) albo None bez dostępu
+    content_hash = get_file_hash_shared(file_id, user_id)
+    if content_hash is None:
+        return None
+    return (content_hash, args[0], task.__name__, tuple(args[1:]))
+
+
+def _cacheable(value):
+    # Wykresy zapisujemy jako słownik specyfikacji: odtworzenie go.Figure
+    # z pickle (walidacja wszystkich właściwości) trwa dziesiątki ms
+    if isinstance(value, go.Figure):
+        return value.to_dict()
+    if isinstance(value, tuple):
+        return tuple(_cacheable(item) for item in value)
+    return value
+
+
+def submit(task, file_id, user_id, *args):
+    # Zleca zadanie puli; zwraca AnalysisJob
+    key = None
+    if task in CACHED_TASKS:
+        with timing.section("cache", "result_cache"):
+            key = _cache_key(task, file_id, user_id, args)
+            found, value = result_cache.get(key) if key is not None else (False, None)
+        if found:
+            return finished_job(value)
+    inline = False
+    if task in SQL_TASKS:
+        storage = get_file_storage_shared(file_id, user_id)
+        inline = (storage is not None and analysis.is_large(storage[0])
+                  and get_file_table_shared(file_id, user_id) is not None)
+    job = analysis_pool.submit(task, file_id, user_id, *args, inline=inline)
+    if key is not None:
+        job.on_result = lambda value: result_cache.put(key, _cacheable(value))
+    return job
@@ -0,0 +1,123 @@
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+import columnar
+
+# -------------------------------
+# Tryb przybliżony: analiza na próbce wierszy pliku
+# -------------------------------
+# Przy zapisie pliku odkładamy losową próbkę SAMPLE_ROWS wierszy (bez
+# zwracania, z ustalonym ziarnem) jako artefakt file_samples. Próbkę losuje
+# algorytm rezerwuarowy w jednym przebiegu po kawałkach, więc backfill
+# buduje ją z kopii kolumnowej bez wczytywania całego pliku. Wykresy po
+# filtrze liczone na próbce są gotowe od razu także dla bardzo dużych
+# plików, a wyniki przeskalowane do liczby wierszy pliku mają 95% przedział
+# ufności (rozkład normalny, z poprawką na skończoną populację). Statystyki
+# całego pliku (liczba różnych wartości, kwantyle, najczęstsze wartości)
+# są już dokładne w profilu kolumn, więc próbka służy tylko zapytaniom z filtrem.
+SAMPLE_ROWS = int(os.environ.get("SAMPLE_ROWS", "100000"))
+SAMPLE_SEED = 0
+SAMPLE_CHUNK_ROWS = 100_000
+# Kwantyl rozkładu normalnego dla 95% przedziału ufności
+Z = 1.96
+
+
+def reservoir_sample(frames, k=SAMPLE_ROWS, seed=SAMPLE_SEED):
+    # (próbka, liczba wierszy) - k wierszy bez zwracania w jednym przebiegu
+    # (algorytm R): wiersz nr i (od 0) trafia do próbki z prawdopodobieństwem
+    # k / (i + 1) na miejsce losowego wiersza próbki. W pamięci jest próbka
+    # i jeden kawałek; indeks próbki to numery wierszy pliku, rosnąco.
+    rng = np.random.default_rng(seed)
+    sample, seen = None, 0
+    # Numer wiersza na każdym miejscu próbki (-1 - wolne)
+    owners = np.full(k, -1, dtype="int64")
+    for frame in frames:
+        positions = np.arange(seen, seen + len(frame))
+        frame = frame.set_axis(pd.RangeIndex(seen, seen + len(frame)), axis=0)
+        seen += len(frame)
+        # Pierwsze k wierszy zajmuje kolejne miejsca, dalsze losują miejsce z [0, i]
+        slots = positions.copy()
+        late = positions >= k
+        slots[late] = np.floor(rng.random(np.count_nonzero(late)) * (positions[late] + 1)).astype("int64")
+        accepted = slots < k
+        if not accepted.any():
+            continue
+        # Miejsce wylosowane kilka razy w kawałku zajmuje ostatni z wierszy
+        slots, taken = slots[accepted][::-1], positions[accepted][::-1]
+        slots, last = np.unique(slots, return_index=True)
+        owners[slots] = taken[last]
+        combined = frame if sample is None else pd.concat([sample, frame])
+        sample = combined.loc[np.sort(owners[owners >= 0])]
+    return sample, seen
+
+
+def build_sample(frames):
+    # (format, dane, liczba wierszy) dla tabeli file_samples albo None, gdy
+    # plik mieści się w próbce (tryb przybliżony nie jest wtedy potrzebny).
+    # frames: DataFrame (zapis pliku) albo ciąg kawałków (np. kopii kolumnowej)
+    if isinstance(frames, pd.DataFrame):
+        df = frames
+        if len(df) <= SAMPLE_ROWS:
+            return None
+        frames = (df.iloc[start:start + SAMPLE_CHUNK_ROWS] for start in range(0, len(df), SAMPLE_CHUNK_ROWS))
+    sample, rows = reservoir_sample(frames, SAMPLE_ROWS)
+    if rows <= SAMPLE_ROWS:
+        return None
+    return columnar.FORMAT, columnar.to_columnar(sample), len(sample)
+
+
+class Sample:
+    def __init__(self, frame, total_rows):
+        self.frame = frame
+        self.n = len(frame)
+        self.total_rows = total_rows
+        # Próbka z całego pliku ma zerowy błąd
+        self.fpc = math.sqrt((total_rows - self.n) / (total_rows - 1)) if total_rows > max(self.n, 1) else 0.0
+
+    @property
+    def exact(self):
+        return self.fpc == 0.0
+
+    def _mask(self, where):
+        return where(self.frame) if where is not None else np.ones(self.n, dtype=bool)
+
+    def counts(self, k):
+        # Liczności w próbce (wierszy spełniających warunek) -> (szacunek w pliku, połowa przedziału ufności)
+        k = np.asarray(k, dtype="float64")
+        if self.n == 0:
+            return k, np.zeros_like(k)
+        p = k / self.n
+        error = Z * self.total_rows * np.sqrt(p * (1 - p) / max(self.n - 1, 1)) * self.fpc
+        return p * self.total_rows, error
+
+    def rows(self, where=None):
+        # Liczba wierszy pliku spełniających filtr: (szacunek, połowa przedziału ufności)
+        estimate, error = self.counts([int(np.count_nonzero(self._mask(where)))])
+        return float(estimate[0]), float(error[0])
+
+    def groupby_agg(self, group_col, agg_col, agg_func, where=None):
+        # Jak analysis.groupby_agg, z dodatkową kolumną "error" (połowa przedziału ufności)
+        frame = self.frame[self._mask(where)]
+        grouped = frame.groupby(group_col, observed=True)[agg_col]
+        if agg_func == "count":
+            values, error = self.counts(grouped.count())
+        elif agg_func == "sum":
+            # Suma w grupie = N * średnia z y_i * [wiersz w grupie] po całej próbce
+            values = frame[agg_col].astype("float64")
+            sums = values.groupby(frame[group_col], observed=True).sum()
+            squares = (values ** 2).groupby(frame[group_col], observed=True).sum()
+            n = max(self.n, 1)
+            mean = sums / n
+            variance = (squares / n - mean ** 2).clip(lower=0) * n / max(n - 1, 1)
+            values = mean * self.total_rows
+            error = Z * self.total_rows * np.sqrt(variance / n) * self.fpc
+        else:
+            values = grouped.mean()
+            error = Z * grouped.std(ddof=1) / np.sqrt(grouped.count()) * self.fpc
+        result = pd.DataFrame({agg_col: np.asarray(values, dtype="float64"),
+                               "error": np.asarray(error, dtype="float64")},
+                              index=grouped.count().index)
+        return result.rename_axis(group_col).reset_index()
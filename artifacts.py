@@ -0,0 +1,156 @@
+import argparse
+
+import pandas as pd
+
+import approx
+import blob_store
+import column_profile
+import columnar
+import file_tables
+from db import connection, transaction, init_db, open_blob
+
+# -------------------------------
+# Artefakty pochodne plików CSV
+# -------------------------------
+# Dane wyliczane raz przy zapisie pliku i trzymane obok niego w bazie.
+# Każdy artefakt: tabela (z kluczem file_id), kolumny i funkcja budująca
+# ich wartości z DataFrame'u wczytanego przez pd.read_csv.
+ARTIFACTS = {
+    "file_columnar": (("format", "data"),
+                      lambda df: (columnar.FORMAT, columnar.to_columnar(df))),
+    "file_profiles": (("profile",),
+                      lambda df: (column_profile.dumps(column_profile.build_profile(df)),)),
+    "file_samples": (("format", "data", "rows"), approx.build_sample),
+}
+# Artefakty potrzebne tylko części plików: tabela -> warunek SQL na pliku f.
+# Budowa zwraca None dla pozostałych, a backfill ich nie szuka.
+NEEDED_WHEN = {
+    "file_samples": "(SELECT json_extract(profile, '$.rows') FROM file_profiles WHERE file_id = f.id) "
+                    f"> {approx.SAMPLE_ROWS}",
+}
+
+# Artefakty zapisywane jako osobne tabele, a nie wiersz. Rejestr (tabela
+# z kluczem file_id) -> (czy budować dla nowych plików, budowa przed
+# transakcją, zapis w transakcji, usuwanie, porzucenie niezapisanych)
+TABLE_ARTIFACTS = {
+    "file_tables": (file_tables.ENABLED, file_tables.prepare, file_tables.store, file_tables.drop,
+                    file_tables.discard),
+}
+
+
+def _enabled_tables():
+    return [table for table, (enabled, *_) in TABLE_ARTIFACTS.items() if enabled]
+
+
+def build_artifacts(df):
+    # Zwraca {tabela: wartości}; artefakt, którego nie da się zbudować,
+    # jest pomijany (analiza wróci wtedy do samego CSV), tak jak niepotrzebny (None)
+    built = {}
+    for table, (_, build) in ARTIFACTS.items():
+        try:
+            values = build(df)
+        except Exception:
+            continue
+        if values is not None:
+            built[table] = values
+    for table in _enabled_tables():
+        values = TABLE_ARTIFACTS[table][1](df)
+        if values is not None:
+            built[table] = values
+    return built
+
+
+def store_artifacts(conn, file_id, built):
+    for table, values in built.items():
+        if table in TABLE_ARTIFACTS:
+            TABLE_ARTIFACTS[table][2](conn, file_id, values)
+            continue
+        columns = ARTIFACTS[table][0]
+        conn.execute(f"INSERT OR REPLACE INTO {table} (file_id, {', '.join(columns)}) "
+                     f"VALUES (?, {', '.join('?' for _ in columns)})", (file_id, *values))
+
+
+def discard_artifacts(built, file_id=None):
+    # Artefakty zbudowane, ale niezapisane (np. wycofana transakcja pliku file_id)
+    for table, values in built.items():
+        if table in TABLE_ARTIFACTS:
+            TABLE_ARTIFACTS[table][4](values, file_id)
+
+
+def delete_artifacts(conn, file_ids_sql, params):
+    # file_ids_sql: podzapytanie zwracające id usuwanych plików
+    for _, _, _, drop, _ in TABLE_ARTIFACTS.values():
+        drop(conn, file_ids_sql, params)
+    for table in ARTIFACTS:
+        conn.execute(f"DELETE FROM {table} WHERE file_id IN ({file_ids_sql})", params)
+
+
+def backfill(batch_size=50):
+    # Buduje brakujące artefakty dla plików zapisanych przed ich wprowadzeniem.
+    # Pliki przetwarzane są partiami i czytane strumieniowo.
+    missing_any = " OR ".join(f"(NOT EXISTS (SELECT 1 FROM {table} WHERE file_id = f.id)"
+                              + (f" AND {NEEDED_WHEN[table]})" if table in NEEDED_WHEN else ")")
+                              for table in [*ARTIFACTS, *_enabled_tables()])
+    built_count, failed = 0, []
+    last_id = 0
+    while True:
+        with connection() as conn:
+            batch = conn.execute(f'''
+                SELECT f.id, f.content_hash
+                FROM files f
+                WHERE f.id > ? AND ({missing_any})
+                ORDER BY f.id
+                LIMIT ?
+            ''', (last_id, batch_size)).fetchall()
+        if not batch:
+            break
+        for file_id, content_hash in batch:
+            last_id = file_id
+            with connection() as conn:
+                absent = [table for table in [*ARTIFACTS, *_enabled_tables()]
+                          if not conn.execute(f"SELECT 1 FROM {table} WHERE file_id = ?", (file_id,)).fetchone()]
+            df, built = None, {}
+            try:
+                if absent == ["file_samples"]:
+                    # Brak tylko próbki (np. pliki sprzed file_samples): jeden
+                    # przebieg po kopii kolumnowej, bez całej ramki w pamięci
+                    with open_blob("file_columnar", "data", file_id) as stream:
+                        sample = approx.build_sample(columnar.iter_columnar(stream, approx.SAMPLE_CHUNK_ROWS))
+                    if sample is not None:
+                        built["file_samples"] = sample
+                else:
+                    with connection() as conn, blob_store.open_content(conn, content_hash) as stream:
+                        df = pd.read_csv(stream)
+            except Exception as e:
+                failed.append((file_id, str(e)))
+                continue
+            if df is not None:
+                built = build_artifacts(df)
+            missing = {}
+            with transaction() as conn:
+                # Plik mógł zostać usunięty w międzyczasie
+                if conn.execute("SELECT 1 FROM files WHERE id = ?", (file_id,)).fetchone():
+                    missing = {table: values for table, values in built.items()
+                               if not conn.execute(f"SELECT 1 FROM {table} WHERE file_id = ?",
+                                                   (file_id,)).fetchone()}
+                    store_artifacts(conn, file_id, missing)
+                    built_count += len(missing)
+            discard_artifacts({table: values for table, values in built.items() if table not in missing})
+    return built_count, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Artefakty pochodne plików CSV w bazie")
+    parser.add_argument("command", choices=["backfill"])
+    parser.add_argument("--batch-size", type=int, default=50)
+    args = parser.parse_args()
+
+    init_db()
+    built, failed = backfill(args.batch_size)
+    print(f"Utworzone artefakty: {built}")
+    for file_id, error in failed:
+        print(f"Plik {file_id}: błąd ({error})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Test obciążeniowy: czas reakcji strony przy równoczesnej analizie.
+
+Uruchamia aplikację (streamlit run) na tymczasowej bazie z dużym plikiem
+CSV i otwiera wiele sesji WebSocket naraz. Sesje "analizujące" w pętli
+przeładowują całą stronę (podgląd, filtr, wykresy i grupowanie na całym
+pliku), a sesje "lekkie" klikają w notatkach (edycja / anuluj) i mierzą
+czas reakcji. Porównuje analizę w wątku skryptu (ANALYSIS_WORKERS=0) z pulą
+procesów analysis_pool i podaje p50/p95 obu rodzajów sesji.
+
+Uruchomienie (z katalogu repozytorium):
+    python benchmarks/bench_analysis_load.py --workers 0 4 --heavy 4 --light 4 --duration 20
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from bench_reruns import REPO, AppClient, connect, prepare_db, wait_for_server
+
+
+def percentile(values, q):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+
+def session(port, heavy, stop, latencies, errors):
+    try:
+        with connect(f"ws://localhost:{port}/_stcore/stream", subprotocols=["streamlit"],
+                     origin=f"http://localhost:{port}", max_size=None) as ws:
+            client = AppClient(ws)
+            client.login("bench", "haslo")
+            note_id = int(client.find("✏️ Edytuj")[0].rsplit("_", 1)[1])
+            actions = ([client.rerun] if heavy else
+                       [lambda: client.click(f"edit_btn_{note_id}"), lambda: client.click(f"cancel_{note_id}")])
+            i = 0
+            while not stop.is_set():
+                latencies.append(actions[i % len(actions)]())
+                i += 1
+    except Exception as e:
+        errors.append(repr(e))
+
+
+def run(args, db_path, workers, port):
+    env = dict(os.environ, NOTES_DB=db_path, PYTHONPATH=REPO, MAINTENANCE_INTERVAL="0",
+               ANALYSIS_WORKERS=str(workers))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", os.path.join(REPO, "script.py"),
+         "--server.headless", "true", "--server.port", str(port), "--browser.gatherUsageStats", "false"],
+        env=env, cwd=REPO, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_server(port, server)
+        # Rozgrzewka: wczytanie pliku (w procesie serwera albo w procesach roboczych)
+        warmup = threading.Event()
+        warmup.set()
+        for _ in range(max(workers, 1)):
+            session(port, True, warmup, [], [])
+
+        stop = threading.Event()
+        heavy, light, errors = [], [], []
+        threads = [threading.Thread(target=session, args=(port, True, stop, heavy, errors))
+                   for _ in range(args.heavy)]
+        threads += [threading.Thread(target=session, args=(port, False, stop, light, errors))
+                    for _ in range(args.light)]
+        for thread in threads:
+            thread.start()
+        time.sleep(args.duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+    finally:
+        server.terminate()
+        server.wait()
+    return {
+        "workers": workers,
+        "light_p50_ms": percentile(light, 0.5) * 1000,
+        "light_p95_ms": percentile(light, 0.95) * 1000,
+        "light_count": len(light),
+        "heavy_p50_ms": percentile(heavy, 0.5) * 1000,
+        "heavy_p95_ms": percentile(heavy, 0.95) * 1000,
+        "heavy_count": len(heavy),
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 4],
+                        help="ANALYSIS_WORKERS do porównania (0 = analiza w wątku skryptu)")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="liczba wierszy pliku CSV")
+    parser.add_argument("--heavy", type=int, default=4, help="sesje przeładowujące analizę")
+    parser.add_argument("--light", type=int, default=4, help="sesje klikające w notatkach")
+    parser.add_argument("--duration", type=float, default=20, help="czas pomiaru w sekundach")
+    parser.add_argument("--port", type=int, default=8601)
+    parser.add_argument("--json", help="zapisz wyniki do pliku JSON")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    db_path = os.path.join(tmp, "notes.db")
+    prepare_db(db_path, args.rows, notes=5)
+
+    results = []
+    for i, workers in enumerate(args.workers):
+        result = run(args, db_path, workers, args.port + i)
+        results.append(result)
+        print(f"workers={workers:<2} lekkie: p50={result['light_p50_ms']:8.1f} ms  p95={result['light_p95_ms']:8.1f} ms "
+              f"(n={result['light_count']})   analiza: p50={result['heavy_p50_ms']:8.1f} ms  "
+              f"p95={result['heavy_p95_ms']:8.1f} ms (n={result['heavy_count']})  błędy={len(result['errors'])}")
+        for error in result["errors"][:3]:
+            print(f"    {error}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"rows": args.rows, "heavy": args.heavy, "light": args.light,
+                       "duration": args.duration, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Benchmark przygotowania wykresów.
+
+Porównuje dotychczasowe wykresy (px.histogram / px.scatter na całej
+ramce, px.bar na wszystkich kategoriach) z wykresami z modułu charts
+(przedziały liczone w NumPy, mapa gęstości powyżej budżetu punktów,
+najwyżej MAX_BARS słupków). Mierzy rozmiar JSON-a wysyłanego do
+przeglądarki oraz czas zbudowania wykresu i jego serializacji (po
+stronie serwera; czas rysowania w przeglądarce rośnie z rozmiarem danych).
+
+Uruchomienie (z katalogu repozytorium):
+    python benchmarks/bench_charts.py --rows 100000 1000000
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+import plotly.express as px  # noqa: E402
+
+import charts  # noqa: E402
+
+
+def make_frame(rows, categories, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.normal(size=rows)
+    return pd.DataFrame({
+        "x": x,
+        "y": 2 * x + rng.normal(size=rows),
+        "cat": rng.integers(0, categories, size=rows).astype(str),
+    })
+
+
+def timed(build, repeat):
+    times, size = [], 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = len(build().to_json())
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000, size
+
+
+def cases(df):
+    counts = df["cat"].value_counts().reset_index()
+    counts.columns = ["cat", "count"]
+    return {
+        "histogram": (lambda: px.histogram(df, x="x"),
+                      lambda: charts.histogram_figure("x", *charts.histogram_data(df, "x"))),
+        "scatter": (lambda: px.scatter(df, x="x", y="y"),
+                    lambda: charts.scatter_figure("x", "y", *charts.scatter_data(df, "x", "y"))[0]),
+        "bar": (lambda: px.bar(counts, x="cat", y="count"),
+                lambda: charts.bar_figure(counts, "cat", "count")[0]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--categories", type=int, default=5_000, help="liczba różnych wartości kolumny tekstowej")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="zapisz wyniki do pliku JSON")
+    args = parser.parse_args()
+
+    results = []
+    for rows in args.rows:
+        df = make_frame(rows, args.categories)
+        for name, (old, new) in cases(df).items():
+            old_ms, old_bytes = timed(old, args.repeat)
+            new_ms, new_bytes = timed(new, args.repeat)
+            results.append({"rows": rows, "chart": name, "old_ms": old_ms, "old_bytes": old_bytes,
+                            "new_ms": new_ms, "new_bytes": new_bytes})
+            print(f"{rows:>9} {name:10} dotychczas={old_ms:8.1f} ms {old_bytes / 1024:10.1f} KiB   "
+                  f"charts={new_ms:7.1f} ms {new_bytes / 1024:8.1f} KiB")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""Benchmark współbieżności warstwy bazy danych.
+
+Symuluje N równoczesnych sesji Streamlit, z których każda w pętli wykonuje
+zestaw zapytań odpowiadający jednemu przeładowaniu strony (plus okazjonalny
+zapis notatki). Porównuje stary sposób (nowe sqlite3.connect przy każdym
+wywołaniu, domyślny dziennik) z pulą połączeń w trybie WAL, a następnie
+pulę z cache zapytań odczytu (query_cache; w pierwszych dwóch trybach
+cache jest wyłączony, żeby mierzyć samą bazę).
+
+Uruchomienie (z katalogu repozytorium):
+    python benchmarks/bench_concurrency.py --sessions 1 2 4 8 16 --duration 5
+"""
+import argparse
+import io
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import blob_store  # noqa: E402
+import db  # noqa: E402
+import data  # noqa: E402
+import query_cache  # noqa: E402
+
+CSV_SAMPLE = b"a,b,c\n" + b"".join(f"{i},{i * 2},x{i % 7}\n".encode() for i in range(2000))
+
+
+def build_database(path, users, notes_per_user):
+    db.configure(path=path)
+    db.init_db()
+    rng = random.Random(0)
+    for u in range(users):
+        data.register_user(f"user{u}", "haslo")
+    with db.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO notes (user_id, content) VALUES (?, ?)",
+            ((u + 1, f"Notatka {n} użytkownika {u}") for u in range(users) for n in range(notes_per_user)),
+        )
+        content_hash = blob_store.hash_stream(io.BytesIO(CSV_SAMPLE))
+        blob_store.put(conn, content_hash, io.BytesIO(CSV_SAMPLE))
+        conn.executemany(
+            "INSERT INTO files (user_id, filename, content_hash) VALUES (?, ?, ?)",
+            ((u + 1, f"plik{u}.csv", content_hash) for u in range(users)),
+        )
+        conn.executemany(
+            "INSERT INTO shared_files (file_id, shared_with_user_id) VALUES (?, ?)",
+            ((rng.randint(1, users), u + 1) for u in range(users)),
+        )
+        conn.executemany(
+            "INSERT INTO shared_notes (note_id, shared_with_user_id) VALUES (?, ?)",
+            ((rng.randint(1, users * notes_per_user), u + 1) for u in range(users)),
+        )
+    db.configure()
+
+
+def legacy_mode(path):
+    # Odtwarza dawne zachowanie: osobne połączenie na każde wywołanie,
+    # domyślny tryb dziennika i brak dodatkowych ustawień PRAGMA
+    @contextmanager
+    def legacy_connection():
+        conn = sqlite3.connect(path)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def legacy_transaction():
+        conn = sqlite3.connect(path)
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    data.connection = legacy_connection
+    data.transaction = legacy_transaction
+
+
+def pooled_mode(path, pool_size):
+    data.connection = db.connection
+    data.transaction = db.transaction
+    db.configure(path=path, pool_size=pool_size)
+
+
+def rerun(user_id, rng, write_ratio):
+    # Zapytania wykonywane przy jednym przeładowaniu strony po zalogowaniu
+    data.login_user(f"user{user_id - 1}", "haslo")
+    data.get_notes(user_id)
+    data.get_shared_notes(user_id)
+    for _ in range(2):
+        files = data.get_user_files(user_id)
+        data.get_shared_files(user_id)
+    if files:
+        data.get_file_data_shared(files[0][0], user_id)
+    if rng.random() < write_ratio:
+        data.add_note(user_id, "nowa notatka z benchmarku")
+
+
+def run(sessions, duration, users, write_ratio):
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def worker(idx):
+        rng = random.Random(idx)
+        user_id = idx % users + 1
+        local, local_errors = [], 0
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            try:
+                rerun(user_id, rng, write_ratio)
+            except sqlite3.OperationalError:
+                local_errors += 1
+                continue
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+            errors.append(local_errors)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(sessions)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "sessions": sessions,
+        "reruns": len(latencies),
+        "reruns_per_s": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else None,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000 if latencies else None,
+        "errors": sum(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--duration", type=float, default=3.0, help="czas pomiaru (s) dla każdej konfiguracji")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--notes-per-user", type=int, default=200)
+    parser.add_argument("--write-ratio", type=float, default=0.1, help="odsetek przeładowań dodających notatkę")
+    parser.add_argument("--pool-size", type=int, default=db.POOL_SIZE)
+    parser.add_argument("--json", help="zapisz wyniki do pliku JSON")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "legacy.db")
+        pooled_path = os.path.join(tmp, "pooled.db")
+        build_database(pooled_path, args.users, args.notes_per_user)
+        # Kopia bazy bez WAL dla trybu "legacy"
+        with sqlite3.connect(pooled_path) as src, sqlite3.connect(legacy_path) as dst:
+            src.backup(dst)
+            dst.execute("PRAGMA journal_mode = DELETE")
+
+        for mode in ("legacy", "pool", "cache"):
+            if mode == "legacy":
+                legacy_mode(legacy_path)
+            else:
+                pooled_mode(pooled_path, args.pool_size)
+            query_cache.query_cache.max_entries = query_cache.MAX_ENTRIES if mode == "cache" else 0
+            query_cache.query_cache.clear()
+            for sessions in args.sessions:
+                result = run(sessions, args.duration, args.users, args.write_ratio)
+                result["mode"] = mode
+                results.append(result)
+                print(f"{mode:>6}  sesje={sessions:<3} przeładowania/s={result['reruns_per_s']:8.1f}  "
+                      f"p50={result['p50_ms'] or 0:7.2f} ms  p95={result['p95_ms'] or 0:7.2f} ms  "
+                      f"błędy={result['errors']}")
+        db.configure()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
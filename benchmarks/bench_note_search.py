@@ -0,0 +1,101 @@
+"""Benchmark wyszukiwania w notatkach.
+
+Porównuje dotychczasowe filtrowanie w Pythonie (get_notes + podciąg
+w każdej notatce) z wyszukiwaniem pełnotekstowym FTS5 (search_notes)
+na syntetycznej bazie z dużą liczbą notatek jednego użytkownika.
+
+Uruchomienie (z katalogu repozytorium):
+    python benchmarks/bench_note_search.py --notes 100000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+import data  # noqa: E402
+from query_cache import query_cache  # noqa: E402
+
+WORDS = (
+    "raport sprzedaż klient faktura budżet analiza kwartał spotkanie projekt termin "
+    "zamówienie magazyn dostawa marża koszt przychód umowa zespół plan cel wynik "
+    "prognoza rynek produkt kampania ankieta wskaźnik tabela wykres dane"
+).split()
+QUERIES = ["faktura", "prog", "raport kwartał", "zamówienie dostawa magazyn", "nieistniejące"]
+
+
+def build_database(path, notes, shared_notes, words_per_note, seed=0):
+    rng = random.Random(seed)
+    db.configure(path=path)
+    db.init_db()
+    data.register_user("power", "haslo")
+    data.register_user("kolega", "haslo")
+    with db.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO notes (user_id, content) VALUES (?, ?)",
+            ((1, " ".join(rng.choice(WORDS) for _ in range(words_per_note))) for _ in range(notes)),
+        )
+        conn.executemany(
+            "INSERT INTO notes (user_id, content) VALUES (?, ?)",
+            ((2, " ".join(rng.choice(WORDS) for _ in range(words_per_note))) for _ in range(shared_notes)),
+        )
+        conn.execute(
+            "INSERT INTO shared_notes (note_id, shared_with_user_id) SELECT id, 1 FROM notes WHERE user_id = 2"
+        )
+
+
+def python_search(user_id, search_term):
+    # Dawne zachowanie paska bocznego
+    notes = data.get_notes(user_id)
+    return [n for n in notes if search_term.lower() in n[1].lower()]
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000, len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=100_000, help="liczba notatek użytkownika")
+    parser.add_argument("--shared-notes", type=int, default=10_000, help="liczba notatek udostępnionych mu")
+    parser.add_argument("--words", type=int, default=30, help="słów w notatce")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="zapisz wyniki do pliku JSON")
+    args = parser.parse_args()
+    # Mierzymy zapytania do bazy, a nie cache wyników (query_cache)
+    query_cache.max_entries = 0
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "notes.db")
+        start = time.perf_counter()
+        build_database(path, args.notes, args.shared_notes, args.words)
+        print(f"Baza z {args.notes + args.shared_notes} notatkami: {time.perf_counter() - start:.1f} s")
+
+        for query in QUERIES:
+            py_ms, py_hits = timed(lambda: python_search(1, query), args.repeat)
+            fts_ms, fts_hits = timed(lambda: data.search_notes(1, query), args.repeat)
+            results.append({"query": query, "python_ms": py_ms, "python_hits": py_hits,
+                            "fts_ms": fts_ms, "fts_hits": fts_hits})
+            print(f"{query!r:32} python={py_ms:8.1f} ms ({py_hits} trafień)   "
+                  f"fts5={fts_ms:7.2f} ms ({fts_hits} trafień, limit 100)")
+        db.configure()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""Benchmark czasu reakcji strony na kliknięcia.
+
+Uruchamia aplikację (streamlit run) na tymczasowej bazie z jednym
+użytkownikiem, jego notatkami i plikiem CSV, loguje się przez WebSocket
+tak jak przeglądarka i mierzy czas od wysłania kliknięcia do końca
+przeładowania (ostatni komunikat script_finished) oraz ilość danych
+wysłanych przez serwer dla interakcji w różnych obszarach strony:
+notatkach, liście plików, filtrach, podglądzie danych i wykresach.
+Klient wysyła fragment_id widżetu, tak jak frontend, więc przy skrypcie
+z fragmentami mierzony jest przebieg samego fragmentu.
+
+Porównanie z wersją bez fragmentów (z katalogu repozytorium):
+    git show <commit>:script.py > /tmp/script_old.py
+    python benchmarks/bench_reruns.py --script /tmp/script_old.py
+    python benchmarks/bench_reruns.py
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+import numpy as np  # noqa: E402
+from streamlit.proto.BackMsg_pb2 import BackMsg  # noqa: E402
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg  # noqa: E402
+from websockets.sync.client import connect  # noqa: E402
+
+FINISHED = (ForwardMsg.FINISHED_SUCCESSFULLY, ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY)
+
+
+def make_csv(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    lines = [b"kategoria,ilosc,cena,wartosc"]
+    cats = rng.integers(0, 50, size=rows)
+    qty = rng.integers(1, 100, size=rows)
+    price = rng.normal(100, 20, size=rows).round(2)
+    for c, q, p in zip(cats, qty, price):
+        lines.append(f"k{c},{q},{p},{q * p:.2f}".encode())
+    return b"\n".join(lines) + b"\n"
+
+
+def prepare_db(path, rows, notes):
+    os.environ["NOTES_DB"] = path
+    import data
+    import db
+    import file_tables
+    db.init_db()
+    data.register_user("bench", "haslo")
+    user_id = data.login_user("bench", "haslo")
+    for i in range(notes):
+        data.add_note(user_id, f"Notatka {i}: raport kwartalny, dostawa i magazyn")
+    ok, message = data.save_file(user_id, "dane.csv", make_csv(rows))
+    if not ok:
+        raise RuntimeError(message)
+    db.configure()
+    # Plik DuckDB może mieć otwarty tylko jeden proces - oddajemy go serwerowi
+    file_tables.close()
+
+
+class AppClient:
+    # Minimalny klient protokołu Streamlit (BackMsg/ForwardMsg przez WebSocket)
+    def __init__(self, ws):
+        self.ws = ws
+        # id widżetu -> (etykieta, fragment_id) z ostatnich przebiegów
+        self.widgets = {}
+        # Bajty odebrane od serwera w ostatnim przebiegu
+        self.received = 0
+
+    def rerun(self, states=(), fragment_id=""):
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        msg.rerun_script.fragment_id = fragment_id
+        msg.rerun_script.widget_states.widgets.extend(states)
+        start = time.perf_counter()
+        self.received = 0
+        self.ws.send(msg.SerializeToString())
+        while True:
+            payload = self.ws.recv()
+            self.received += len(payload)
+            forward = ForwardMsg()
+            forward.ParseFromString(payload)
+            kind = forward.WhichOneof("type")
+            if kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                element = forward.delta.new_element
+                widget = getattr(element, element.WhichOneof("type"))
+                if getattr(widget, "id", ""):
+                    self.widgets[widget.id] = (getattr(widget, "label", ""), forward.delta.fragment_id)
+            elif kind == "script_finished" and forward.script_finished in FINISHED:
+                return time.perf_counter() - start
+
+    def find(self, key):
+        # Widżet po kluczu (id kończy się na "-<key>") albo po etykiecie
+        for widget_id, (label, fragment_id) in reversed(list(self.widgets.items())):
+            if widget_id.endswith(f"-{key}") or label == key:
+                return widget_id, fragment_id
+        raise KeyError(key)
+
+    def click(self, key):
+        widget_id, fragment_id = self.find(key)
+        msg = BackMsg()
+        state = msg.rerun_script.widget_states.widgets.add()
+        state.id = widget_id
+        state.trigger_value = True
+        return self.rerun([state], fragment_id)
+
+    def select(self, key, value):
+        widget_id, fragment_id = self.find(key)
+        msg = BackMsg()
+        state = msg.rerun_script.widget_states.widgets.add()
+        state.id = widget_id
+        state.string_value = value
+        return self.rerun([state], fragment_id)
+
+    def login(self, username, password):
+        self.rerun()
+        states = []
+        msg = BackMsg()
+        for key, value in (("Login", username), ("Hasło", password)):
+            state = msg.rerun_script.widget_states.widgets.add()
+            state.id, _ = self.find(key)
+            state.string_value = value
+            states.append(state)
+        state = msg.rerun_script.widget_states.widgets.add()
+        state.id, _ = self.find("Zaloguj")
+        state.trigger_value = True
+        states.append(state)
+        # Pola logowania znikają po zalogowaniu
+        self.rerun(states)
+        self.widgets.clear()
+        self.rerun()
+
+
+def interactions(client, note_id, file_id):
+    # (nazwa, akcja tam, akcja z powrotem) - obie mierzone
+    return [
+        ("notatki: edycja / anuluj",
+         lambda: client.click(f"edit_btn_{note_id}"), lambda: client.click(f"cancel_{note_id}")),
+        ("pliki: zmień nazwę / anuluj",
+         lambda: client.click(f"rename_file_{file_id}"), lambda: client.click(f"cancel_rename_{file_id}")),
+        ("analiza: dodaj / usuń warunek",
+         lambda: client.click("➕ Dodaj warunek"), lambda: client.click("➖ Usuń ostatni warunek")),
+        ("podgląd: sortowanie / bez",
+         lambda: client.select(f"preview_{file_id}_sort", "cena"),
+         lambda: client.select(f"preview_{file_id}_sort", "(kolejność w pliku)")),
+        ("wykres: zmiana kolumny",
+         lambda: client.select("Kolumna numeryczna", "cena"), lambda: client.select("Kolumna numeryczna", "ilosc")),
+    ]
+
+
+def wait_for_server(port, process, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Serwer Streamlit zakończył działanie")
+        try:
+            urllib.request.urlopen(f"http://localhost:{port}/_stcore/health")
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("Serwer Streamlit nie wystartował")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--script", default=os.path.join(REPO, "script.py"))
+    parser.add_argument("--rows", type=int, default=200_000, help="liczba wierszy pliku CSV")
+    parser.add_argument("--notes", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8599)
+    parser.add_argument("--json", help="zapisz wyniki do pliku JSON")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    db_path = os.path.join(tmp, "notes.db")
+    prepare_db(db_path, args.rows, args.notes)
+    env = dict(os.environ, NOTES_DB=db_path, PYTHONPATH=REPO, MAINTENANCE_INTERVAL="0")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", os.path.abspath(args.script),
+         "--server.headless", "true", "--server.port", str(args.port),
+         "--browser.gatherUsageStats", "false"],
+        env=env, cwd=REPO, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    results = []
+    try:
+        wait_for_server(args.port, server)
+        with connect(f"ws://localhost:{args.port}/_stcore/stream", subprotocols=["streamlit"],
+                     origin=f"http://localhost:{args.port}", max_size=None) as ws:
+            client = AppClient(ws)
+            client.login("bench", "haslo")
+            # Pierwsze wczytanie strony wysyła całe duże elementy; kolejne
+            # przeładowania tylko ich hashe (przeglądarka trzyma je w cache)
+            kib = client.received / 1024
+            results.append({"interaction": "pierwsze wczytanie", "received_kib": kib})
+            print(f"{'pierwsze wczytanie':32} {'':11} {kib:10.1f} KiB")
+            # Pierwsze przeładowanie wczytuje plik do cache procesu
+            client.rerun()
+            full = [client.rerun() for _ in range(args.repeat)]
+            kib = client.received / 1024
+            results.append({"interaction": "całe przeładowanie", "median_ms": statistics.median(full) * 1000,
+                            "received_kib": kib})
+            print(f"{'całe przeładowanie':32} {statistics.median(full) * 1000:8.1f} ms {kib:10.1f} KiB")
+
+            note_id = int(client.find("✏️ Edytuj")[0].rsplit("_", 1)[1])
+            file_id = int(client.find("✏️ Zmień nazwę")[0].rsplit("_", 1)[1])
+            for name, forward, back in interactions(client, note_id, file_id):
+                times, received = [], []
+                for _ in range(args.repeat):
+                    times.append(forward())
+                    received.append(client.received)
+                    times.append(back())
+                    received.append(client.received)
+                median = statistics.median(times) * 1000
+                kib = statistics.median(received) / 1024
+                results.append({"interaction": name, "median_ms": median, "received_kib": kib})
+                print(f"{name:32} {median:8.1f} ms {kib:10.1f} KiB")
+    finally:
+        server.terminate()
+        server.wait()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"script": args.script, "rows": args.rows, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+"""Zestaw benchmarków warstwy danych i analizy na syntetycznych danych.
+
+Buduje tymczasową bazę o zadanej skali (użytkownicy, notatki na
+użytkownika, liczba odbiorców udostępnień) i pliki CSV o zadanych
+rozmiarach (od KB do GB), a następnie mierzy:
+  - funkcje data.py: register_user, login_user, get_notes,
+    get_shared_notes, get_shared_files, get_file_data_shared, save_file,
+  - kroki analizy każdego pliku: read_csv (samo pandas), wczytanie przez
+    aplikację (load_file_dataframe), describe, filtr i groupby - tą samą
+    ścieżką co aplikacja (w pamięci albo kawałkami / DuckDB dla dużych
+    plików, według CHUNKED_THRESHOLD_BYTES).
+Cache zapytań i ramek jest wyłączany / czyszczony, żeby mierzyć samą pracę.
+
+Wyniki (--json) zawierają commit i wersje bibliotek; --compare porównuje
+mediany z wcześniejszym plikiem wyników i kończy się kodem 1, gdy któryś
+pomiar jest wolniejszy o więcej niż --threshold.
+
+Uruchomienie (z katalogu repozytorium):
+    python benchmarks/bench_suite.py --users 1000 --notes-per-user 50 --csv-sizes 100KB 10MB 1GB --json wyniki.json
+    python benchmarks/bench_suite.py --compare wyniki.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import analysis  # noqa: E402
+import analysis_tasks  # noqa: E402
+import db  # noqa: E402
+import data  # noqa: E402
+import file_tables  # noqa: E402
+import filters  # noqa: E402
+from frame_cache import frame_cache  # noqa: E402
+from query_cache import query_cache  # noqa: E402
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+UNITS = {"B": 1, "KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+CATEGORIES = [f"kategoria_{i}" for i in range(20)]
+REGIONS = ["północ", "południe", "wschód", "zachód", "centrum"]
+# Wiersze CSV generowane naraz (plik powstaje kawałkami, więc może być większy niż pamięć)
+GENERATE_ROWS = 100_000
+
+
+def parse_size(text):
+    # "500", "100KB", "10M", "1.5GB" -> bajty
+    match = re.fullmatch(r"([\d.]+)\s*([KMG]?)B?", text.strip().upper())
+    if not match:
+        raise argparse.ArgumentTypeError(f"Nieprawidłowy rozmiar: {text}")
+    return int(float(match.group(1)) * UNITS[match.group(2) + "B"])
+
+
+def size_label(size):
+    for unit in ("GB", "MB", "KB"):
+        if size >= UNITS[unit] and size % UNITS[unit] == 0:
+            return f"{size // UNITS[unit]}{unit}"
+    return f"{size}B"
+
+
+# -------------------------------
+# Dane syntetyczne
+# -------------------------------
+def build_database(path, users, notes_per_user, fanout, seed):
+    # Użytkownicy user0..userN-1 (hasło "haslo"), każdy z notatkami i jednym
+    # małym plikiem; każdy udostępnia jedną notatkę i swój plik fanout
+    # losowym innym użytkownikom
+    rng = random.Random(seed)
+    db.configure(path=path)
+    db.init_db()
+    small_csv = make_csv_bytes(2000, seed)
+    with db.transaction() as conn:
+        conn.executemany("INSERT INTO users (username, password) VALUES (?, ?)",
+                         ((f"user{u}", "haslo") for u in range(users)))
+        conn.executemany(
+            "INSERT INTO notes (user_id, content) VALUES (?, ?)",
+            ((u + 1, f"Notatka {n} użytkownika {u}: raport sprzedaży za kwartał {n % 4 + 1}")
+             for u in range(users) for n in range(notes_per_user)),
+        )
+    # Pierwszy plik przez save_file (blob), pozostałe to wiersze files z tą samą zawartością
+    data.save_file(1, "plik0.csv", small_csv)
+    recipients = [[r for r in rng.sample(range(users), min(fanout + 1, users)) if r != u][:fanout]
+                  for u in range(users)]
+    with db.transaction() as conn:
+        content_hash = conn.execute("SELECT content_hash FROM files").fetchone()[0]
+        conn.executemany("INSERT INTO files (user_id, filename, content_hash) VALUES (?, ?, ?)",
+                         ((u + 1, f"plik{u}.csv", content_hash) for u in range(1, users)))
+        file_ids = dict(conn.execute("SELECT user_id, id FROM files"))
+        conn.executemany(
+            "INSERT INTO shared_files (file_id, shared_with_user_id) VALUES (?, ?)",
+            ((file_ids[u + 1], r + 1) for u in range(users) for r in recipients[u]),
+        )
+        conn.executemany(
+            "INSERT INTO shared_notes (note_id, shared_with_user_id) VALUES (?, ?)",
+            ((u * notes_per_user + 1, r + 1) for u in range(users) for r in recipients[u] if notes_per_user),
+        )
+
+
+def make_frame(rows, rng, start=0):
+    return pd.DataFrame({
+        "id": np.arange(start, start + rows),
+        "kategoria": rng.choice(CATEGORIES, rows),
+        "region": rng.choice(REGIONS, rows),
+        "ilosc": rng.integers(1, 1000, rows),
+        "cena": np.round(rng.gamma(2.0, 50.0, rows), 2),
+        "rabat": np.where(rng.random(rows) < 0.05, np.nan, np.round(rng.random(rows) * 0.3, 3)),
+    })
+
+
+def make_csv_bytes(rows, seed):
+    return make_frame(rows, np.random.default_rng(seed)).to_csv(index=False).encode()
+
+
+def write_csv(path, size, seed):
+    # Plik CSV o rozmiarze około size bajtów, pisany kawałkami
+    rng = np.random.default_rng(seed)
+    sample = make_frame(1000, np.random.default_rng(seed)).to_csv(index=False).encode()
+    rows = max(1, int(size / (len(sample) / 1000)))
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for start in range(0, rows, GENERATE_ROWS):
+            make_frame(min(GENERATE_ROWS, rows - start), rng, start).to_csv(f, index=False, header=(start == 0))
+    return rows
+
+
+# -------------------------------
+# Pomiary
+# -------------------------------
+def timed(results, name, fn, repeat, setup=None):
+    times = []
+    for i in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn(i)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    results[name] = {
+        "n": len(times),
+        "min_ms": times[0] * 1000,
+        "median_ms": statistics.median(times) * 1000,
+        "mean_ms": statistics.fmean(times) * 1000,
+        "p95_ms": times[min(int(0.95 * len(times)), len(times) - 1)] * 1000,
+    }
+    print(f"{name:<40} median={results[name]['median_ms']:10.2f} ms  "
+          f"min={results[name]['min_ms']:10.2f} ms  (n={len(times)})")
+
+
+def bench_data(args, results, users):
+    rng = random.Random(args.seed)
+    user_ids = [rng.randint(1, users) for _ in range(args.calls)]
+    with db.connection() as conn:
+        shares = conn.execute("SELECT file_id, shared_with_user_id FROM shared_files").fetchall()
+    shared = [rng.choice(shares) for _ in range(args.calls)] if shares else []
+    small_csv = make_csv_bytes(2000, args.seed + 1)
+
+    timed(results, "data.register_user", lambda i: data.register_user(f"nowy{i}", "haslo"), args.calls)
+    timed(results, "data.login_user", lambda i: data.login_user(f"user{user_ids[i] - 1}", "haslo"), args.calls)
+    timed(results, "data.get_notes", lambda i: data.get_notes(user_ids[i]), args.calls)
+    timed(results, "data.get_shared_notes", lambda i: data.get_shared_notes(user_ids[i]), args.calls)
+    timed(results, "data.get_shared_files", lambda i: data.get_shared_files(user_ids[i]), args.calls)
+    if shared:
+        timed(results, "data.get_file_data_shared", lambda i: data.get_file_data_shared(*shared[i]), args.calls)
+    # Nowa zawartość przy każdym zapisie (inaczej blob_store pomija kompresję i zapis danych)
+    timed(results, "data.save_file",
+          lambda i: data.save_file(user_ids[i], f"zapis{i}.csv", small_csv + f"{i},x,y,1,1.0,0.1\n".encode()),
+          min(args.calls, 50))
+
+
+def bench_file(args, results, tmp, size, user_id):
+    label = f"csv_{size_label(size)}"
+    path = os.path.join(tmp, f"{label}.csv")
+    rows = write_csv(path, size, args.seed)
+    actual = os.path.getsize(path)
+    print(f"-- {label}: {rows} wierszy, {actual / 1024 ** 2:.1f} MiB "
+          f"({'kawałkami' if analysis.is_large(actual) else 'w pamięci'})")
+
+    timed(results, f"{label}.read_csv", lambda i: pd.read_csv(path), args.repeat)
+    file_ids = []
+
+    def save(i):
+        with open(path, "rb") as f:
+            ok, message = data.save_file(user_id, f"{label}_{i}.csv", f)
+        if not ok:
+            raise RuntimeError(message)
+        with db.connection() as conn:
+            file_ids.append(conn.execute("SELECT id FROM files WHERE user_id = ? AND filename = ?",
+                                         (user_id, f"{label}_{i}.csv")).fetchone()[0])
+    # Jeden zapis: kolejne z tą samą zawartością pomijałyby kompresję i zapis bloba
+    timed(results, f"{label}.save_file", save, 1)
+    file_id = file_ids[0]
+
+    timed(results, f"{label}.load_file_dataframe", lambda i: data.load_file_dataframe(file_id, user_id),
+          args.repeat, setup=frame_cache.clear)
+    source, _ = analysis_tasks.open_source(file_id, user_id)
+    where = filters.build_filter([filters.isin("kategoria", CATEGORIES[:5]), filters.between("cena", 20, 200)])
+
+    def filtered_rows(i):
+        return sum(len(frame) for frame in analysis.filtered_frames(source, where))
+    timed(results, f"{label}.describe", lambda i: analysis.describe(source), args.repeat)
+    timed(results, f"{label}.filter", filtered_rows, args.repeat)
+    timed(results, f"{label}.groupby",
+          lambda i: analysis.groupby_agg(source, "kategoria", "cena", "mean", where), args.repeat)
+    os.remove(path)
+    return {"label": label, "bytes": actual, "rows": rows, "large": analysis.is_large(actual),
+            "duckdb": getattr(source, "table", None) is not None}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline_path, report, threshold):
+    # Zwraca listę pomiarów wolniejszych niż baseline o więcej niż threshold
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    results = report["results"]
+    print(f"\nPorównanie z {baseline_path} (commit {baseline.get('commit') or '?'}):")
+    if baseline.get("config") != report["config"]:
+        print("Uwaga: inna konfiguracja niż w pliku porównania - wyniki mogą nie być porównywalne")
+    regressions = []
+    for name, result in results.items():
+        old = baseline["results"].get(name)
+        if old is None or not old["median_ms"]:
+            continue
+        ratio = result["median_ms"] / old["median_ms"]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  <-- REGRESJA"
+            regressions.append(name)
+        print(f"{name:<40} {old['median_ms']:10.2f} -> {result['median_ms']:10.2f} ms  x{ratio:5.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--notes-per-user", type=int, default=50)
+    parser.add_argument("--share-fanout", type=int, default=5,
+                        help="ilu użytkownikom każdy udostępnia notatkę i plik")
+    parser.add_argument("--csv-sizes", type=parse_size, nargs="*", default=[100 * 1024, 10 * 1024 ** 2],
+                        help="rozmiary plików CSV, np. 100KB 10MB 1GB")
+    parser.add_argument("--calls", type=int, default=200, help="wywołań każdej funkcji data.py")
+    parser.add_argument("--repeat", type=int, default=3, help="powtórzeń każdego kroku analizy")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="zapisz wyniki do pliku JSON")
+    parser.add_argument("--compare", help="plik JSON z wcześniejszymi wynikami do porównania")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="względny wzrost mediany uznawany za regresję (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    # Mierzymy samą pracę, a nie trafienia w cache
+    query_cache.max_entries = 0
+    query_cache.clear()
+    tmp = tempfile.mkdtemp()
+    results, files = {}, []
+    try:
+        start = time.perf_counter()
+        build_database(os.path.join(tmp, "notes.db"), args.users, args.notes_per_user, args.share_fanout, args.seed)
+        print(f"Baza: {args.users} użytkowników, {args.users * args.notes_per_user} notatek, "
+              f"fan-out {args.share_fanout} ({time.perf_counter() - start:.1f} s)")
+        bench_data(args, results, args.users)
+        for size in args.csv_sizes:
+            files.append(bench_file(args, results, tmp, size, user_id=1))
+    finally:
+        file_tables.close()
+        db.configure()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "cpus": os.cpu_count(),
+        "config": {"users": args.users, "notes_per_user": args.notes_per_user, "share_fanout": args.share_fanout,
+                   "calls": args.calls, "repeat": args.repeat, "seed": args.seed,
+                   "chunked_threshold_bytes": analysis.CHUNKED_THRESHOLD_BYTES, "file_tables": file_tables.ENABLED},
+        "files": files,
+        "results": results,
+    }
+    # Porównanie przed zapisem (--json i --compare mogą wskazywać ten sam plik)
+    regressions = compare(args.compare, report, args.threshold) if args.compare else []
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
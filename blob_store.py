@@ -0,0 +1,162 @@
+import gzip
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import zlib
+from contextlib import contextmanager
+
+import timing
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# -------------------------------
+# Magazyn zawartości plików (adresowany hashem, kompresowany)
+# -------------------------------
+# Zawartość pliku CSV trzymamy raz w tabeli blobs pod kluczem SHA-256,
+# a files.content_hash na nią wskazuje. ref_count utrzymują wyzwalacze na
+# files (migrations.blob_store): usunięcie ostatniego pliku usuwa zawartość.
+# Kompresja: zstd, gdy jest pakiet zstandard, inaczej gzip; zawartość,
+# której kompresja nie zmniejsza, zapisujemy bez zmian ("raw").
+# Zapis i odczyt idą kawałkami (Connection.blobopen), więc pamięć nie
+# rośnie z rozmiarem pliku.
+CODEC = "zstd" if zstandard is not None else "gzip"
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 6
+CHUNK_SIZE = 1024 * 1024
+# Skompresowana zawartość do tego rozmiaru czeka na zapis w pamięci, większa w pliku tymczasowym
+SPOOL_MEMORY = int(os.environ.get("BLOB_SPOOL_MEMORY", str(8 * 1024 * 1024)))
+
+
+class BlobReader(io.RawIOBase):
+    # Plikopodobny widok na sqlite3.Blob (pandas/pyarrow czytają go kawałkami)
+    def __init__(self, blob):
+        self._blob = blob
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        with timing.section("blob", "blob_read"):
+            data = self._blob.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        self._blob.seek(offset, whence)
+        return self._blob.tell()
+
+    def tell(self):
+        return self._blob.tell()
+
+    def close(self):
+        if not self.closed:
+            self._blob.close()
+        super().close()
+
+
+def _chunks(source):
+    return iter(lambda: source.read(CHUNK_SIZE), b"")
+
+
+def hash_stream(source):
+    # SHA-256 zawartości strumienia; strumień wraca na początek
+    digest = hashlib.sha256()
+    for chunk in _chunks(source):
+        digest.update(chunk)
+    source.seek(0)
+    return digest.hexdigest()
+
+
+def _compressor():
+    if CODEC == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    # wbits=31: format gzip (czytany przez gzip.GzipFile)
+    return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+
+class SpooledContent:
+    # Skompresowana zawartość gotowa do zapisu w bazie (poza transakcją)
+    def __init__(self, source):
+        self.size = 0
+        self.codec = CODEC
+        self.file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY)
+        compressor = _compressor()
+        for chunk in _chunks(source):
+            self.size += len(chunk)
+            self.file.write(compressor.compress(chunk))
+        self.file.write(compressor.flush())
+        if self.file.tell() >= self.size:
+            # Kompresja nie pomaga - zapisujemy oryginał
+            self.codec = "raw"
+            self.file.seek(0)
+            self.file.truncate()
+            source.seek(0)
+            shutil.copyfileobj(source, self.file, CHUNK_SIZE)
+        self.stored_size = self.file.tell()
+        self.file.seek(0)
+        source.seek(0)
+
+    def close(self):
+        self.file.close()
+
+
+def exists(conn, hash_):
+    return conn.execute("SELECT 1 FROM blobs WHERE hash = ?", (hash_,)).fetchone() is not None
+
+
+def put(conn, hash_, source, spooled=None):
+    # Zapisuje zawartość strumienia source (jeśli jeszcze jej nie ma).
+    # spooled: SpooledContent(source) przygotowany wcześniej, poza transakcją.
+    # ref_count zwiększa dopiero wstawienie wiersza do files.
+    if exists(conn, hash_):
+        return
+    own = spooled is None
+    if own:
+        spooled = SpooledContent(source)
+    try:
+        cur = conn.execute("INSERT INTO blobs (hash, codec, size, data, ref_count) VALUES (?, ?, ?, zeroblob(?), 0)",
+                           (hash_, spooled.codec, spooled.size, spooled.stored_size))
+        with conn.blobopen("blobs", "data", cur.lastrowid) as blob:
+            for chunk in _chunks(spooled.file):
+                blob.write(chunk)
+    finally:
+        if own:
+            spooled.close()
+
+
+@contextmanager
+def open_content(conn, hash_):
+    # Strumień zdekompresowanej zawartości (None, gdy jej nie ma)
+    result = conn.execute("SELECT rowid, codec FROM blobs WHERE hash = ?", (hash_,)).fetchone()
+    if result is None:
+        yield None
+        return
+    rowid, codec = result
+    raw = io.BufferedReader(BlobReader(conn.blobopen("blobs", "data", rowid, readonly=True)), CHUNK_SIZE)
+    try:
+        if codec == "raw":
+            yield raw
+        elif codec == "gzip":
+            yield io.BufferedReader(gzip.GzipFile(fileobj=raw, mode="rb"), CHUNK_SIZE)
+        elif codec == "zstd":
+            yield io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(raw), CHUNK_SIZE)
+        else:
+            raise ValueError(f"Nieznany kodek: {codec}")
+    finally:
+        raw.close()
+
+
+def stats(conn):
+    # (liczba zawartości, rozmiar po rozpakowaniu, rozmiar zapisany, liczba odwołań)
+    return conn.execute(
+        "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(length(data)), 0), COALESCE(SUM(ref_count), 0) "
+        "FROM blobs"
+    ).fetchone()
@@ -0,0 +1,89 @@
+import math
+import os
+
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+
+import analysis
+
+# -------------------------------
+# Przygotowanie wykresów po stronie serwera
+# -------------------------------
+# Do przeglądarki trafiają tylko dane zagregowane: przedziały histogramu,
+# najwyżej MAX_POINTS punktów (powyżej - mapa gęstości z siatki
+# DENSITY_BINS x DENSITY_BINS) i najwyżej MAX_BARS słupków
+HISTOGRAM_BINS = 50
+MAX_POINTS = int(os.environ.get("CHART_MAX_POINTS", "5000"))
+DENSITY_BINS = 100
+MAX_BARS = 50
+
+
+def _data_range(frame, col, where=None):
+    values = frame[col] if where is None else frame[col][where(frame)]
+    values = values.to_numpy(dtype="float64", na_value=np.nan)
+    values = values[~np.isnan(values)]
+    return (float(values.min()), float(values.max())) if len(values) else None
+
+
+def _valid_range(value_range):
+    # Kolumna bez wartości (albo profil bez min/max): dowolny niepusty zakres
+    if value_range is None or any(v is None or math.isnan(v) for v in value_range):
+        return (0.0, 1.0)
+    return (float(value_range[0]), float(value_range[1]))
+
+
+def _centers(edges):
+    return (edges[:-1] + edges[1:]) / 2
+
+
+def histogram_data(source, col, value_range=None, where=None, bins=HISTOGRAM_BINS):
+    # value_range można pominąć dla DataFrame (liczony z przefiltrowanych danych); dla
+    # ChunkedSource podajemy min/max z profilu, żeby nie czytać pliku dwa razy.
+    # Zwraca (liczności, krawędzie przedziałów)
+    if value_range is None:
+        value_range = _data_range(source, col, where)
+    return analysis.histogram(source, col, bins, _valid_range(value_range), where)
+
+
+def histogram_figure(col, counts, edges, errors=None):
+    # errors: połowy przedziałów ufności liczności (tryb przybliżony)
+    fig = px.bar(x=_centers(edges), y=counts, error_y=errors, labels={"x": col, "y": "count"})
+    fig.update_traces(width=edges[1] - edges[0])
+    fig.update_layout(bargap=0)
+    return fig
+
+
+def scatter_data(source, x, y, ranges=None, where=None, max_points=MAX_POINTS, bins=DENSITY_BINS):
+    # Zwraca (punkty, None) albo (None, (liczności, krawędzie x, krawędzie y)) jak analysis.scatter_points
+    if ranges is None:
+        ranges = (_data_range(source, x, where), _data_range(source, y, where))
+    ranges = (_valid_range(ranges[0]), _valid_range(ranges[1]))
+    return analysis.scatter_points(source, x, y, max_points, ranges, bins, where)
+
+
+def scatter_figure(x, y, points, density):
+    # Zwraca (wykres, podpis); podpis jest None, gdy pokazujemy wszystkie punkty
+    if points is not None:
+        return px.scatter(points, x=x, y=y), None
+
+    counts, edges_x, edges_y = density
+    # Puste komórki przezroczyste zamiast w kolorze zera
+    z = np.where(counts.T > 0, counts.T, np.nan)
+    fig = go.Figure(go.Heatmap(x=_centers(edges_x), y=_centers(edges_y), z=z,
+                               colorscale="Viridis", colorbar={"title": "liczba punktów"}))
+    fig.update_layout(xaxis_title=x, yaxis_title=y)
+    bins = len(edges_x) - 1
+    caption = f"{int(counts.sum())} punktów – pokazano gęstość w siatce {bins}×{bins}"
+    return fig, caption
+
+
+def bar_figure(frame, x, y, max_bars=MAX_BARS, error=None):
+    # Zwraca (wykres, podpis); przy wielu kategoriach zostawia max_bars
+    # o największych (co do modułu) wartościach, w dotychczasowej kolejności.
+    # error: kolumna z połowami przedziałów ufności (słupki błędów)
+    caption = None
+    if len(frame) > max_bars:
+        caption = f"Pokazano {max_bars} z {len(frame)} kategorii (największe wartości)"
+        frame = frame.loc[frame[y].abs().nlargest(max_bars).index].sort_index()
+    return px.bar(frame, x=x, y=y, error_y=error), caption
@@ -0,0 +1,76 @@
+import io
+import json
+
+import pandas as pd
+
+# -------------------------------
+# Profil kolumn pliku (liczony raz przy zapisie)
+# -------------------------------
+QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+TOP_K = 20
+# Do tylu różnych wartości zapamiętujemy pełną listę (opcje filtra)
+MAX_VALUES = 1000
+
+
+def _plain(value):
+    # Typy numpy -> typy JSON
+    return value.item() if hasattr(value, "item") else value
+
+
+def build_profile(df):
+    numeric_cols = set(df.select_dtypes(include='number').columns)
+    object_cols = set(df.select_dtypes(include='object').columns)
+    columns = []
+    for col in df.columns:
+        values = df[col]
+        stats = {
+            "name": col,
+            "dtype": str(values.dtype),
+            "kind": "number" if col in numeric_cols else "object" if col in object_cols else "other",
+            "count": int(values.count()),
+            "nulls": int(values.isna().sum()),
+            "distinct": int(values.nunique()),
+        }
+        if col not in object_cols:
+            # Zakres dla suwaka filtra
+            stats["min"] = _plain(values.min())
+            stats["max"] = _plain(values.max())
+        if col in numeric_cols:
+            quantiles = values.quantile(list(QUANTILES))
+            stats["quantiles"] = {str(q): _plain(v) for q, v in quantiles.items()}
+        counts = values.value_counts().head(TOP_K)
+        stats["top"] = [[_plain(v), int(c)] for v, c in counts.items()]
+        unique = values.unique()
+        stats["values"] = [_plain(v) for v in unique[:MAX_VALUES]]
+        stats["values_truncated"] = len(unique) > MAX_VALUES
+        columns.append(stats)
+
+    return {
+        "rows": len(df),
+        "columns": columns,
+        # Dokładnie to, co pokazywało df.describe()
+        "describe": df.describe().to_json(orient="split", double_precision=15),
+    }
+
+
+def dumps(profile):
+    return json.dumps(profile)
+
+
+def loads(data):
+    return json.loads(data)
+
+
+def describe_frame(profile):
+    return pd.read_json(io.StringIO(profile["describe"]), orient="split")
+
+
+def column_stats(profile, col):
+    for stats in profile["columns"]:
+        if stats["name"] == col:
+            return stats
+    raise KeyError(col)
+
+
+def columns_of_kind(profile, kind):
+    return [stats["name"] for stats in profile["columns"] if stats["kind"] == kind]
@@ -0,0 +1,35 @@
+import io
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+import frame_dtypes
+
+# -------------------------------
+# Kolumnowa kopia plików CSV (Parquet)
+# -------------------------------
+FORMAT = "parquet"
+
+
+def to_columnar(df):
+    # Zapisuje DataFrame wczytany przez pd.read_csv, więc typy kolumn są
+    # takie same jak przy bezpośrednim czytaniu CSV
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, index=False)
+    return buffer.getvalue()
+
+
+def iter_columnar(source, chunk_rows, columns=None):
+    # Kopia kolumnowa kawałkami po chunk_rows wierszy (typy jak z pd.read_csv)
+    for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_rows, columns=columns):
+        yield batch.to_pandas()
+
+
+def read_columnar(source, columns=None, dtypes=None):
+    # source: bajty albo plik binarny z możliwością przewijania;
+    # dtypes: {kolumna: typ} z frame_dtypes.plan
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    if dtypes:
+        return frame_dtypes.read_arrow(pq.read_table(source, columns=columns), dtypes)
+    return pd.read_parquet(source, columns=columns)
@@ -0,0 +1,597 @@
+import io
+import re
+import sqlite3
+from contextlib import contextmanager
+import pandas as pd
+
+import blob_store
+import column_profile
+import file_tables
+import frame_dtypes
+from artifacts import build_artifacts, store_artifacts, delete_artifacts, discard_artifacts
+from columnar import read_columnar
+from db import connection, transaction, open_blob
+from filters import mask_cache
+from frame_cache import frame_cache, frame_size
+from query_cache import cached, query_cache
+from timing import timed
+
+# -------------------------------
+# Tagi cache zapytań (query_cache)
+# -------------------------------
+# ("user", nazwa)         - istnienie użytkownika / jego id
+# ("notes", user_id)      - notatki użytkownika
+# ("shared_notes", user_id) - notatki udostępnione użytkownikowi
+# ("files", user_id)      - pliki użytkownika
+# ("shared_files", user_id) - pliki udostępnione użytkownikowi
+# ("file", file_id)       - dostęp do pliku i jego metadane
+def _recipient_tags(conn, kind, ids_sql, params):
+    # Tagi list udostępnień odbiorców notatek/plików (kind: "notes" | "files")
+    return [(f"shared_{kind}", row[0]) for row in conn.execute(
+        f"SELECT DISTINCT shared_with_user_id FROM shared_{kind} WHERE {kind[:-1]}_id IN ({ids_sql})", params)]
+
+# -------------------------------
+# Funkcje użytkownika
+# -------------------------------
+@timed("sqlite")
+def register_user(username, password):
+    try:
+        with transaction() as conn:
+            conn.execute("INSERT INTO users (username, password) VALUES (?, ?)", (username, password))
+    except sqlite3.IntegrityError:
+        return False
+    query_cache.invalidate(("user", username))
+    return True
+
+@timed("sqlite")
+def login_user(username, password):
+    with connection() as conn:
+        user = conn.execute("SELECT id FROM users WHERE username = ? AND password = ?",
+                            (username, password)).fetchone()
+    return user[0] if user else None
+
+@timed("sqlite")
+def delete_account(user_id):
+    try:
+        with transaction() as c:
+            file_ids = [row[0] for row in c.execute("SELECT id FROM files WHERE user_id = ?", (user_id,))]
+            username = c.execute("SELECT username FROM users WHERE id = ?", (user_id,)).fetchone()
+            tags = [("notes", user_id), ("shared_notes", user_id), ("files", user_id), ("shared_files", user_id),
+                    *(("file", file_id) for file_id in file_ids),
+                    *_recipient_tags(c, "notes", "SELECT id FROM notes WHERE user_id = ?", (user_id,)),
+                    *_recipient_tags(c, "files", "SELECT id FROM files WHERE user_id = ?", (user_id,))]
+            if username is not None:
+                tags.append(("user", username[0]))
+            # Artefakty poza SQLite (tabele DuckDB) usuwamy sami, przed kaskadą
+            delete_artifacts(c, "SELECT id FROM files WHERE user_id = ?", (user_id,))
+            # Pliki, notatki i wszystkie udostępnienia (także cudzych notatek
+            # i plików temu użytkownikowi) usuwa ON DELETE CASCADE
+            c.execute("DELETE FROM users WHERE id = ?", (user_id,))
+        for file_id in file_ids:
+            frame_cache.invalidate(file_id)
+            mask_cache.invalidate(file_id)
+        query_cache.invalidate(*tags)
+        return True, "Konto zostało usunięte"
+    except Exception as e:
+        return False, f"Błąd podczas usuwania konta: {str(e)}"
+
+@timed("sqlite")
+def get_all_users():
+    with connection() as conn:
+        rows = conn.execute("SELECT username FROM users ORDER BY username").fetchall()
+    return [row[0] for row in rows]
+
+@timed("sqlite")
+@cached(lambda username: [("user", username)])
+def get_user_id(username):
+    with connection() as conn:
+        user = conn.execute("SELECT id FROM users WHERE username = ?", (username,)).fetchone()
+    return user[0] if user else None
+
+@timed("sqlite")
+def check_user_exists(username):
+    return get_user_id(username) is not None
+
+# -------------------------------
+# Notatki
+# -------------------------------
+@timed("sqlite")
+def add_note(user_id, content):
+    with transaction() as conn:
+        conn.execute("INSERT INTO notes (user_id, content) VALUES (?, ?)", (user_id, content))
+    query_cache.invalidate(("notes", user_id))
+
+@timed("sqlite")
+def edit_note(note_id, user_id, new_content):
+    with transaction() as conn:
+        c = conn.execute("UPDATE notes SET content = ? WHERE id = ? AND user_id = ?",
+                         (new_content, note_id, user_id))
+        success = c.rowcount > 0
+        # Treść widzą też odbiorcy udostępnionej notatki
+        tags = _recipient_tags(conn, "notes", "?", (note_id,)) if success else []
+    if success:
+        query_cache.invalidate(("notes", user_id), *tags)
+    return success
+
+@timed("sqlite")
+@cached(lambda user_id: [("notes", user_id)])
+def get_notes(user_id):
+    with connection() as conn:
+        return conn.execute("SELECT id, content, timestamp FROM notes WHERE user_id = ? ORDER BY timestamp DESC",
+                            (user_id,)).fetchall()
+
+# Kolejność: (ORDER BY, warunek kursora, klucz kursora z wiersza id, content, timestamp)
+NOTE_ORDERS = {
+    "newest": ("timestamp DESC, id DESC", "(timestamp, id) < (?, ?)", lambda row: (row[2], row[0])),
+    "oldest": ("timestamp ASC, id ASC", "(timestamp, id) > (?, ?)", lambda row: (row[2], row[0])),
+    # COLLATE po stronie parametru, inaczej SQLite nie zawęża indeksu do zakresu za kursorem
+    "alpha": ("content COLLATE NOCASE ASC, id ASC", "(content, id) > (? COLLATE NOCASE, ?)",
+              lambda row: (row[1], row[0])),
+}
+
+@timed("sqlite")
+@cached(lambda user_id, *_: [("notes", user_id)])
+def get_notes_page(user_id, order="newest", after=None, limit=20):
+    # Stronicowanie kluczem (keyset): after to kursor zwrócony z poprzedniej
+    # strony, więc kolejne strony nie przeglądają pominiętych wierszy jak OFFSET.
+    # Zwraca (notatki, kursor następnej strony lub None).
+    order_by, after_clause, cursor_key = NOTE_ORDERS[order]
+    where, params = "user_id = ?", [user_id]
+    if after is not None:
+        where += f" AND {after_clause}"
+        params.extend(after)
+    with connection() as conn:
+        rows = conn.execute(f"SELECT id, content, timestamp FROM notes WHERE {where} ORDER BY {order_by} LIMIT ?",
+                            params + [limit + 1]).fetchall()
+    if len(rows) > limit:
+        return rows[:limit], cursor_key(rows[limit - 1])
+    return rows, None
+
+@timed("sqlite")
+def delete_note(note_id, user_id):
+    with transaction() as c:
+        tags = _recipient_tags(c, "notes", "SELECT id FROM notes WHERE id = ? AND user_id = ?", (note_id, user_id))
+        # Udostępnienia notatki usuwa ON DELETE CASCADE
+        c.execute("DELETE FROM notes WHERE id = ? AND user_id = ?", (note_id, user_id))
+    query_cache.invalidate(("notes", user_id), *tags)
+
+def _fts_query(search_term):
+    # Każde słowo jako fraza z dopasowaniem prefiksu: "sło"* - cudzysłowy
+    # chronią przed interpretacją operatorów FTS5 (AND, NEAR, -, :) z tekstu użytkownika
+    words = re.findall(r"\w+", search_term)
+    return " ".join(f'"{word}"*' for word in words)
+
+@timed("sqlite")
+@cached(lambda user_id, *_: [("notes", user_id), ("shared_notes", user_id)])
+def search_notes(user_id, search_term, limit=100):
+    # Szuka we własnych notatkach i w notatkach udostępnionych użytkownikowi.
+    # Wyniki od najlepiej dopasowanych (bm25), z fragmentem treści,
+    # w którym trafienia są pogrubione w Markdown.
+    query = _fts_query(search_term)
+    if not query:
+        return []
+    with connection() as conn:
+        return conn.execute('''
+            SELECT n.id, n.content, n.timestamp, u.username, n.user_id,
+                   snippet(notes_fts, 0, '**', '**', '…', 16) AS snippet
+            FROM notes_fts
+            JOIN notes n ON n.id = notes_fts.rowid
+            JOIN users u ON u.id = n.user_id
+            WHERE notes_fts MATCH ?
+              AND (n.user_id = ?
+                   OR n.id IN (SELECT note_id FROM shared_notes WHERE shared_with_user_id = ?))
+            ORDER BY rank
+            LIMIT ?
+        ''', (query, user_id, user_id, limit)).fetchall()
+
+# -------------------------------
+# Udostępnianie notatek
+# -------------------------------
+@timed("sqlite")
+def share_note_with_user(note_id, user_id, target_username):
+    # Id użytkownika docelowego z cache (zwykle sprawdzone już przez check_user_exists)
+    target_user_id = get_user_id(target_username)
+    if target_user_id is None:
+        return False, "Nie znaleziono użytkownika"
+    with transaction() as c:
+
+        # Sprawdź czy notatka należy do aktualnego użytkownika
+        owner = c.execute("SELECT user_id FROM notes WHERE id = ?", (note_id,)).fetchone()
+        if not owner or owner[0] != user_id:
+            return False, "Brak dostępu do notatki"
+
+        # Sprawdź, czy już nie udostępniono
+        if c.execute("SELECT id FROM shared_notes WHERE note_id = ? AND shared_with_user_id = ?",
+                     (note_id, target_user_id)).fetchone():
+            return False, "Notatka jest już udostępniona temu użytkownikowi"
+
+        try:
+            c.execute("INSERT INTO shared_notes (note_id, shared_with_user_id) VALUES (?, ?)",
+                      (note_id, target_user_id))
+        except sqlite3.IntegrityError:
+            # Użytkownik usunięty w innym procesie (klucz obcy)
+            return False, "Nie znaleziono użytkownika"
+    query_cache.invalidate(("shared_notes", target_user_id))
+    return True, "Notatka udostępniona"
+
+@timed("sqlite")
+@cached(lambda user_id: [("shared_notes", user_id)])
+def get_shared_notes(user_id):
+    with connection() as conn:
+        return conn.execute('''
+            SELECT n.id, n.content, n.timestamp, u.username
+            FROM notes n
+            JOIN shared_notes s ON n.id = s.note_id
+            JOIN users u ON n.user_id = u.id
+            WHERE s.shared_with_user_id = ?
+            ORDER BY n.timestamp DESC
+        ''', (user_id,)).fetchall()
+
+# -------------------------------
+# Zarządzanie plikami
+# -------------------------------
+@timed("sqlite")
+def file_exists(user_id, filename):
+    with connection() as conn:
+        return conn.execute("SELECT id FROM files WHERE user_id = ? AND filename = ?",
+                            (user_id, filename)).fetchone() is not None
+
+@timed("ingest")
+def save_file(user_id, filename, file, progress=None):
+    # file: plik binarny z możliwością przewijania (np. UploadedFile) albo bytes;
+    # czytamy go kawałkami, bez dodatkowych kopii całej zawartości.
+    # progress(ułamek, etap) - opcjonalne raportowanie postępu (zapis w tle)
+    report = progress or (lambda fraction, stage: None)
+    if isinstance(file, bytes):
+        file = io.BytesIO(file)
+    spooled = None
+    # Artefakty zbudowane przed transakcją; niezapisane porzucamy w finally
+    artifacts, file_id, stored = {}, None, False
+    try:
+        # Tania kontrola nazwy zanim zaczniemy parsować cały plik
+        if file_exists(user_id, filename):
+            return False, "Plik o takiej nazwie już istnieje"
+
+        # Sprawdź czy plik jest poprawnym CSV. Artefakty (profil, kopia
+        # kolumnowa, tabela DuckDB, próbka) budujemy z całej ramki, więc zapis
+        # wymaga pliku mieszczącego się w pamięci - ograniczenie tylko zapisu,
+        # analiza dużych plików idzie kawałkami (analysis.ChunkedSource)
+        report(0.1, "Sprawdzanie pliku CSV")
+        file.seek(0)
+        df = pd.read_csv(file)
+        file.seek(0)
+
+        # Kopia kolumnowa i profil kolumn (w tym typy kolumn) dla analizy
+        report(0.4, "Budowanie profilu i kopii kolumnowej")
+        artifacts = build_artifacts(df)
+        del df
+
+        # Zawartość kompresujemy poza transakcją; ten sam plik wgrany
+        # wcześniej (choćby pod inną nazwą) nie jest zapisywany drugi raz
+        report(0.7, "Kompresja pliku")
+        content_hash = blob_store.hash_stream(file)
+        with connection() as conn:
+            known = blob_store.exists(conn, content_hash)
+        if not known:
+            spooled = blob_store.SpooledContent(file)
+
+        report(0.8, "Zapisywanie w bazie")
+        with transaction() as c:
+            # Sprawdź ponownie pod blokadą zapisu - plik mógł właśnie powstać
+            if c.execute("SELECT id FROM files WHERE user_id = ? AND filename = ?",
+                         (user_id, filename)).fetchone():
+                return False, "Plik o takiej nazwie już istnieje"
+
+            # Zapisz plik razem z artefaktami w jednej transakcji
+            blob_store.put(c, content_hash, file, spooled)
+            cur = c.execute("INSERT INTO files (user_id, filename, content_hash) VALUES (?, ?, ?)",
+                            (user_id, filename, content_hash))
+            file_id = cur.lastrowid
+            store_artifacts(c, file_id, artifacts)
+        stored = True
+        query_cache.invalidate(("files", user_id))
+        report(1.0, "Gotowe")
+        return True, "Plik został zapisany"
+    except Exception as e:
+        return False, f"Błąd podczas zapisywania pliku: {str(e)}"
+    finally:
+        if spooled is not None:
+            spooled.close()
+        if not stored:
+            discard_artifacts(artifacts, file_id)
+
+@timed("sqlite")
+def rename_file(file_id, user_id, new_filename):
+    with transaction() as c:
+        # Sprawdź czy użytkownik jest właścicielem pliku
+        result = c.execute("SELECT user_id FROM files WHERE id = ?", (file_id,)).fetchone()
+
+        if not result or result[0] != user_id:
+            return False, "Tylko właściciel może zmienić nazwę pliku"
+
+        # Sprawdź czy nazwa kończy się na .csv
+        if not new_filename.lower().endswith('.csv'):
+            return False, "Nazwa pliku musi kończyć się na .csv"
+
+        # Sprawdź czy nie ma innych rozszerzeń w nazwie
+        if new_filename.count('.') > 1:
+            return False, "Nazwa pliku nie może zawierać innych kropek"
+
+        # Sprawdź czy nowa nazwa nie jest już używana przez inny plik użytkownika
+        if c.execute("SELECT id FROM files WHERE user_id = ? AND filename = ? AND id != ?",
+                     (user_id, new_filename, file_id)).fetchone():
+            return False, "Plik o takiej nazwie już istnieje"
+
+        # Zmień nazwę pliku
+        c.execute("UPDATE files SET filename = ? WHERE id = ?", (new_filename, file_id))
+        tags = _recipient_tags(c, "files", "?", (file_id,))
+    frame_cache.invalidate(file_id)
+    query_cache.invalidate(("files", user_id), *tags)
+    return True, "Nazwa pliku została zmieniona"
+
+@timed("sqlite")
+@cached(lambda user_id: [("files", user_id)])
+def get_user_files(user_id):
+    with connection() as conn:
+        return conn.execute("SELECT id, filename, upload_date FROM files WHERE user_id = ? ORDER BY upload_date DESC",
+                            (user_id,)).fetchall()
+
+@timed("sqlite")
+@cached(lambda user_id, *_: [("files", user_id)])
+def get_user_files_page(user_id, after=None, limit=20):
+    # Jak get_user_files, ale po jednej stronie (kursor: upload_date, id)
+    where, params = "user_id = ?", [user_id]
+    if after is not None:
+        where += " AND (upload_date, id) < (?, ?)"
+        params.extend(after)
+    with connection() as conn:
+        rows = conn.execute(f"SELECT id, filename, upload_date FROM files WHERE {where} "
+                            "ORDER BY upload_date DESC, id DESC LIMIT ?", params + [limit + 1]).fetchall()
+    if len(rows) > limit:
+        return rows[:limit], (rows[limit - 1][2], rows[limit - 1][0])
+    return rows, None
+
+@timed("sqlite")
+def get_file_data(file_id, user_id):
+    with connection() as conn:
+        result = conn.execute("SELECT content_hash FROM files WHERE id = ? AND user_id = ?",
+                              (file_id, user_id)).fetchone()
+        if result is None:
+            return None
+        with blob_store.open_content(conn, result[0]) as stream:
+            return stream.read()
+
+@timed("sqlite")
+def delete_file(file_id, user_id):
+    with transaction() as conn:
+        # Artefakty przed plikiem: rejestr tabel DuckDB znika z kaskadą;
+        # udostępnienia pliku usuwa ON DELETE CASCADE
+        delete_artifacts(conn, "SELECT id FROM files WHERE id = ? AND user_id = ?", (file_id, user_id))
+        tags = _recipient_tags(conn, "files", "SELECT id FROM files WHERE id = ? AND user_id = ?", (file_id, user_id))
+        c = conn.execute("DELETE FROM files WHERE id = ? AND user_id = ?", (file_id, user_id))
+        success = c.rowcount > 0
+    if success:
+        frame_cache.invalidate(file_id)
+        mask_cache.invalidate(file_id)
+        query_cache.invalidate(("files", user_id), ("file", file_id), *tags)
+    return success
+
+# -------------------------------
+# Udostępnianie plików
+# -------------------------------
+@timed("sqlite")
+def share_file_with_user(file_id, user_id, target_username):
+    # Id użytkownika docelowego z cache (zwykle sprawdzone już przez check_user_exists)
+    target_user_id = get_user_id(target_username)
+    if target_user_id is None:
+        return False, "Nie znaleziono użytkownika"
+    with transaction() as c:
+
+        # Sprawdź czy plik należy do aktualnego użytkownika
+        owner = c.execute("SELECT user_id FROM files WHERE id = ?", (file_id,)).fetchone()
+        if not owner or owner[0] != user_id:
+            return False, "Brak dostępu do pliku"
+
+        # Sprawdź, czy już nie udostępniono
+        if c.execute("SELECT id FROM shared_files WHERE file_id = ? AND shared_with_user_id = ?",
+                     (file_id, target_user_id)).fetchone():
+            return False, "Plik jest już udostępniony temu użytkownikowi"
+
+        try:
+            c.execute("INSERT INTO shared_files (file_id, shared_with_user_id) VALUES (?, ?)",
+                      (file_id, target_user_id))
+        except sqlite3.IntegrityError:
+            # Użytkownik usunięty w innym procesie (klucz obcy)
+            return False, "Nie znaleziono użytkownika"
+    query_cache.invalidate(("shared_files", target_user_id), ("file", file_id))
+    return True, "Plik udostępniony"
+
+@timed("sqlite")
+@cached(lambda user_id: [("shared_files", user_id)])
+def get_shared_files(user_id):
+    with connection() as conn:
+        return conn.execute('''
+            SELECT f.id, f.filename, f.upload_date, u.username, sf.share_date
+            FROM files f
+            JOIN shared_files sf ON f.id = sf.file_id
+            JOIN users u ON f.user_id = u.id
+            WHERE sf.shared_with_user_id = ?
+            ORDER BY sf.share_date DESC
+        ''', (user_id,)).fetchall()
+
+@timed("sqlite")
+@cached(lambda user_id, *_: [("shared_files", user_id)])
+def get_shared_files_page(user_id, after=None, limit=20):
+    # Jak get_shared_files, ale po jednej stronie (kursor: share_date, id udostępnienia)
+    where, params = "sf.shared_with_user_id = ?", [user_id]
+    if after is not None:
+        where += " AND (sf.share_date, sf.id) < (?, ?)"
+        params.extend(after)
+    with connection() as conn:
+        rows = conn.execute(f'''
+            SELECT f.id, f.filename, f.upload_date, u.username, sf.share_date, sf.id
+            FROM shared_files sf
+            JOIN files f ON f.id = sf.file_id
+            JOIN users u ON f.user_id = u.id
+            WHERE {where}
+            ORDER BY sf.share_date DESC, sf.id DESC
+            LIMIT ?
+        ''', params + [limit + 1]).fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = (rows[-1][4], rows[-1][5])
+    return [row[:5] for row in rows], next_cursor
+
+@timed("blob")
+def get_file_data_shared(file_id, user_id):
+    # Cała zawartość pliku (np. do pobrania); do parsowania lepiej open_file_stream
+    with open_file_stream(file_id, user_id) as stream:
+        return stream.read() if stream is not None else None
+
+@timed("sqlite")
+@cached(lambda file_id, user_id: [("file", file_id)])
+def get_file_hash_shared(file_id, user_id):
+    # Sprawdza dostęp jak get_file_data_shared, ale bez pobierania zawartości pliku
+    with connection() as conn:
+        result = conn.execute('''
+            SELECT f.content_hash
+            FROM files f
+            LEFT JOIN shared_files sf ON f.id = sf.file_id
+            WHERE f.id = ? AND (f.user_id = ? OR sf.shared_with_user_id = ?)
+        ''', (file_id, user_id, user_id)).fetchone()
+    return result[0] if result else None
+
+@timed("sqlite")
+@cached(lambda file_id, user_id: [("file", file_id)])
+def get_file_profile_shared(file_id, user_id):
+    with connection() as conn:
+        result = conn.execute('''
+            SELECT fp.profile
+            FROM files f
+            JOIN file_profiles fp ON fp.file_id = f.id
+            LEFT JOIN shared_files sf ON f.id = sf.file_id
+            WHERE f.id = ? AND (f.user_id = ? OR sf.shared_with_user_id = ?)
+        ''', (file_id, user_id, user_id)).fetchone()
+    return column_profile.loads(result[0]) if result else None
+
+@timed("sqlite")
+@cached(lambda file_id, user_id: [("file", file_id)])
+def get_file_storage_shared(file_id, user_id):
+    # (rozmiar CSV w bajtach, czy jest kopia kolumnowa) bez pobierania zawartości
+    with connection() as conn:
+        result = conn.execute('''
+            SELECT b.size, fc.file_id IS NOT NULL
+            FROM files f
+            JOIN blobs b ON b.hash = f.content_hash
+            LEFT JOIN file_columnar fc ON fc.file_id = f.id
+            LEFT JOIN shared_files sf ON f.id = sf.file_id
+            WHERE f.id = ? AND (f.user_id = ? OR sf.shared_with_user_id = ?)
+        ''', (file_id, user_id, user_id)).fetchone()
+    return (result[0], bool(result[1])) if result else None
+
+@timed("sqlite")
+@cached(lambda file_id, user_id: [("file", file_id)])
+def get_file_table_shared(file_id, user_id):
+    # Tabela SQL z wierszami pliku (file_tables.FileTable) albo None
+    with connection() as conn:
+        result = conn.execute('''
+            SELECT 1
+            FROM files f
+            LEFT JOIN shared_files sf ON f.id = sf.file_id
+            WHERE f.id = ? AND (f.user_id = ? OR sf.shared_with_user_id = ?)
+        ''', (file_id, user_id, user_id)).fetchone()
+    return file_tables.get_table(file_id) if result else None
+
+@timed("sqlite")
+@cached(lambda file_id, user_id: [("file", file_id)])
+def get_file_sample_rows_shared(file_id, user_id):
+    # Liczba wierszy próbki pliku (approx.py) albo None bez dostępu lub bez próbki
+    with connection() as conn:
+        result = conn.execute('''
+            SELECT fs.rows
+            FROM files f
+            JOIN file_samples fs ON fs.file_id = f.id
+            LEFT JOIN shared_files sf ON f.id = sf.file_id
+            WHERE f.id = ? AND (f.user_id = ? OR sf.shared_with_user_id = ?)
+        ''', (file_id, user_id, user_id)).fetchone()
+    return result[0] if result else None
+
+@contextmanager
+def open_file_stream(file_id, user_id, columnar=False):
+    # Strumień do odczytu pliku (CSV albo kopii kolumnowej) bez wczytywania go
+    # w całości do pamięci; None, gdy użytkownik nie ma dostępu
+    storage = get_file_storage_shared(file_id, user_id)
+    if storage is None or (columnar and not storage[1]):
+        yield None
+        return
+    if columnar:
+        with open_blob("file_columnar", "data", file_id) as stream:
+            yield stream
+        return
+    # CSV jest skompresowany w magazynie zawartości - dekompresja strumieniowa
+    content_hash = get_file_hash_shared(file_id, user_id)
+    with connection() as conn:
+        with blob_store.open_content(conn, content_hash) as stream:
+            yield stream
+
+# -------------------------------
+# Wczytywanie danych do analizy
+# -------------------------------
+@timed("read_csv")
+def load_file_dataframe(file_id, user_id, columns=None):
+    # Zwraca DataFrame współdzielony przez wszystkie sesje (cache procesu),
+    # więc wywołujący nie mogą go modyfikować w miejscu.
+    # columns=None wczytuje wszystkie kolumny; z columns dostajemy ramkę z
+    # co najmniej tymi kolumnami (cała ramka, jeśli już jest w cache). Typy
+    # kolumn są zawężane według profilu (frame_dtypes); df.attrs["memory"]
+    # to (bajty w typach domyślnych, bajty po optymalizacji).
+    content_hash = get_file_hash_shared(file_id, user_id)
+    if content_hash is None:
+        return None
+    if columns is not None:
+        columns = list(dict.fromkeys(columns))
+        full = frame_cache.peek(file_id, content_hash)
+        if full is not None:
+            return full
+
+    def load():
+        dtypes = frame_dtypes.plan(get_file_profile_shared(file_id, user_id))
+        if columns is not None:
+            dtypes = {name: dtype for name, dtype in dtypes.items() if name in columns}
+        # Najpierw kopia kolumnowa (czytamy tylko potrzebne kolumny),
+        # CSV tylko dla plików bez kopii
+        df = None
+        with open_file_stream(file_id, user_id, columnar=True) as stream:
+            if stream is not None:
+                df = read_columnar(stream, columns, dtypes)
+        if df is None:
+            with open_file_stream(file_id, user_id) as stream:
+                if stream is None:
+                    return None
+                df = pd.read_csv(stream, usecols=columns,
+                                 dtype=frame_dtypes.csv_dtypes(dtypes) or None,
+                                 engine="pyarrow" if frame_dtypes.PYARROW_STRINGS else None)
+            df = frame_dtypes.finish(df, dtypes)
+        df.attrs["memory"] = (frame_dtypes.default_size(df), frame_size(df))
+        return df
+
+    variant = tuple(columns) if columns is not None else None
+    return frame_cache.get_or_load(file_id, content_hash, load, variant)
+
+@timed("read_csv")
+def load_file_sample(file_id, user_id):
+    # Próbka wierszy pliku (approx.py) z typami kolumn jak w load_file_dataframe;
+    # plik mieszczący się w próbce nie ma jej osobno - wtedy cały plik
+    content_hash = get_file_hash_shared(file_id, user_id)
+    if content_hash is None:
+        return None
+    if get_file_sample_rows_shared(file_id, user_id) is None:
+        return load_file_dataframe(file_id, user_id)
+
+    def load():
+        dtypes = frame_dtypes.plan(get_file_profile_shared(file_id, user_id))
+        with open_blob("file_samples", "data", file_id) as stream:
+            return read_columnar(stream, None, dtypes)
+
+    return frame_cache.get_or_load(file_id, content_hash, load, "sample")
@@ -0,0 +1,190 @@
+import io
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import migrations
+from blob_store import BlobReader
+
+# -------------------------------
+# Konfiguracja połączeń z bazą
+# -------------------------------
+DB_PATH = os.environ.get("NOTES_DB", "notes.db")
+POOL_SIZE = int(os.environ.get("NOTES_DB_POOL_SIZE", "8"))
+# Jak długo (s) czekamy na wolne połączenie z puli zanim zgłosimy błąd
+POOL_TIMEOUT = float(os.environ.get("NOTES_DB_POOL_TIMEOUT", "30"))
+# Jak długo (ms) SQLite czeka na zwolnienie blokady zapisu
+BUSY_TIMEOUT_MS = 5000
+
+PRAGMAS = (
+    # Działa tylko dla nowej bazy (przed utworzeniem tabel); istniejące
+    # przestawia migrations.migrate. Wolne strony oddaje maintenance.
+    ("auto_vacuum", "INCREMENTAL"),
+    ("journal_mode", "WAL"),
+    # W trybie WAL NORMAL jest bezpieczne (brak uszkodzeń), a oszczędza fsync przy każdym commit
+    ("synchronous", "NORMAL"),
+    # Wartość ujemna = rozmiar w KiB (64 MiB cache stron na połączenie)
+    ("cache_size", "-65536"),
+    ("mmap_size", str(256 * 1024 * 1024)),
+    ("busy_timeout", str(BUSY_TIMEOUT_MS)),
+    ("temp_store", "MEMORY"),
+    # ON DELETE CASCADE w schemacie (migrations.cascade_deletes)
+    ("foreign_keys", "ON"),
+)
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    def __init__(self, path, size=POOL_SIZE, timeout=POOL_TIMEOUT):
+        if size < 1:
+            raise ValueError("Rozmiar puli musi być dodatni")
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        # isolation_level=None: sami sterujemy transakcjami przez BEGIN/COMMIT,
+        # check_same_thread=False: Streamlit obsługuje sesje w różnych wątkach,
+        # a połączenie jest wypożyczane na wyłączność tylko jednemu z nich naraz
+        conn = sqlite3.connect(
+            self.path,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        for name, value in PRAGMAS:
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_create = self._created < self.size
+            if can_create:
+                self._created += 1
+        if can_create:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise PoolTimeout(f"Brak wolnego połączenia z bazą po {self.timeout}s")
+
+    def release(self, conn):
+        # Nie oddawaj do puli połączenia z niezakończoną transakcją
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put_nowait(conn)
+
+    def close(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DB_PATH, POOL_SIZE)
+    return _pool
+
+
+def configure(path=None, pool_size=None):
+    # Przełącza bazę / rozmiar puli (np. w benchmarkach); zamyka stare połączenia
+    global _pool, DB_PATH, POOL_SIZE
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+        if path is not None:
+            DB_PATH = path
+        if pool_size is not None:
+            POOL_SIZE = pool_size
+
+
+@contextmanager
+def connection():
+    # Połączenie do odczytu: każde zapytanie wykonuje się w trybie autocommit
+    pool = get_pool()
+    conn = pool.acquire()
+    try:
+        yield conn
+    finally:
+        pool.release(conn)
+
+
+@contextmanager
+def transaction():
+    # Transakcja zapisu: BEGIN IMMEDIATE od razu bierze blokadę zapisu,
+    # więc nie ma zakleszczeń przy podnoszeniu blokady z odczytu do zapisu
+    with connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
+
+
+# -------------------------------
+# Strumieniowy odczyt BLOB-ów
+# -------------------------------
+@contextmanager
+def open_blob(table, column, rowid, buffer_size=1024 * 1024):
+    # Przyrostowy odczyt BLOB-a (Connection.blobopen) zamiast wczytywania
+    # go w całości; połączenie jest zajęte do zamknięcia strumienia
+    with connection() as conn:
+        stream = io.BufferedReader(BlobReader(conn.blobopen(table, column, rowid, readonly=True)), buffer_size)
+        try:
+            yield stream
+        finally:
+            stream.close()
+
+
+# -------------------------------
+# Inicjalizacja bazy danych
+# -------------------------------
+_migrated = set()
+_migrate_lock = threading.Lock()
+
+
+def init_db():
+    # Migracje uruchamiamy raz na proces (dla danej bazy), a nie przy
+    # każdym przeładowaniu strony
+    with _migrate_lock:
+        if DB_PATH in _migrated:
+            return []
+        with connection() as conn:
+            applied = migrations.migrate(conn)
+        _migrated.add(DB_PATH)
+    return applied
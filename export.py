@@ -0,0 +1,167 @@
+import gzip
+import importlib.util
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import analysis
+
+# -------------------------------
+# Eksport przefiltrowanych danych (CSV, CSV.gz, Parquet, Excel)
+# -------------------------------
+# Plik eksportu budujemy dopiero na żądanie (przycisk „Przygotuj plik
+# eksportu”, a nie przy każdym przebiegu strony) i kawałkami: kolejne
+# kawałki wyniku filtra trafiają do writera formatu, więc w pamięci nie
+# powstaje cały CSV jako tekst. Gotowe pliki trzymamy w cache pod kluczem (hash zawartości pliku,
+# spec filtra, format) - ponowne pobranie tego samego widoku nic nie liczy.
+CACHE_MAX_BYTES = int(os.environ.get("EXPORT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+CHUNK_ROWS = 100_000
+GZIP_LEVEL = 6
+# Excel mieści 1 048 576 wierszy na arkusz (z nagłówkiem); resztę piszemy w kolejnych arkuszach
+EXCEL_MAX_ROWS = 1_048_576
+# Excel pisze xlsxwriter (requirements.txt); bez niego próbujemy openpyxl
+EXCEL_ENGINE = next((name for name in ("xlsxwriter", "openpyxl") if importlib.util.find_spec(name)), None)
+
+# format -> (etykieta, rozszerzenie pliku, typ MIME)
+FORMATS = {
+    "csv": ("CSV", "csv", "text/csv"),
+    "csv.gz": ("CSV (gzip)", "csv.gz", "application/gzip"),
+    "parquet": ("Parquet", "parquet", "application/vnd.apache.parquet"),
+    "xlsx": ("Excel", "xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+
+def available_formats():
+    return [fmt for fmt in FORMATS if fmt != "xlsx" or EXCEL_ENGINE is not None]
+
+
+class ExportCache:
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        # (content_hash, spec filtra, format) -> bajty pliku
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def put(self, key, payload):
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[key] = payload
+            self._bytes += len(payload)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+
+export_cache = ExportCache()
+
+
+# -------------------------------
+# Writery formatów: ciąg ramek -> plik binarny
+# -------------------------------
+def _write_csv(frames, target):
+    text = io.TextIOWrapper(target, encoding="utf-8", newline="", write_through=True)
+    for i, frame in enumerate(frames):
+        frame.to_csv(text, index=False, header=(i == 0))
+    # Odłączamy wrapper, żeby zamknięcie go nie zamknęło target
+    text.detach()
+
+
+def _write_csv_gz(frames, target):
+    with gzip.GzipFile(fileobj=target, mode="wb", compresslevel=GZIP_LEVEL) as compressed:
+        _write_csv(frames, compressed)
+
+
+def _write_parquet(frames, target):
+    writer = None
+    try:
+        for frame in frames:
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(target, table.schema)
+            elif table.schema != writer.schema:
+                # Kawałki CSV mogą mieć inne typy (np. int w jednym, float w drugim)
+                table = table.cast(writer.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def _write_excel(frames, target):
+    # Bez constant_memory xlsxwriter: pandas zapisuje komórki kolumnami, a ten tryb wymaga kolejności wierszy
+    with pd.ExcelWriter(target, engine=EXCEL_ENGINE) as writer:
+        # Wiersze danych w bieżącym arkuszu (bez nagłówka)
+        sheet, rows = 1, 0
+        for frame in frames:
+            while True:
+                if rows == EXCEL_MAX_ROWS - 1 and not frame.empty:
+                    sheet, rows = sheet + 1, 0
+                part = frame.iloc[:EXCEL_MAX_ROWS - 1 - rows]
+                part.to_excel(writer, sheet_name=f"dane_{sheet}", index=False,
+                              header=(rows == 0), startrow=rows + 1 if rows else 0)
+                rows += len(part)
+                frame = frame.iloc[len(part):]
+                if frame.empty:
+                    break
+
+
+WRITERS = {
+    "csv": _write_csv,
+    "csv.gz": _write_csv_gz,
+    "parquet": _write_parquet,
+    "xlsx": _write_excel,
+}
+
+
+def build(source, where, fmt):
+    # Plik eksportu w formacie fmt (bajty); source: DataFrame albo ChunkedSource
+    target = io.BytesIO()
+    WRITERS[fmt](analysis.filtered_frames(source, where, CHUNK_ROWS), target)
+    return target.getvalue()
+
+
+def cached(content_hash, filter_spec, fmt, builder):
+    # Plik z cache albo zbudowany przez builder(); content_hash=None (nieznany plik) - bez cache.
+    # builder() może zwrócić None (np. błąd zadania już pokazany) - tego nie zapisujemy
+    key = (content_hash, filter_spec, fmt)
+    payload = export_cache.get(key) if content_hash is not None else None
+    if payload is None:
+        payload = builder()
+        if payload is not None and content_hash is not None:
+            export_cache.put(key, payload)
+    return payload
+
+
+def file_name(base, fmt):
+    return f"{base}.{FORMATS[fmt][1]}"
+
+
+def mime_type(fmt):
+    return FORMATS[fmt][2]
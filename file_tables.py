@@ -0,0 +1,275 @@
+import json
+import os
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+import db
+from timing import timed
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+# -------------------------------
+# Pliki CSV jako tabele w bazie analitycznej (DuckDB)
+# -------------------------------
+# Każdy plik może mieć w DuckDB tabelę file_rows_<id> z typowanymi kolumnami
+# c0, c1, ... (nazwy z CSV mogą różnić się tylko wielkością liter, a DuckDB
+# ich nie rozróżnia). Rejestr tabel i oryginalne nazwy kolumn są w SQLite
+# (file_tables), razem z kontrolą dostępu. Filtry i agregacje liczy DuckDB,
+# do Pythona trafia tylko wynik.
+# Bez pakietu duckdb albo z FILE_TABLES=0 tabel nie zakładamy, a analiza
+# wraca do przebiegu kawałkami w pandas.
+# Ładowanie ramki do DuckDB trwa (sekundy dla dużych plików), więc robimy je
+# przed transakcją SQLite, do tabeli roboczej file_rows_new_<czas>_<los>; w
+# transakcji zapisu pliku zostaje tylko zmiana jej nazwy i wiersz rejestru.
+# Tabele bez wiersza w rejestrze (przerwany zapis, usunięcie przy
+# zablokowanym pliku DuckDB) usuwa cleanup() w utrzymaniu bazy.
+ENABLED = duckdb is not None and os.environ.get("FILE_TABLES", "1") != "0"
+# Plik bazy DuckDB; domyślnie obok bazy SQLite (notes.db -> notes.duckdb)
+DUCKDB_PATH = os.environ.get("FILE_TABLES_DB")
+# Górny limit pamięci DuckDB (większe operacje zapisują dane tymczasowe na dysk)
+MEMORY_LIMIT = os.environ.get("FILE_TABLES_MEMORY_LIMIT", "512MB")
+STAGING_PREFIX = "file_rows_new_"
+# Tabele robocze starsze niż tyle sekund to pozostałości przerwanych zapisów
+STAGING_MAX_AGE = 3600
+
+_connections = {}
+_connections_lock = threading.Lock()
+
+
+def _path():
+    return DUCKDB_PATH or os.path.splitext(db.DB_PATH)[0] + ".duckdb"
+
+
+def _cursor():
+    # Jedno połączenie DuckDB na plik bazy w procesie; każdy wątek pracuje na
+    # własnym kursorze (połączenie DuckDB nie jest bezpieczne wątkowo)
+    path = _path()
+    with _connections_lock:
+        conn = _connections.get(path)
+        if conn is None:
+            conn = duckdb.connect(path, config={"memory_limit": MEMORY_LIMIT})
+            _connections[path] = conn
+    return conn.cursor()
+
+
+def close():
+    # Zamyka połączenia DuckDB procesu i zwalnia blokadę pliku bazy (np. dla innego procesu)
+    with _connections_lock:
+        for conn in _connections.values():
+            conn.close()
+        _connections.clear()
+
+
+def table_name(file_id):
+    return f"file_rows_{int(file_id)}"
+
+
+def _execute(*statements):
+    cursor = _cursor()
+    try:
+        for sql in statements:
+            cursor.execute(sql)
+    finally:
+        cursor.close()
+
+
+def prepare(df):
+    # Przed transakcją zapisu pliku: ładuje ramkę do tabeli roboczej.
+    # Zwraca (tabela robocza, nazwy kolumn, liczba wierszy) albo None, gdy
+    # tabeli nie udało się założyć (np. plik DuckDB zablokowany przez inny proces).
+    staging = f"{STAGING_PREFIX}{int(time.time())}_{uuid.uuid4().hex[:12]}"
+    try:
+        cursor = _cursor()
+        try:
+            cursor.register("frame", df.set_axis([f"c{i}" for i in range(len(df.columns))], axis=1))
+            cursor.execute(f"CREATE TABLE {staging} AS SELECT * FROM frame")
+            cursor.unregister("frame")
+        finally:
+            cursor.close()
+    except duckdb.Error:
+        return None
+    return staging, [str(col) for col in df.columns], len(df)
+
+
+def store(conn, file_id, prepared):
+    # conn: transakcja SQLite zapisu pliku; w DuckDB tylko zmiana nazwy tabeli
+    # roboczej. Tabela, której nie da się przenieść, jest pomijana (cleanup ją usunie).
+    staging, columns, row_count = prepared
+    try:
+        _execute(f"DROP TABLE IF EXISTS {table_name(file_id)}",
+                 f"ALTER TABLE {staging} RENAME TO {table_name(file_id)}")
+    except duckdb.Error:
+        return
+    conn.execute("INSERT OR REPLACE INTO file_tables (file_id, columns, row_count) VALUES (?, ?, ?)",
+                 (file_id, json.dumps(columns), row_count))
+
+
+def discard(prepared, file_id=None):
+    # Tabela przygotowana, ale niezapisana (np. wycofana transakcja pliku file_id)
+    names = [prepared[0]] + ([table_name(file_id)] if file_id is not None else [])
+    try:
+        _execute(*(f"DROP TABLE IF EXISTS {name}" for name in names))
+    except duckdb.Error:
+        pass
+
+
+def drop(conn, file_ids_sql, params):
+    # file_ids_sql: podzapytanie zwracające id usuwanych plików. Gdy plik DuckDB
+    # jest niedostępny, usuwamy tylko wiersze rejestru - tabele usunie cleanup.
+    file_ids = [row[0] for row in conn.execute(
+        f"SELECT file_id FROM file_tables WHERE file_id IN ({file_ids_sql})", params)]
+    if file_ids and duckdb is not None:
+        try:
+            _execute(*(f"DROP TABLE IF EXISTS {table_name(file_id)}" for file_id in file_ids))
+        except duckdb.Error:
+            pass
+    conn.execute(f"DELETE FROM file_tables WHERE file_id IN ({file_ids_sql})", params)
+
+
+def cleanup():
+    # Usuwa tabele DuckDB bez wiersza w rejestrze i stare tabele robocze;
+    # zwraca liczbę usuniętych. Rejestr czytamy pod blokadą zapisu SQLite:
+    # trwający zapis pliku trzyma ją od zmiany nazwy tabeli do zatwierdzenia.
+    if not ENABLED:
+        return 0
+    dropped = 0
+    with db.transaction() as conn:
+        registered = {table_name(row[0]) for row in conn.execute("SELECT file_id FROM file_tables")}
+        try:
+            names = [row[0] for row in _query(
+                "SELECT table_name FROM information_schema.tables WHERE table_name LIKE 'file_rows_%'", [])]
+            for name in names:
+                if name.startswith(STAGING_PREFIX):
+                    created = int(name[len(STAGING_PREFIX):].split("_")[0])
+                    if time.time() - created < STAGING_MAX_AGE:
+                        continue
+                elif name in registered:
+                    continue
+                _execute(f"DROP TABLE IF EXISTS {name}")
+                dropped += 1
+        except duckdb.Error:
+            return dropped
+    return dropped
+
+
+class FileTable:
+    def __init__(self, file_id, columns):
+        self.name = table_name(file_id)
+        self.columns = columns
+
+    def column(self, col):
+        return f"c{self.columns.index(col)}"
+
+    def where(self, where, *required):
+        # Warunek WHERE (sql, parametry): filtr wierszy z filters.build_filter
+        # oraz wymagane wartości (nie NULL) w kolumnach required
+        clauses = [f"{self.column(col)} IS NOT NULL" for col in required]
+        params = []
+        if where is not None:
+            clauses.append(self._condition(where.spec, params))
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def _condition(self, spec, params):
+        op = spec[0]
+        if op in ("and", "or"):
+            return "(" + f" {op.upper()} ".join(self._condition(child, params) for child in spec[1]) + ")"
+        _, col, arg = spec
+        params.extend(arg)
+        if op == "in":
+            return f"{self.column(col)} IN ({', '.join('?' for _ in arg)})" if arg else "FALSE"
+        return f"{self.column(col)} BETWEEN ? AND ?"
+
+
+def get_table(file_id):
+    # Bez kontroli dostępu - używać przez data.get_file_table_shared
+    if not ENABLED:
+        return None
+    with db.connection() as conn:
+        result = conn.execute("SELECT columns FROM file_tables WHERE file_id = ?", (file_id,)).fetchone()
+    return FileTable(file_id, json.loads(result[0])) if result else None
+
+
+def _query(sql, params):
+    cursor = _cursor()
+    try:
+        return cursor.execute(sql, params).fetchall()
+    finally:
+        cursor.close()
+
+
+# -------------------------------
+# Operacje (te same wyniki co odpowiedniki w analysis)
+# -------------------------------
+AGGREGATES = {"sum": "COALESCE(SUM({}), 0)", "mean": "AVG({})", "count": "COUNT({})"}
+
+
+@timed("duckdb")
+def value_counts(table, col, where=None):
+    c = table.column(col)
+    where_sql, params = table.where(where, col)
+    # Remisy w kolejności pierwszego wystąpienia, jak value_counts()
+    rows = _query(f"SELECT {c}, COUNT(*) FROM {table.name}{where_sql} "
+                  f"GROUP BY {c} ORDER BY COUNT(*) DESC, MIN(rowid)", params)
+    return pd.Series([r[1] for r in rows], index=pd.Index([r[0] for r in rows], name=col),
+                     name="count", dtype="int64")
+
+
+@timed("duckdb")
+def groupby_agg(table, group_col, agg_col, agg_func, where=None):
+    g = table.column(group_col)
+    aggregate = AGGREGATES[agg_func].format(table.column(agg_col))
+    where_sql, params = table.where(where, group_col)
+    rows = _query(f"SELECT {g}, {aggregate} FROM {table.name}{where_sql} GROUP BY {g} ORDER BY {g}", params)
+    return pd.DataFrame({group_col: [r[0] for r in rows], agg_col: [r[1] for r in rows]})
+
+
+@timed("duckdb")
+def histogram(table, col, edges, where=None):
+    # Przedziały jak w np.histogram: [a, b), ostatni domknięty
+    c = table.column(col)
+    lo, hi, bins = float(edges[0]), float(edges[-1]), len(edges) - 1
+    where_sql, params = table.where(where, col)
+    where_sql += (" AND " if where_sql else " WHERE ") + f"{c} BETWEEN ? AND ?"
+    rows = _query(f"SELECT LEAST(CAST(FLOOR(({c} - ?) * ?) AS INTEGER), ?), COUNT(*) "
+                  f"FROM {table.name}{where_sql} GROUP BY 1",
+                  [lo, bins / (hi - lo), bins - 1, *params, lo, hi])
+    counts = np.zeros(bins, dtype="int64")
+    for index, count in rows:
+        counts[index] += count
+    return counts
+
+
+def filtered_frames(table, where=None, chunk_rows=100000):
+    # Przefiltrowane wiersze kawałkami, z oryginalnymi nazwami kolumn
+    where_sql, params = table.where(where)
+    cursor = _cursor()
+    try:
+        reader = cursor.execute(f"SELECT * FROM {table.name}{where_sql} ORDER BY rowid",
+                                params).to_arrow_reader(chunk_rows)
+        for batch in reader:
+            yield batch.to_pandas().set_axis(table.columns, axis=1)
+    finally:
+        cursor.close()
+
+
+@timed("duckdb")
+def window(table, offset, limit, sort_col=None, ascending=True):
+    # Wiersze [offset, offset + limit) w kolejności pliku albo po sortowaniu
+    # po sort_col (remisy w kolejności pliku, puste na końcu); indeks to numer wiersza w pliku
+    order = "rowid"
+    if sort_col is not None:
+        order = f"{table.column(sort_col)} {'ASC' if ascending else 'DESC'} NULLS LAST, rowid"
+    cursor = _cursor()
+    try:
+        frame = cursor.execute(f"SELECT rowid, * FROM {table.name} ORDER BY {order} LIMIT ? OFFSET ?",
+                               [limit, offset]).to_arrow_table().to_pandas()
+    finally:
+        cursor.close()
+    return frame.set_index("rowid").rename_axis(None).set_axis(table.columns, axis=1)
@@ -0,0 +1,125 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# -------------------------------
+# Filtry wierszy: warunki łączone przez AND / OR
+# -------------------------------
+# Filtr opisuje krotka (spec), więc da się go przełożyć na SQL
+# (file_tables.FileTable.where) i użyć jako klucza cache:
+#   ("in", kolumna, (wartości, ...))
+#   ("between", kolumna, (od, do))          - zakres domknięty
+#   ("and" | "or", (filtr, filtr, ...))
+# Maski pojedynczych warunków dla całych plików trzymamy w cache jako
+# spakowane bity (np.packbits), więc zmiana jednego warunku liczy od nowa
+# tylko jego maskę, a reszta to operacje bitowe na gotowych maskach.
+MASK_CACHE_MAX_BYTES = int(os.environ.get("FILTER_MASK_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+def isin(col, values):
+    return ("in", col, tuple(values))
+
+
+def between(col, lo, hi):
+    return ("between", col, (lo, hi))
+
+
+def spec_columns(spec):
+    if spec[0] in ("and", "or"):
+        return list(dict.fromkeys(col for child in spec[1] for col in spec_columns(child)))
+    return [spec[1]]
+
+
+class MaskCache:
+    def __init__(self, max_bytes=MASK_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        # (file_id, content_hash, spec warunku) -> spakowana maska
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            packed = self._entries.get(key)
+            if packed is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return packed
+
+    def put(self, key, packed):
+        if packed.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._entries[key] = packed
+            self._bytes += packed.nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def invalidate(self, file_id):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == file_id]:
+                self._bytes -= self._entries.pop(key).nbytes
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+
+mask_cache = MaskCache()
+
+
+def _leaf_mask(frame, spec):
+    op, col, arg = spec
+    values = frame[col]
+    if op == "in":
+        mask = values.isin(arg)
+    else:
+        mask = (values >= arg[0]) & (values <= arg[1])
+    return np.packbits(mask.to_numpy(dtype=bool))
+
+
+def _packed_mask(frame, spec, cache_key):
+    if spec[0] in ("and", "or"):
+        combine = np.bitwise_and if spec[0] == "and" else np.bitwise_or
+        return combine.reduce([_packed_mask(frame, child, cache_key) for child in spec[1]])
+    if cache_key is None:
+        return _leaf_mask(frame, spec)
+    key = (*cache_key, spec)
+    packed = mask_cache.get(key)
+    if packed is None:
+        packed = _leaf_mask(frame, spec)
+        mask_cache.put(key, packed)
+    return packed
+
+
+def build_filter(predicates, mode="and", cache_key=None):
+    # Zwraca funkcję frame -> maska (np. tablica bool) albo None bez warunków.
+    # cache_key=(file_id, content_hash) tylko dla ramki z całym plikiem
+    # (kawałki pliku mają inne maski niż cały plik).
+    if not predicates:
+        return None
+    return from_spec(predicates[0] if len(predicates) == 1 else (mode, tuple(predicates)), cache_key)
+
+
+def from_spec(spec, cache_key=None):
+    # Filtr z gotowego spec (np. przesłanego do procesu analizy); None dla spec=None
+    if spec is None:
+        return None
+
+    def where(frame):
+        return np.unpackbits(_packed_mask(frame, spec, cache_key), count=len(frame)).astype(bool)
+    # Kolumny, które trzeba wczytać, żeby policzyć filtr
+    where.columns = spec_columns(spec)
+    where.spec = spec
+    return where
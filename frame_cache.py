@@ -0,0 +1,113 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+# -------------------------------
+# Wspólny (na cały proces) cache wczytanych DataFrame'ów
+# -------------------------------
+# Domyślnie 512 MiB; rozmiar liczony z df.memory_usage(deep=True)
+MAX_BYTES = int(os.environ.get("FRAME_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+
+# Dla kolumn tekstowych rozmiar szacujemy z próbki: memory_usage(deep=True)
+# odwiedza każdy obiekt i na dużych plikach trwa dłużej niż samo wczytanie
+SIZE_SAMPLE = 1000
+
+
+def frame_size(df):
+    size = int(df.memory_usage(index=True, deep=False).sum())
+    for col in df.columns:
+        values = df[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            size += sum(sys.getsizeof(v) for v in values.cat.categories)
+            continue
+        if values.dtype != object or len(values) == 0:
+            continue
+        sample = values.iloc[:: max(1, len(values) // SIZE_SAMPLE)]
+        size += int(sum(sys.getsizeof(v) for v in sample) / len(sample) * len(values))
+    return size
+
+
+class FrameCache:
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        # (file_id, content_hash, variant) -> (df, rozmiar w bajtach);
+        # variant rozróżnia np. wczytanie tylko wybranych kolumn
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, file_id, content_hash, variant=None):
+        df = self.peek(file_id, content_hash, variant)
+        if df is None:
+            with self._lock:
+                self.misses += 1
+        return df
+
+    def peek(self, file_id, content_hash, variant=None):
+        # Jak get, ale brak wpisu nie liczy się jako chybienie (np. sprawdzenie,
+        # czy jest już cała ramka, zanim sięgniemy po wariant z kolumnami)
+        key = (file_id, content_hash, variant)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, file_id, content_hash, df, variant=None):
+        size = frame_size(df)
+        # Ramka większa niż cały budżet i tak wypchnęłaby wszystko inne
+        if size > self.max_bytes:
+            return
+        key = (file_id, content_hash, variant)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (df, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def get_or_load(self, file_id, content_hash, loader, variant=None):
+        df = self.get(file_id, content_hash, variant)
+        if df is None:
+            df = loader()
+            if df is not None:
+                self.put(file_id, content_hash, df, variant)
+        return df
+
+    def invalidate(self, file_id):
+        # Usuwa wszystkie wersje (hashe, warianty) danego pliku
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == file_id]:
+                self._bytes -= self._entries.pop(key)[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+frame_cache = FrameCache()
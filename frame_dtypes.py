@@ -0,0 +1,102 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# -------------------------------
+# Oszczędne typy kolumn przy wczytywaniu plików do analizy
+# -------------------------------
+# Typy wybieramy na podstawie profilu z zapisu pliku (column_profile):
+# liczby całkowite -> najmniejszy typ int mieszczący min/max, kolumny
+# tekstowe z małą liczbą różnych wartości -> category (z kategoriami
+# posortowanymi, żeby groupby dawał tę samą kolejność co dla object),
+# float64 -> float32 tylko gdy nie zmienia to żadnej wartości.
+# OPTIMIZE_DTYPES=0 wyłącza optymalizację; FRAME_STRING_DTYPE=pyarrow
+# zapisuje pozostałe kolumny tekstowe jako string[pyarrow] (CSV czytamy
+# wtedy silnikiem pyarrow).
+OPTIMIZE = os.environ.get("OPTIMIZE_DTYPES", "1") != "0"
+PYARROW_STRINGS = os.environ.get("FRAME_STRING_DTYPE", "object") == "pyarrow"
+# Kolumna tekstowa staje się category, gdy różnych wartości jest najwyżej
+# tyle (jako ułamek liczby wartości)
+CATEGORY_MAX_RATIO = 0.5
+
+INT_TYPES = ("int8", "int16", "int32")
+
+
+def plan(profile):
+    # {kolumna: docelowy typ} dla kolumn, które warto zmienić
+    if not OPTIMIZE or profile is None:
+        return {}
+    dtypes = {}
+    for stats in profile["columns"]:
+        if stats["dtype"] == "int64" and stats.get("min") is not None:
+            for name in INT_TYPES:
+                info = np.iinfo(name)
+                if info.min <= stats["min"] and stats["max"] <= info.max:
+                    dtypes[stats["name"]] = name
+                    break
+        elif stats["dtype"] == "float64":
+            dtypes[stats["name"]] = "float32"
+        elif stats["kind"] == "object" and stats["distinct"] is not None:
+            if stats["distinct"] <= CATEGORY_MAX_RATIO * max(stats["count"], 1):
+                dtypes[stats["name"]] = "category"
+            elif PYARROW_STRINGS:
+                dtypes[stats["name"]] = "string[pyarrow]"
+    return dtypes
+
+
+def read_arrow(table, dtypes):
+    # pyarrow.Table -> DataFrame od razu w docelowych typach (bez pośredniej
+    # kolumny object dla kolumn category)
+    for name, dtype in dtypes.items():
+        i = table.schema.get_field_index(name)
+        if i < 0:
+            continue
+        if dtype == "category":
+            table = table.set_column(i, name, pc.dictionary_encode(table.column(i)))
+        elif dtype in INT_TYPES:
+            table = table.set_column(i, name, table.column(i).cast(getattr(pa, dtype)()))
+    df = table.to_pandas()
+    return finish(df, dtypes)
+
+
+def csv_dtypes(dtypes):
+    # Typy, które można bezpiecznie podać do pd.read_csv(dtype=...)
+    return {name: dtype for name, dtype in dtypes.items() if dtype == "category" or dtype in INT_TYPES}
+
+
+def finish(df, dtypes):
+    # Kroki wymagające danych: float32 bez utraty dokładności, kolejność kategorii
+    for name, dtype in dtypes.items():
+        if name not in df.columns:
+            continue
+        values = df[name]
+        if dtype == "float32" and values.dtype == "float64":
+            narrow = values.to_numpy().astype("float32")
+            if np.array_equal(narrow.astype("float64"), values.to_numpy(), equal_nan=True):
+                df[name] = narrow
+        elif dtype == "category" and isinstance(values.dtype, pd.CategoricalDtype):
+            df[name] = values.cat.reorder_categories(sorted(values.cat.categories))
+        elif dtype == "string[pyarrow]" and values.dtype == object:
+            df[name] = values.astype(dtype)
+    return df
+
+
+def default_size(df):
+    # Szacowany rozmiar tej samej ramki w domyślnych typach pd.read_csv
+    # (int64/float64 i object), liczony jak memory_usage(deep=True)
+    size = int(df.index.memory_usage())
+    for name in df.columns:
+        values = df[name]
+        size += (1 if values.dtype == bool else 8) * len(values)
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            counts = np.bincount(values.cat.codes[values.cat.codes >= 0], minlength=len(values.cat.categories))
+            size += int(sum(sys.getsizeof(v) * int(c) for v, c in zip(values.cat.categories, counts)))
+        elif not pd.api.types.is_numeric_dtype(values.dtype) and len(values):
+            sample = values.iloc[:: max(1, len(values) // 1000)].dropna()
+            if len(sample):
+                size += int(sum(sys.getsizeof(str(v)) for v in sample) / len(sample) * values.count())
+    return size
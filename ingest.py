@@ -0,0 +1,84 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from blob_store import hash_stream
+from data import save_file
+
+# -------------------------------
+# Zapisywanie wgranych plików w tle
+# -------------------------------
+WORKERS = int(os.environ.get("INGEST_WORKERS", "2"))
+# Ile zakończonych zadań pamiętamy (do odpytywania o status)
+MAX_FINISHED_JOBS = 200
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class IngestJob:
+    def __init__(self, user_id, filename):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.filename = filename
+        self.status = QUEUED
+        self.progress = 0.0
+        self.stage = "W kolejce"
+        self.message = None
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+    def update(self, progress, stage):
+        self.progress = progress
+        self.stage = stage
+
+
+_executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="ingest")
+_jobs = {}
+# (user_id, nazwa, hash zawartości) -> id zadania: ten sam plik wysłany
+# ponownie w trakcie zapisu (np. z drugiej karty) nie tworzy nowego zadania
+_job_keys = {}
+_lock = threading.Lock()
+
+
+def _run(job, file):
+    job.status = RUNNING
+    try:
+        success, message = save_file(job.user_id, job.filename, file, progress=job.update)
+    except Exception as e:
+        success, message = False, f"Błąd podczas zapisywania pliku: {str(e)}"
+    job.message = message
+    job.finished_at = time.time()
+    job.status = DONE if success else FAILED
+
+
+def _prune():
+    finished = sorted((job for job in _jobs.values() if job.finished), key=lambda job: job.finished_at)
+    for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+        del _jobs[job.id]
+    for key in [key for key, job_id in _job_keys.items() if job_id not in _jobs]:
+        del _job_keys[key]
+
+
+def submit_upload(user_id, filename, file):
+    # file: plik binarny z możliwością przewijania (np. UploadedFile); zadanie
+    # czyta go samo, więc nie trzeba kopiować zawartości (getvalue())
+    key = (user_id, filename, hash_stream(file))
+    with _lock:
+        job_id = _job_keys.get(key)
+        if job_id in _jobs and not _jobs[job_id].finished:
+            return job_id
+        _prune()
+        job = IngestJob(user_id, filename)
+        _jobs[job.id] = job
+        _job_keys[key] = job.id
+    _executor.submit(_run, job, file)
+    return job.id
+
+
+def get_job(job_id):
+    return _jobs.get(job_id)
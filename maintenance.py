@@ -0,0 +1,176 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import db
+import file_tables
+
+# -------------------------------
+# Okresowe utrzymanie bazy (w tle)
+# -------------------------------
+# Baza działa z auto_vacuum=INCREMENTAL: strony zwolnione przez usunięte
+# pliki i notatki trafiają na listę wolnych stron, a PRAGMA incremental_vacuum
+# oddaje je systemowi (plik bazy maleje przy checkpoincie WAL). Przy okazji
+# odświeżamy statystyki planera (ANALYZE z limitem, PRAGMA optimize) i
+# usuwamy osierocone tabele DuckDB (file_tables.cleanup).
+# Każdy proces aplikacji uruchamia własny wątek; MAINTENANCE_INTERVAL=0 go
+# wyłącza (zostaje `python maintenance.py run`).
+INTERVAL = float(os.environ.get("MAINTENANCE_INTERVAL", "3600"))
+# Ile wolnych stron oddać za jednym razem (0 = wszystkie)
+VACUUM_PAGES = int(os.environ.get("MAINTENANCE_VACUUM_PAGES", "0"))
+# Ile wierszy indeksu ANALYZE ogląda na indeks (PRAGMA analysis_limit)
+ANALYSIS_LIMIT = 1000
+# Ile największych tabel/indeksów pokazujemy w raporcie
+REPORT_TABLES = 10
+
+logger = logging.getLogger(__name__)
+
+last_report = None
+_thread = None
+_stop = threading.Event()
+_lock = threading.Lock()
+
+
+def _file_size(path):
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def storage_stats(conn, tables=True):
+    stats = {
+        "page_size": conn.execute("PRAGMA page_size").fetchone()[0],
+        "page_count": conn.execute("PRAGMA page_count").fetchone()[0],
+        "freelist_count": conn.execute("PRAGMA freelist_count").fetchone()[0],
+        "file_bytes": _file_size(db.DB_PATH),
+        "wal_bytes": _file_size(db.DB_PATH + "-wal"),
+        "tables": None,
+    }
+    if tables:
+        stats["tables"] = _table_stats(conn)
+    return stats
+
+
+def _table_stats(conn):
+    # Na tabelę/indeks: strony, nieużyte bajty w stronach i fragmentacja
+    # (odsetek stron, które nie leżą w pliku zaraz za poprzednią stroną
+    # drzewa, jak w sqlite3_analyzer). None bez rozszerzenia dbstat.
+    try:
+        rows = conn.execute("SELECT name, pageno, pgsize, unused FROM dbstat")
+        tables = {}
+        previous = {}
+        for name, pageno, pgsize, unused in rows:
+            table = tables.setdefault(name, {"name": name, "pages": 0, "bytes": 0, "unused": 0, "gaps": 0})
+            table["pages"] += 1
+            table["bytes"] += pgsize
+            table["unused"] += unused
+            if name in previous and pageno != previous[name] + 1:
+                table["gaps"] += 1
+            previous[name] = pageno
+    except sqlite3.OperationalError:
+        return None
+    result = sorted(tables.values(), key=lambda table: table["pages"], reverse=True)
+    for table in result:
+        table["fragmentation"] = table.pop("gaps") / max(table["pages"] - 1, 1)
+    return result
+
+
+def run():
+    # Jedno przejście utrzymania; zwraca raport (także w last_report)
+    global last_report
+    started = time.time()
+    dropped_tables = file_tables.cleanup()
+    with db.connection() as conn:
+        before = storage_stats(conn, tables=False)
+        # incremental_vacuum zwalnia jedną stronę na krok zapytania, a
+        # execute() robi tylko pierwszy krok; executescript wykonuje wszystkie
+        conn.executescript(f"PRAGMA incremental_vacuum({VACUUM_PAGES})")
+        conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+        conn.execute("ANALYZE")
+        conn.execute("PRAGMA optimize")
+        # Skrócenie pliku po incremental_vacuum trafia do bazy przy checkpoincie
+        busy, _, _ = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+        after = storage_stats(conn)
+    report = {
+        "started": started,
+        "duration": time.time() - started,
+        "freed_pages": before["freelist_count"] - after["freelist_count"],
+        "reclaimed_bytes": (before["file_bytes"] + before["wal_bytes"]) - (after["file_bytes"] + after["wal_bytes"]),
+        "checkpoint_busy": bool(busy),
+        "dropped_tables": dropped_tables,
+        "before": before,
+        "after": after,
+    }
+    last_report = report
+    logger.info("Utrzymanie bazy: zwolniono %d stron, odzyskano %d B w %.2f s",
+                report["freed_pages"], report["reclaimed_bytes"], report["duration"])
+    return report
+
+
+def _loop():
+    while not _stop.wait(INTERVAL):
+        try:
+            run()
+        except Exception:
+            logger.exception("Błąd utrzymania bazy")
+
+
+def start():
+    # Uruchamia wątek utrzymania raz na proces
+    global _thread
+    if INTERVAL <= 0:
+        return
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(target=_loop, name="db-maintenance", daemon=True)
+            _thread.start()
+
+
+def stop():
+    _stop.set()
+
+
+def format_stats(stats):
+    lines = [f"Strony: {stats['page_count']} po {stats['page_size']} B, wolne: {stats['freelist_count']}, "
+             f"plik: {stats['file_bytes']} B, WAL: {stats['wal_bytes']} B"]
+    if stats["tables"]:
+        lines.append(f"{'tabela/indeks':32} {'strony':>8} {'nieużyte':>9} {'fragmentacja':>13}")
+        for table in stats["tables"][:REPORT_TABLES]:
+            lines.append(f"{table['name']:32} {table['pages']:8} {table['unused'] / table['bytes']:9.1%} "
+                         f"{table['fragmentation']:13.1%}")
+    return "\n".join(lines)
+
+
+def format_report(report):
+    before, after = report["before"], report["after"]
+    lines = [
+        f"Czas: {report['duration']:.2f} s",
+        f"Zwolnione strony: {report['freed_pages']} ({report['freed_pages'] * after['page_size'] / 1024:.1f} KiB)",
+        f"Rozmiar bazy: {before['file_bytes'] + before['wal_bytes']} B -> "
+        f"{after['file_bytes'] + after['wal_bytes']} B (odzyskano {report['reclaimed_bytes']} B)",
+    ]
+    if report["dropped_tables"]:
+        lines.append(f"Usunięte osierocone tabele DuckDB: {report['dropped_tables']}")
+    if report["checkpoint_busy"]:
+        lines.append("Checkpoint WAL niepełny (aktywni czytelnicy) - plik zmaleje przy kolejnym")
+    lines.append(format_stats(after))
+    return "\n".join(lines)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Utrzymanie bazy notatek")
+    parser.add_argument("command", choices=["run", "stats"])
+    args = parser.parse_args()
+
+    db.init_db()
+    if args.command == "run":
+        print(format_report(run()))
+        return
+    with db.connection() as conn:
+        print(format_stats(storage_stats(conn)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,513 @@
+import io
+import sqlite3
+
+import blob_store as blobs
+
+# -------------------------------
+# Migracje schematu bazy
+# -------------------------------
+# Wersja schematu trzymana jest w PRAGMA user_version. Migracja N przenosi
+# bazę z wersji N-1 do N; każda wykonuje się w osobnej transakcji.
+# Do migracji można dołączyć plany zapytań (PLAN_CHECKS) sprawdzane przez
+# `python migrations.py verify`.
+
+
+def initial_schema(c):
+    # Schemat sprzed wprowadzenia migracji; wszystkie polecenia są
+    # idempotentne, bo istniejące bazy mogą mieć już część zmian
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL
+        )
+    ''')
+
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS notes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            content TEXT NOT NULL,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    ''')
+
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS shared_notes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            note_id INTEGER NOT NULL,
+            shared_with_user_id INTEGER NOT NULL,
+            FOREIGN KEY(note_id) REFERENCES notes(id),
+            FOREIGN KEY(shared_with_user_id) REFERENCES users(id)
+        )
+    ''')
+
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS files (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            filename TEXT NOT NULL,
+            file_data BLOB NOT NULL,
+            upload_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    ''')
+
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS shared_files (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            file_id INTEGER NOT NULL,
+            shared_with_user_id INTEGER NOT NULL,
+            share_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(file_id) REFERENCES files(id),
+            FOREIGN KEY(shared_with_user_id) REFERENCES users(id)
+        )
+    ''')
+
+    # Indeks pełnotekstowy notatek (FTS5, treść trzymana w tabeli notes)
+    fts_exists = c.execute("SELECT 1 FROM sqlite_master WHERE name = 'notes_fts'").fetchone()
+    c.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
+            content,
+            content='notes',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS notes_fts_insert AFTER INSERT ON notes BEGIN
+            INSERT INTO notes_fts(rowid, content) VALUES (new.id, new.content);
+        END
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS notes_fts_delete AFTER DELETE ON notes BEGIN
+            INSERT INTO notes_fts(notes_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        END
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS notes_fts_update AFTER UPDATE OF content ON notes BEGIN
+            INSERT INTO notes_fts(notes_fts, rowid, content) VALUES ('delete', old.id, old.content);
+            INSERT INTO notes_fts(rowid, content) VALUES (new.id, new.content);
+        END
+    ''')
+    if not fts_exists:
+        # Zaindeksuj notatki zapisane przed utworzeniem indeksu
+        c.execute("INSERT INTO notes_fts(notes_fts) VALUES ('rebuild')")
+
+    # Kolumnowa kopia (Parquet) wgranego pliku CSV
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS file_columnar (
+            file_id INTEGER PRIMARY KEY,
+            format TEXT NOT NULL,
+            data BLOB NOT NULL,
+            FOREIGN KEY(file_id) REFERENCES files(id)
+        )
+    ''')
+
+    # Indeksy pod sortowanie i stronicowanie list notatek i plików
+    c.execute("CREATE INDEX IF NOT EXISTS idx_notes_user_timestamp ON notes(user_id, timestamp, id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_notes_user_content ON notes(user_id, content COLLATE NOCASE, id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_files_user_upload ON files(user_id, upload_date, id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_shared_files_user_date "
+              "ON shared_files(shared_with_user_id, share_date, id)")
+
+    # Hash zawartości pliku (klucz cache wczytanych danych)
+    columns = [row[1] for row in c.execute("PRAGMA table_info(files)")]
+    if "content_hash" not in columns:
+        c.execute("ALTER TABLE files ADD COLUMN content_hash TEXT")
+    # Po jednym pliku, czytanym strumieniowo (blobopen) - nie trzymamy zawartości w pamięci
+    last_id = 0
+    while True:
+        row = c.execute("SELECT id FROM files WHERE id > ? AND content_hash IS NULL ORDER BY id LIMIT 1",
+                        (last_id,)).fetchone()
+        if row is None:
+            break
+        last_id = row[0]
+        with c.connection.blobopen("files", "file_data", last_id, readonly=True) as blob:
+            content_hash = blobs.hash_stream(blob)
+        c.execute("UPDATE files SET content_hash = ? WHERE id = ?", (content_hash, last_id))
+
+
+def performance_indexes(c):
+    # Unikalna nazwa pliku w obrębie użytkownika (save_file i rename_file
+    # już to sprawdzają). Ewentualne duplikaty dostają sufiks z id pliku.
+    c.execute('''
+        UPDATE files
+        SET filename = CASE
+            WHEN lower(filename) LIKE '%.csv'
+            THEN substr(filename, 1, length(filename) - 4) || '_' || id || substr(filename, -4)
+            ELSE filename || '_' || id
+        END
+        WHERE id NOT IN (SELECT MIN(id) FROM files GROUP BY user_id, filename)
+    ''')
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_files_user_filename ON files(user_id, filename)")
+
+    # Udostępnienie danego pliku/notatki danemu użytkownikowi tylko raz
+    c.execute('''
+        DELETE FROM shared_files
+        WHERE id NOT IN (SELECT MIN(id) FROM shared_files GROUP BY shared_with_user_id, file_id)
+    ''')
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_shared_files_user_file "
+              "ON shared_files(shared_with_user_id, file_id)")
+    c.execute('''
+        DELETE FROM shared_notes
+        WHERE id NOT IN (SELECT MIN(id) FROM shared_notes GROUP BY shared_with_user_id, note_id)
+    ''')
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_shared_notes_user_note "
+              "ON shared_notes(shared_with_user_id, note_id)")
+
+    # Złączenia od strony pliku/notatki (dostęp do udostępnionych plików, usuwanie udostępnień)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_shared_files_file ON shared_files(file_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_shared_notes_note ON shared_notes(note_id)")
+
+
+def file_profiles(c):
+    # Profil kolumn pliku (JSON z column_profile.build_profile)
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS file_profiles (
+            file_id INTEGER PRIMARY KEY,
+            profile TEXT NOT NULL,
+            FOREIGN KEY(file_id) REFERENCES files(id)
+        )
+    ''')
+
+
+def file_tables(c):
+    # Rejestr tabel file_rows_<id> z wierszami plików (file_tables.py);
+    # columns to JSON z oryginalnymi nazwami kolumn c0, c1, ...
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS file_tables (
+            file_id INTEGER PRIMARY KEY,
+            columns TEXT NOT NULL,
+            row_count INTEGER NOT NULL,
+            FOREIGN KEY(file_id) REFERENCES files(id)
+        )
+    ''')
+
+
+def blob_store(c):
+    # Zawartość plików w tabeli blobs (blob_store.py): jedna skompresowana
+    # kopia na hash zamiast pełnej kopii w każdym wierszu files
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS blobs (
+            hash TEXT PRIMARY KEY,
+            codec TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            data BLOB NOT NULL,
+            ref_count INTEGER NOT NULL
+        )
+    ''')
+
+    # Przeniesienie istniejących plików, po jednym (nie trzymamy wszystkich w pamięci)
+    last_id = 0
+    while True:
+        row = c.execute("SELECT id, file_data, content_hash FROM files WHERE id > ? ORDER BY id LIMIT 1",
+                        (last_id,)).fetchone()
+        if row is None:
+            break
+        last_id, file_data, content_hash = row
+        blobs.put(c.connection, content_hash, io.BytesIO(file_data))
+    c.execute("ALTER TABLE files DROP COLUMN file_data")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_files_content_hash ON files(content_hash)")
+    c.execute("UPDATE blobs SET ref_count = (SELECT COUNT(*) FROM files WHERE content_hash = blobs.hash)")
+
+    # Liczniki odwołań: każdy wiersz files to jedno odwołanie; zawartość
+    # bez odwołań jest usuwana razem z ostatnim plikiem
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS files_blob_ref AFTER INSERT ON files BEGIN
+            UPDATE blobs SET ref_count = ref_count + 1 WHERE hash = NEW.content_hash;
+        END
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS files_blob_unref AFTER DELETE ON files BEGIN
+            UPDATE blobs SET ref_count = ref_count - 1 WHERE hash = OLD.content_hash;
+            DELETE FROM blobs WHERE hash = OLD.content_hash AND ref_count <= 0;
+        END
+    ''')
+
+
+def _rebuild_table(c, table, create_sql):
+    # SQLite nie zmienia kluczy obcych przez ALTER TABLE: nowa tabela,
+    # kopia wierszy, podmiana nazwy; indeksy i wyzwalacze tworzymy ponownie
+    extras = [row[0] for row in c.execute(
+        "SELECT sql FROM sqlite_master WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL",
+        (table,))]
+    columns = ", ".join(row[1] for row in c.execute(f"PRAGMA table_info({table})"))
+    seq = c.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+    c.execute(create_sql.format(name=f"{table}_new"))
+    c.execute(f"INSERT INTO {table}_new ({columns}) SELECT {columns} FROM {table}")
+    c.execute(f"DROP TABLE {table}")
+    c.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+    for sql in extras:
+        c.execute(sql)
+    if seq is not None:
+        # AUTOINCREMENT: id usuniętych wierszy nie mogą wrócić
+        c.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?", (seq[0], table))
+
+
+def cascade_deletes(c):
+    # Klucze obce z ON DELETE CASCADE: usunięcie konta, notatki albo pliku
+    # usuwa zależne wiersze (udostępnienia, artefakty plików). Migracje
+    # działają z wyłączonym PRAGMA foreign_keys (migrate).
+    # Najpierw sieroty, które już są w bazie (wyzwalacze files zwalniają zawartość)
+    c.execute("DELETE FROM notes WHERE user_id IS NOT NULL AND user_id NOT IN (SELECT id FROM users)")
+    c.execute("DELETE FROM files WHERE user_id NOT IN (SELECT id FROM users)")
+    c.execute("DELETE FROM shared_notes WHERE note_id NOT IN (SELECT id FROM notes) "
+              "OR shared_with_user_id NOT IN (SELECT id FROM users)")
+    c.execute("DELETE FROM shared_files WHERE file_id NOT IN (SELECT id FROM files) "
+              "OR shared_with_user_id NOT IN (SELECT id FROM users)")
+    for table in ("file_columnar", "file_profiles", "file_tables"):
+        c.execute(f"DELETE FROM {table} WHERE file_id NOT IN (SELECT id FROM files)")
+
+    _rebuild_table(c, "notes", '''
+        CREATE TABLE {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            content TEXT NOT NULL,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        )
+    ''')
+    _rebuild_table(c, "shared_notes", '''
+        CREATE TABLE {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            note_id INTEGER NOT NULL,
+            shared_with_user_id INTEGER NOT NULL,
+            FOREIGN KEY(note_id) REFERENCES notes(id) ON DELETE CASCADE,
+            FOREIGN KEY(shared_with_user_id) REFERENCES users(id) ON DELETE CASCADE
+        )
+    ''')
+    _rebuild_table(c, "files", '''
+        CREATE TABLE {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            filename TEXT NOT NULL,
+            upload_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+            content_hash TEXT,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        )
+    ''')
+    _rebuild_table(c, "shared_files", '''
+        CREATE TABLE {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            file_id INTEGER NOT NULL,
+            shared_with_user_id INTEGER NOT NULL,
+            share_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(file_id) REFERENCES files(id) ON DELETE CASCADE,
+            FOREIGN KEY(shared_with_user_id) REFERENCES users(id) ON DELETE CASCADE
+        )
+    ''')
+    _rebuild_table(c, "file_columnar", '''
+        CREATE TABLE {name} (
+            file_id INTEGER PRIMARY KEY,
+            format TEXT NOT NULL,
+            data BLOB NOT NULL,
+            FOREIGN KEY(file_id) REFERENCES files(id) ON DELETE CASCADE
+        )
+    ''')
+    _rebuild_table(c, "file_profiles", '''
+        CREATE TABLE {name} (
+            file_id INTEGER PRIMARY KEY,
+            profile TEXT NOT NULL,
+            FOREIGN KEY(file_id) REFERENCES files(id) ON DELETE CASCADE
+        )
+    ''')
+    _rebuild_table(c, "file_tables", '''
+        CREATE TABLE {name} (
+            file_id INTEGER PRIMARY KEY,
+            columns TEXT NOT NULL,
+            row_count INTEGER NOT NULL,
+            FOREIGN KEY(file_id) REFERENCES files(id) ON DELETE CASCADE
+        )
+    ''')
+
+    violations = c.execute("PRAGMA foreign_key_check").fetchall()
+    if violations:
+        raise RuntimeError(f"Naruszone klucze obce po migracji: {violations[:10]}")
+
+
+def file_samples(c):
+    # Losowa próbka wierszy pliku (approx.py) dla trybu przybliżonego;
+    # rows to liczba wierszy próbki
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS file_samples (
+            file_id INTEGER PRIMARY KEY,
+            format TEXT NOT NULL,
+            data BLOB NOT NULL,
+            rows INTEGER NOT NULL,
+            FOREIGN KEY(file_id) REFERENCES files(id) ON DELETE CASCADE
+        )
+    ''')
+
+
+MIGRATIONS = [
+    initial_schema,
+    performance_indexes,
+    file_profiles,
+    file_tables,
+    blob_store,
+    cascade_deletes,
+    file_samples,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+# Wartość PRAGMA auto_vacuum dla trybu INCREMENTAL
+AUTO_VACUUM_INCREMENTAL = 2
+
+# (opis, zapytanie, parametry, indeks albo fragment planu, który musi się w nim pojawić)
+PLAN_CHECKS = [
+    ("get_notes_page newest", "SELECT id, content, timestamp FROM notes WHERE user_id = ? "
+        "AND (timestamp, id) < (?, ?) ORDER BY timestamp DESC, id DESC LIMIT 21",
+     (1, "", 0), "idx_notes_user_timestamp"),
+    ("get_notes_page alpha", "SELECT id, content, timestamp FROM notes WHERE user_id = ? "
+        "AND (content, id) > (? COLLATE NOCASE, ?) ORDER BY content COLLATE NOCASE ASC, id ASC LIMIT 21",
+     (1, "", 0), "idx_notes_user_content"),
+    ("get_user_files_page", "SELECT id, filename, upload_date FROM files WHERE user_id = ? "
+        "ORDER BY upload_date DESC, id DESC LIMIT 21",
+     (1,), "idx_files_user_upload"),
+    ("save_file: nazwa zajęta", "SELECT id FROM files WHERE user_id = ? AND filename = ?",
+     (1, "a.csv"), "ux_files_user_filename"),
+    ("share_file_with_user: już udostępniony",
+     "SELECT id FROM shared_files WHERE file_id = ? AND shared_with_user_id = ?",
+     (1, 1), "ux_shared_files_user_file"),
+    ("share_note_with_user: już udostępniona",
+     "SELECT id FROM shared_notes WHERE note_id = ? AND shared_with_user_id = ?",
+     (1, 1), "ux_shared_notes_user_note"),
+    ("get_shared_notes", '''
+        SELECT n.id, n.content, n.timestamp, u.username
+        FROM notes n
+        JOIN shared_notes s ON n.id = s.note_id
+        JOIN users u ON n.user_id = u.id
+        WHERE s.shared_with_user_id = ?
+        ORDER BY n.timestamp DESC
+    ''', (1,), "ux_shared_notes_user_note"),
+    ("get_file_storage_shared", '''
+        SELECT b.size, fc.file_id IS NOT NULL
+        FROM files f
+        JOIN blobs b ON b.hash = f.content_hash
+        LEFT JOIN file_columnar fc ON fc.file_id = f.id
+        LEFT JOIN shared_files sf ON f.id = sf.file_id
+        WHERE f.id = ? AND (f.user_id = ? OR sf.shared_with_user_id = ?)
+    ''', (1, 1, 1), "idx_shared_files_file"),
+    ("get_shared_files_page", '''
+        SELECT f.id, f.filename, f.upload_date, u.username, sf.share_date, sf.id
+        FROM shared_files sf
+        JOIN files f ON f.id = sf.file_id
+        JOIN users u ON f.user_id = u.id
+        WHERE sf.shared_with_user_id = ? AND (sf.share_date, sf.id) < (?, ?)
+        ORDER BY sf.share_date DESC, sf.id DESC
+        LIMIT 21
+    ''', (1, "", 0), "idx_shared_files_user_date"),
+    # Artefakty plików: wiersz po kluczu głównym file_id (alias rowid)
+    ("get_file_profile_shared", '''
+        SELECT fp.profile
+        FROM files f
+        JOIN file_profiles fp ON fp.file_id = f.id
+        LEFT JOIN shared_files sf ON f.id = sf.file_id
+        WHERE f.id = ? AND (f.user_id = ? OR sf.shared_with_user_id = ?)
+    ''', (1, 1, 1), "SEARCH fp USING INTEGER PRIMARY KEY"),
+    ("get_file_sample_rows_shared", '''
+        SELECT fs.rows
+        FROM files f
+        JOIN file_samples fs ON fs.file_id = f.id
+        LEFT JOIN shared_files sf ON f.id = sf.file_id
+        WHERE f.id = ? AND (f.user_id = ? OR sf.shared_with_user_id = ?)
+    ''', (1, 1, 1), "SEARCH fs USING INTEGER PRIMARY KEY"),
+    ("file_tables.get_table", "SELECT columns FROM file_tables WHERE file_id = ?",
+     (1,), "SEARCH file_tables USING INTEGER PRIMARY KEY"),
+    # Zawartość plików: odczyt po hashu i liczniki odwołań (wyzwalacze files)
+    ("blob_store.open_content", "SELECT rowid, codec FROM blobs WHERE hash = ?",
+     ("",), "sqlite_autoindex_blobs_1"),
+    ("blob_store: odwołania do zawartości", "SELECT COUNT(*) FROM files WHERE content_hash = ?",
+     ("",), "idx_files_content_hash"),
+]
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    # Zwraca listę wykonanych migracji; conn musi być w trybie autocommit.
+    # Klucze obce są wyłączone na czas migracji: przebudowa tabeli (DROP TABLE)
+    # z włączonymi kaskadami usunęłaby wiersze zależne.
+    applied = []
+    foreign_keys = conn.execute("PRAGMA foreign_keys").fetchone()[0]
+    conn.execute("PRAGMA foreign_keys = OFF")
+    try:
+        for version, migration in enumerate(MIGRATIONS, start=1):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Wersję czytamy pod blokadą zapisu: inny proces mógł właśnie migrować
+                if schema_version(conn) >= version:
+                    conn.rollback()
+                    continue
+                migration(conn.cursor())
+                conn.execute(f"PRAGMA user_version = {version}")
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+            applied.append(migration.__name__)
+    finally:
+        conn.execute(f"PRAGMA foreign_keys = {foreign_keys}")
+
+    # auto_vacuum istniejącej bazy zmienia dopiero VACUUM (poza transakcją);
+    # nowe bazy dostają INCREMENTAL od razu (db.PRAGMAS)
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        applied.append("auto_vacuum")
+    return applied
+
+
+def check_query_plans(conn=None):
+    # Sprawdza plany na świeżej bazie w pamięci z pełnym schematem: bez
+    # statystyk ANALYZE wynik zależy tylko od schematu, a nie od danych.
+    # conn - własna, już zmigrowana baza (np. w testach).
+    # Zwraca listę zapytań, które nie używają oczekiwanego indeksu.
+    own = conn is None
+    if own:
+        conn = sqlite3.connect(":memory:", isolation_level=None)
+        migrate(conn)
+    try:
+        problems = []
+        for name, sql, params, index in PLAN_CHECKS:
+            plan = " | ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+            if index not in plan:
+                problems.append(f"{name}: oczekiwano {index}, plan: {plan}")
+        return problems
+    finally:
+        if own:
+            conn.close()
+
+
+def main():
+    import argparse
+    import sys
+
+    import db
+
+    parser = argparse.ArgumentParser(description="Migracje schematu bazy notatek")
+    parser.add_argument("command", choices=["migrate", "status", "verify"])
+    args = parser.parse_args()
+
+    if args.command == "verify":
+        problems = check_query_plans()
+        for problem in problems:
+            print(problem)
+        if problems:
+            sys.exit(1)
+        print(f"Plany zapytań zgodne z oczekiwaniami ({len(PLAN_CHECKS)} zapytań)")
+        return
+
+    if args.command == "migrate":
+        applied = db.init_db()
+        print(f"Wykonane migracje: {', '.join(applied) or 'brak'}")
+    with db.connection() as conn:
+        print(f"Wersja schematu: {schema_version(conn)} / {SCHEMA_VERSION}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import inspect
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from functools import wraps
+
+# -------------------------------
+# Cache wyników zapytań odczytu (listy notatek i plików, kontrola dostępu)
+# -------------------------------
+# Każde przeładowanie strony (i każda karta przeglądarki) pyta bazę o te same
+# listy notatek i plików. Wyniki trzymamy w cache procesu pod kluczem
+# (funkcja, argumenty); argumenty zawierają id użytkownika, więc wpisy są
+# osobne dla każdego użytkownika. Każdy wpis ma tagi danych, od których
+# zależy, np. ("files", user_id), a funkcje zapisu w data.py po zatwierdzeniu
+# transakcji unieważniają dokładnie te tagi, które zmieniły.
+# Zapisy z innego procesu nie unieważniają cache - wpis żyje wtedy najwyżej
+# QUERY_CACHE_TTL sekund. QUERY_CACHE_MAX_ENTRIES=0 wyłącza cache.
+MAX_ENTRIES = int(os.environ.get("QUERY_CACHE_MAX_ENTRIES", "10000"))
+TTL = float(os.environ.get("QUERY_CACHE_TTL", "60"))
+
+
+class QueryCache:
+    def __init__(self, max_entries=MAX_ENTRIES, ttl=TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # klucz -> (wynik, tagi, czas zapisu)
+        self._entries = OrderedDict()
+        # tag -> klucze wpisów z tym tagiem
+        self._tagged = defaultdict(set)
+        # tag -> licznik unieważnień; wynik policzony przed unieważnieniem
+        # (zapytanie równoległe z zapisem) nie trafia do cache
+        self._generations = defaultdict(int)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _drop(self, key):
+        _, tags, _ = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tagged.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tagged[tag]
+
+    def get(self, key):
+        # (czy jest, wynik)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[2] > self.ttl:
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[0]
+
+    def generations(self, tags):
+        with self._lock:
+            return tuple(self._generations[tag] for tag in tags)
+
+    def put(self, key, value, tags, generations):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            if generations != tuple(self._generations[tag] for tag in tags):
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, tags, time.monotonic())
+            for tag in tags:
+                self._tagged[tag].add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self, *tags):
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] += 1
+                for key in list(self._tagged.get(tag, ())):
+                    self._drop(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            for tag in list(self._generations):
+                self._generations[tag] += 1
+            self._entries.clear()
+            self._tagged.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries, "hits": self.hits,
+                    "misses": self.misses, "invalidations": self.invalidations}
+
+
+query_cache = QueryCache()
+
+
+def cached(tags):
+    # Dekorator funkcji odczytu; tags(*argumenty) zwraca tagi wpisu.
+    # Wynik jest wspólny dla wszystkich wywołań, więc wywołujący nie mogą
+    # go modyfikować (jak ramek z frame_cache).
+    def decorate(func):
+        signature = inspect.signature(func)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = (func.__name__, bound.args)
+            try:
+                hash(key)
+            except TypeError:
+                # Niehaszowalne argumenty (np. lista) - bez cache
+                return func(*bound.args)
+            found, value = query_cache.get(key)
+            if found:
+                return value
+            entry_tags = tuple(tags(*bound.args))
+            generations = query_cache.generations(entry_tags)
+            value = func(*bound.args)
+            query_cache.put(key, value, entry_tags, generations)
+            return value
+        return wrapper
+    return decorate
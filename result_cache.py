@@ -0,0 +1,163 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+
+# -------------------------------
+# Cache wyników agregacji i wykresów (histogram, liczności, grupowanie)
+# -------------------------------
+# Wynik zależy tylko od zawartości pliku i zapytania, więc kluczem jest
+# (hash zawartości, spec filtra, operacja, kolumny i parametry) - a nie id
+# pliku czy użytkownika: ten sam widok pliku udostępnionego wielu osobom
+# liczymy raz, a nowa zawartość to nowy klucz (bez unieważniania).
+# Wyniki trzymamy jako bajty pickle: rozmiar wpisu jest znany, każdy
+# odczyt dostaje własną kopię, a na dysk trafiają te same bajty.
+# RESULT_CACHE_DIR włącza drugi poziom na dysku (przeżywa restart serwera,
+# wspólny dla procesów); katalog musi być zaufany (pickle).
+MAX_BYTES = int(os.environ.get("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+DISK_DIR = os.environ.get("RESULT_CACHE_DIR")
+DISK_MAX_BYTES = int(os.environ.get("RESULT_CACHE_DISK_MAX_BYTES", str(1024 * 1024 * 1024)))
+# Zmiana formatu wyników (np. innej budowy wykresów) unieważnia wpisy na dysku
+VERSION = 2
+
+
+class ResultCache:
+    def __init__(self, max_bytes=MAX_BYTES, directory=DISK_DIR, disk_max_bytes=DISK_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.disk_max_bytes = disk_max_bytes
+        # klucz -> bajty pickle
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._disk_bytes = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        # (czy jest, wynik)
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if payload is None:
+            payload = self._disk_get(key)
+            if payload is None:
+                with self._lock:
+                    self.misses += 1
+                return False, None
+            with self._lock:
+                self.disk_hits += 1
+            self._memory_put(key, payload)
+        return True, pickle.loads(payload)
+
+    def put(self, key, value):
+        try:
+            payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            # Wynik, którego nie da się zapisać - po prostu bez cache
+            return
+        self._memory_put(key, payload)
+        self._disk_put(key, payload)
+
+    def _memory_put(self, key, payload):
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[key] = payload
+            self._bytes += len(payload)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    # -------------------------------
+    # Poziom dyskowy
+    # -------------------------------
+    def _path(self, key):
+        digest = hashlib.sha256(repr((VERSION, key)).encode()).hexdigest()
+        return os.path.join(self.directory, f"{digest}.pkl")
+
+    def _disk_get(self, key):
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                payload = f.read()
+            # Czas modyfikacji to czas ostatniego użycia (usuwamy najdawniej używane)
+            os.utime(path)
+        except OSError:
+            return None
+        return payload
+
+    def _disk_put(self, key, payload):
+        if not self.directory or len(payload) > self.disk_max_bytes:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # Zapis do pliku tymczasowego i zamiana: inny proces nie przeczyta połowy wpisu
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            return
+        with self._disk_lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = self._disk_usage()
+            else:
+                self._disk_bytes += len(payload)
+            if self._disk_bytes > self.disk_max_bytes:
+                self._disk_evict()
+
+    def _disk_entries(self):
+        # [(czas użycia, rozmiar, ścieżka)]
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".pkl"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _disk_usage(self):
+        return sum(size for _, size, _ in self._disk_entries())
+
+    def _disk_evict(self):
+        # Usuwa najdawniej używane wpisy do 90% limitu (żeby nie sprzątać przy każdym zapisie).
+        # Katalog mogą zapisywać też inne procesy, więc rozmiar liczymy od nowa.
+        entries = sorted(self._disk_entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.disk_max_bytes * 0.9:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        self._disk_bytes = total
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses,
+                    "disk_dir": self.directory, "disk_bytes": self._disk_bytes}
+
+
+result_cache = ResultCache()
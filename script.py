@@ -1,428 +1,161 @@
-import sqlite3
+import os
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 
-# -------------------------------
-# Inicjalizacja bazy danych
-# -------------------------------
-def init_db():
-    conn = sqlite3.connect("notes.db")
-    c = conn.cursor()
-    
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL
-        )
-    ''')
-    
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS notes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            content TEXT NOT NULL,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(id)
-        )
-    ''')
-    
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS shared_notes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            note_id INTEGER NOT NULL,
-            shared_with_user_id INTEGER NOT NULL,
-            FOREIGN KEY(note_id) REFERENCES notes(id),
-            FOREIGN KEY(shared_with_user_id) REFERENCES users(id)
-        )
-    ''')
-    
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS files (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            filename TEXT NOT NULL,
-            file_data BLOB NOT NULL,
-            upload_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(id)
-        )
-    ''')
-    
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS shared_files (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            file_id INTEGER NOT NULL,
-            shared_with_user_id INTEGER NOT NULL,
-            share_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY(file_id) REFERENCES files(id),
-            FOREIGN KEY(shared_with_user_id) REFERENCES users(id)
-        )
-    ''')
-    
-    conn.commit()
-    conn.close()
+import analysis
+import analysis_tasks
+import export
+import filters
+import maintenance
+import timing
+from analysis_pool import AnalysisError, analysis_pool
+from column_profile import describe_frame, column_stats, columns_of_kind
+from db import init_db
+from ingest import DONE, get_job, submit_upload
+from data import (
+    register_user, login_user, delete_account, check_user_exists,
+    add_note, edit_note, get_notes_page, delete_note, search_notes,
+    share_note_with_user, get_shared_notes,
+    rename_file, get_user_files, get_user_files_page, delete_file,
+    share_file_with_user, get_shared_files, get_shared_files_page,
+    get_file_data_shared, get_file_hash_shared, get_file_profile_shared, get_file_storage_shared,
+    get_file_sample_rows_shared,
+)
 
 init_db()
+maintenance.start()
+analysis_pool.start()
+
+PAGE_SIZE = 20
+# Podgląd danych: wierszy na stronę
+PREVIEW_ROWS = 100
+# Co ile sekund odświeżamy komunikat o trwającej analizie
+ANALYSIS_POLL_INTERVAL = 0.25
+FILTER_MODES = {"Wszystkie (AND)": "and", "Dowolny (OR)": "or"}
+SORT_ORDERS = {"Najnowsze": "newest", "Najstarsze": "oldest", "Alfabetycznie": "alpha"}
+# Użytkownicy widzący panel czasów wykonania (loginy rozdzielone przecinkami)
+ADMIN_USERS = {name.strip() for name in os.environ.get("ADMIN_USERS", "").split(",") if name.strip()}
+# Ile ostatnich przebiegów sesji pokazuje panel czasów
+TIMING_HISTORY = 20
+TIMING_CATEGORIES = ["sqlite", "blob", "read_csv", "duckdb", "cache", "analysis", "pool", "plotly", "other"]
 
 # -------------------------------
-# Funkcje użytkownika
+# Pomiar czasu przebiegów (timing)
 # -------------------------------
-def register_user(username, password):
-    try:
-        conn = sqlite3.connect("notes.db")
-        c = conn.cursor()
-        c.execute("INSERT INTO users (username, password) VALUES (?, ?)", (username, password))
-        conn.commit()
-        conn.close()
-        return True
-    except sqlite3.IntegrityError:
-        return False
-
-def login_user(username, password):
-    conn = sqlite3.connect("notes.db")
-    c = conn.cursor()
-    c.execute("SELECT id FROM users WHERE username = ? AND password = ?", (username, password))
-    user = c.fetchone()
-    conn.close()
-    return user[0] if user else None
-
-def delete_account(user_id):
-    conn = sqlite3.connect("notes.db")
-    c = conn.cursor()
-    try:
-        # Usuń wszystkie pliki użytkownika
-        c.execute("DELETE FROM files WHERE user_id = ?", (user_id,))
-        
-        # Usuń wszystkie notatki użytkownika
-        c.execute("DELETE FROM notes WHERE user_id = ?", (user_id,))
-        
-        # Usuń udostępnienia notatek dla tego użytkownika
-        c.execute("DELETE FROM shared_notes WHERE shared_with_user_id = ?", (user_id,))
-        
-        # Usuń udostępnienia plików dla tego użytkownika
-        c.execute("DELETE FROM shared_files WHERE shared_with_user_id = ?", (user_id,))
-        
-        # Na końcu usuń samo konto
-        c.execute("DELETE FROM users WHERE id = ?", (user_id,))
-        
-        conn.commit()
-        conn.close()
-        return True, "Konto zostało usunięte"
-    except Exception as e:
-        conn.rollback()
-        conn.close()
-        return False, f"Błąd podczas usuwania konta: {str(e)}"
-
-def get_all_users():
-    conn = sqlite3.connect("notes.db")
-    c = conn.cursor()
-    c.execute("SELECT username FROM users ORDER BY username")
-    users = [row[0] for row in c.fetchall()]
-    conn.close()
-    return users
-
-def check_user_exists(username):
-    conn = sqlite3.connect("notes.db")
-    c = conn.cursor()
-    c.execute("SELECT id FROM users WHERE username = ?", (username,))
-    user = c.fetchone()
-    conn.close()
-    return user is not None
+@contextmanager
+def measured_run(name):
+    # Przebieg skryptu albo fragmentu; wynik trafia do historii sesji (panel
+    # czasów) i do logu. Profil i pamięć zbieramy tylko na żądanie z panelu.
+    with timing.run(name, st.session_state.get("timing_profile", False),
+                    st.session_state.get("timing_memory", False)) as run:
+        try:
+            yield
+        finally:
+            if run is not None:
+                st.session_state.setdefault("timing_runs", deque(maxlen=TIMING_HISTORY)).appendleft(run)
+
+def fragment(func):
+    # st.fragment, którego samodzielne przeliczenie jest mierzone jak przebieg
+    # (w przebiegu całego skryptu fragment liczy się do tego przebiegu)
+    @wraps(func)
+    def measured(*args, **kwargs):
+        with measured_run(f"fragment {func.__name__}"):
+            return func(*args, **kwargs)
+    return st.fragment(measured)
 
 # -------------------------------
-# Notatki
+# Stronicowanie list
 # -------------------------------
-def add_note(user_id, content):
-    conn = sqlite3.connect("notes.db")
-    c = conn.cursor()
-    c.execute("INSERT INTO notes (user_id, content) VALUES (?, ?)", (user_id, content))
-    conn.commit()
-    conn.close()
-
-def edit_note(note_id, user_id, new_content):
-    conn = sqlite3.connect("notes.db")
-    c = conn.cursor()
-    c.execute("UPDATE notes SET content = ? WHERE id = ? AND user_id = ?", (new_content, note_id, user_id))
-    success = c.rowcount > 0
-    conn.commit()
-    conn.close()
-    return success
-
-def get_notes(user_id):
-    conn = sqlite3.connect("notes.db")
-    c = conn.cursor()
-    c.execute("SELECT id, content, timestamp FROM notes WHERE user_id = ? ORDER BY timestamp DESC", (user_id,))
-    notes = c.fetchall()
-    conn.close()
-    return notes
-
-def delete_note(note_id, user_id):
-    conn = sqlite3.connect("notes.db")
-    c = conn.cursor()
-    c.execute("DELETE FROM notes WHERE id = ? AND user_id = ?", (note_id, user_id))
-    # Usuń też udostępnienia tej notatki
-    c.execute("DELETE FROM shared_notes WHERE note_id = ?", (note_id,))
-    conn.commit()
-    conn.close()
+# Dla każdej listy trzymamy w sesji stos kursorów początków odwiedzonych stron,
+# ostatni z nich to początek bieżącej strony
+def page_cursor(key):
+    return st.session_state.setdefault(f"{key}_cursors", [None])[-1]
+
+def reset_pages(key):
+    st.session_state[f"{key}_cursors"] = [None]
+
+def page_controls(key, next_cursor):
+    # Wywoływane wewnątrz fragmentu listy; zmiana strony przelicza tylko ją
+    cursors = st.session_state[f"{key}_cursors"]
+    if len(cursors) == 1 and next_cursor is None:
+        return
+    col1, col2, col3 = st.columns([1,1,1])
+    with col1:
+        if st.button("⬅️", key=f"{key}_prev", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun(scope="fragment")
+    with col2:
+        st.caption(f"Strona {len(cursors)}")
+    with col3:
+        if st.button("➡️", key=f"{key}_next", disabled=next_cursor is None):
+            cursors.append(next_cursor)
+            st.rerun(scope="fragment")
 
 # -------------------------------
-# Udostępnianie notatek
+# Status zapisu pliku w tle
 # -------------------------------
-def share_note_with_user(note_id, target_username):
-    conn = sqlite3.connect("notes.db")
-    c = conn.cursor()
-    # Pobierz id użytkownika docelowego
-    c.execute("SELECT id FROM users WHERE username = ?", (target_username,))
-    target_user = c.fetchone()
-    if not target_user:
-        conn.close()
-        return False, "Nie znaleziono użytkownika"
-    target_user_id = target_user[0]
-
-    # Sprawdź czy notatka należy do aktualnego użytkownika
-    c.execute("SELECT user_id FROM notes WHERE id = ?", (note_id,))
-    owner = c.fetchone()
-    if not owner or owner[0] != st.session_state.user_id:
-        conn.close()
-        return False, "Brak dostępu do notatki"
-
-    # Sprawdź, czy już nie udostępniono
-    c.execute("SELECT id FROM shared_notes WHERE note_id = ? AND shared_with_user_id = ?", (note_id, target_user_id))
-    if c.fetchone():
-        conn.close()
-        return False, "Notatka jest już udostępniona temu użytkownikowi"
-
-    c.execute("INSERT INTO shared_notes (note_id, shared_with_user_id) VALUES (?, ?)", (note_id, target_user_id))
-    conn.commit()
-    conn.close()
-    return True, "Notatka udostępniona"
-
-def get_shared_notes(user_id):
-    conn = sqlite3.connect("notes.db")
-    c = conn.cursor()
-    c.execute('''
-        SELECT n.id, n.content, n.timestamp, u.username
-        FROM notes n
-        JOIN shared_notes s ON n.id = s.note_id
-        JOIN users u ON n.user_id = u.id
-        WHERE s.shared_with_user_id = ?
-        ORDER BY n.timestamp DESC
-    ''', (user_id,))
-    shared = c.fetchall()
-    conn.close()
-    return shared
+def show_ingest_status(job_id):
+    job = get_job(job_id)
+    if job is None:
+        return
+
+    # Dopóki zadanie trwa, odświeżamy tylko ten fragment strony co sekundę
+    @st.fragment(run_every=None if job.finished else 1)
+    def status():
+        current = get_job(job_id)
+        if current is None:
+            return
+        if not current.finished:
+            st.progress(current.progress, text=f"⏳ {current.filename}: {current.stage}")
+            return
+        if not st.session_state.get(f"ingest_reloaded_{job_id}"):
+            # Przeładuj całą stronę raz, żeby nowy plik pojawił się na listach
+            st.session_state[f"ingest_reloaded_{job_id}"] = True
+            st.rerun(scope="app")
+        if current.status == DONE:
+            st.success(f"✅ {current.message}")
+        else:
+            st.error(f"❌ {current.message}")
+
+    status()
 
 # -------------------------------
-# Zarządzanie plikami
+# Pobieranie plików
 # -------------------------------
-def save_file(user_id, filename, file_data):
-    try:
-        # Sprawdź czy plik jest poprawnym CSV
-        df = pd.read_csv(pd.io.common.BytesIO(file_data))
-        # Konwertuj wszystkie kolumny na odpowiednie typy
-        for col in df.columns:
-            if df[col].dtype == 'object':
-                try:
-                    df[col] = pd.to_numeric(df[col], errors='ignore')
-                except:
-                    pass
-        
-        # Sprawdź czy plik o takiej nazwie już istnieje
-        conn = sqlite3.connect("notes.db")
-        c = conn.cursor()
-        c.execute("SELECT id FROM files WHERE user_id = ? AND filename = ?", (user_id, filename))
-        if c.fetchone():
-            conn.close()
-            return False, "Plik o takiej nazwie już istnieje"
-        
-        # Zapisz plik
-        c.execute("INSERT INTO files (user_id, filename, file_data) VALUES (?, ?, ?)",
-                  (user_id, filename, file_data))
-        conn.commit()
-        conn.close()
-        return True, "Plik został zapisany"
-    except Exception as e:
-        return False, f"Błąd podczas zapisywania pliku: {str(e)}"
-
-def rename_file(file_id, user_id, new_filename):
-    conn = sqlite3.connect("notes.db")
-    c = conn.cursor()
-    
-    # Sprawdź czy użytkownik jest właścicielem pliku
-    c.execute("SELECT user_id FROM files WHERE id = ?", (file_id,))
-    result = c.fetchone()
-    
-    if not result or result[0] != user_id:
-        conn.close()
-        return False, "Tylko właściciel może zmienić nazwę pliku"
-    
-    # Sprawdź czy nazwa kończy się na .csv
-    if not new_filename.lower().endswith('.csv'):
-        conn.close()
-        return False, "Nazwa pliku musi kończyć się na .csv"
-    
-    # Sprawdź czy nie ma innych rozszerzeń w nazwie
-    if new_filename.count('.') > 1:
-        conn.close()
-        return False, "Nazwa pliku nie może zawierać innych kropek"
-    
-    # Sprawdź czy nowa nazwa nie jest już używana przez inny plik użytkownika
-    c.execute("SELECT id FROM files WHERE user_id = ? AND filename = ? AND id != ?", 
-              (user_id, new_filename, file_id))
-    if c.fetchone():
-        conn.close()
-        return False, "Plik o takiej nazwie już istnieje"
-    
-    # Zmień nazwę pliku
-    c.execute("UPDATE files SET filename = ? WHERE id = ?", (new_filename, file_id))
-    conn.commit()
-    conn.close()
-    return True, "Nazwa pliku została zmieniona"
-
-def get_user_files(user_id):
-    conn = sqlite3.connect("notes.db")
-    c = conn.cursor()
-    c.execute("SELECT id, filename, upload_date FROM files WHERE user_id = ? ORDER BY upload_date DESC",
-              (user_id,))
-    files = c.fetchall()
-    conn.close()
-    return files
-
-def get_file_data(file_id, user_id):
-    conn = sqlite3.connect("notes.db")
-    c = conn.cursor()
-    c.execute("SELECT file_data FROM files WHERE id = ? AND user_id = ?",
-              (file_id, user_id))
-    result = c.fetchone()
-    conn.close()
-    return result[0] if result else None
-
-def delete_file(file_id, user_id):
-    conn = sqlite3.connect("notes.db")
-    c = conn.cursor()
-    c.execute("DELETE FROM files WHERE id = ? AND user_id = ?",
-              (file_id, user_id))
-    success = c.rowcount > 0
-    conn.commit()
-    conn.close()
-    return success
+def download_file_button(file_id, filename, key):
+    # Zawartość jest czytana (i rozpakowywana) z bazy dopiero po kliknięciu,
+    # a nie przy każdym przeładowaniu listy plików
+    user_id = st.session_state.user_id
+    st.download_button("⬇️ Pobierz", lambda: get_file_data_shared(file_id, user_id),
+                       file_name=filename, mime="text/csv", key=key)
 
 # -------------------------------
-# Udostępnianie plików
+# Formatowanie
 # -------------------------------
-def share_file_with_user(file_id, target_username):
-    conn = sqlite3.connect("notes.db")
-    c = conn.cursor()
-    # Pobierz id użytkownika docelowego
-    c.execute("SELECT id FROM users WHERE username = ?", (target_username,))
-    target_user = c.fetchone()
-    if not target_user:
-        conn.close()
-        return False, "Nie znaleziono użytkownika"
-    target_user_id = target_user[0]
-
-    # Sprawdź czy plik należy do aktualnego użytkownika
-    c.execute("SELECT user_id FROM files WHERE id = ?", (file_id,))
-    owner = c.fetchone()
-    if not owner or owner[0] != st.session_state.user_id:
-        conn.close()
-        return False, "Brak dostępu do pliku"
-
-    # Sprawdź, czy już nie udostępniono
-    c.execute("SELECT id FROM shared_files WHERE file_id = ? AND shared_with_user_id = ?", (file_id, target_user_id))
-    if c.fetchone():
-        conn.close()
-        return False, "Plik jest już udostępniony temu użytkownikowi"
-
-    c.execute("INSERT INTO shared_files (file_id, shared_with_user_id) VALUES (?, ?)", (file_id, target_user_id))
-    conn.commit()
-    conn.close()
-    return True, "Plik udostępniony"
-
-def get_shared_files(user_id):
-    conn = sqlite3.connect("notes.db")
-    c = conn.cursor()
-    c.execute('''
-        SELECT f.id, f.filename, f.upload_date, u.username, sf.share_date
-        FROM files f
-        JOIN shared_files sf ON f.id = sf.file_id
-        JOIN users u ON f.user_id = u.id
-        WHERE sf.shared_with_user_id = ?
-        ORDER BY sf.share_date DESC
-    ''', (user_id,))
-    shared = c.fetchall()
-    conn.close()
-    return shared
-
-def get_file_data_shared(file_id, user_id):
-    conn = sqlite3.connect("notes.db")
-    c = conn.cursor()
-    # Sprawdź czy użytkownik ma dostęp do pliku (jest właścicielem lub ma udostępniony)
-    c.execute('''
-        SELECT f.file_data 
-        FROM files f
-        LEFT JOIN shared_files sf ON f.id = sf.file_id
-        WHERE f.id = ? AND (f.user_id = ? OR sf.shared_with_user_id = ?)
-    ''', (file_id, user_id, user_id))
-    result = c.fetchone()
-    conn.close()
-    return result[0] if result else None
+def format_size(size):
+    if size < 1024 ** 2:
+        return f"{size / 1024:.1f} KB"
+    return f"{size / 1024 ** 2:.1f} MB"
 
 # -------------------------------
-# Streamlit App
+# Fragmenty strony
 # -------------------------------
-st.set_page_config(page_title="Mini BI", layout="wide")
-
-# Autoryzacja
-if "user_id" not in st.session_state:
-    st.session_state.user_id = None
-    st.session_state.username = None
-
-if st.session_state.user_id is None:
-    st.title("🔐 Zaloguj się lub zarejestruj")
-
-    tab1, tab2 = st.tabs(["🔑 Logowanie", "📝 Rejestracja"])
-
-    with tab1:
-        username = st.text_input("Login")
-        password = st.text_input("Hasło", type="password")
-        if st.button("Zaloguj"):
-            user_id = login_user(username, password)
-            if user_id:
-                st.session_state.user_id = user_id
-                st.session_state.username = username
-                st.success(f"✅ Zalogowano jako {username}")
-                st.rerun()
-            else:
-                st.error("❌ Błędny login lub hasło")
-
-    with tab2:
-        new_user = st.text_input("Nowa nazwa użytkownika")
-        new_pass = st.text_input("Nowe hasło", type="password")
-        if st.button("Zarejestruj"):
-            if register_user(new_user, new_pass):
-                st.success("✅ Konto utworzone. Możesz się zalogować.")
-            else:
-                st.error("❌ Użytkownik już istnieje")
-
-    st.stop()
+# Każdy obszar (notatki, pliki, analiza i jej grupy wykresów) to osobny
+# fragment: kliknięcie w nim przelicza tylko ten obszar, a nie cały skrypt.
+# Akcje zmieniające dane widoczne w innym obszarze (np. usunięcie pliku
+# wybranego do analizy) przeładowują całą stronę (st.rerun(scope="app")).
 
-# Główna aplikacja po zalogowaniu
-st.title("📊 Mini BI – przeglądarka danych i notatki")
-st.sidebar.markdown(f"👤 Zalogowany jako: `{st.session_state.username}`")
-if st.sidebar.button("🚪 Wyloguj", use_container_width=True):
-    st.session_state.user_id = None
-    st.session_state.username = None
-    st.rerun()
-
-# Dodaj separator
-st.sidebar.markdown("---")
-
-# Notatki i udostępnianie w sidebar
-with st.sidebar:
+# -------------------------------
+# Notatki (panel boczny)
+# -------------------------------
+@fragment
+def notes_panel():
     st.header("📝 Notatki")
-    
+
     # Dodaj notatkę
     with st.form("note_form"):
         note_text = st.text_area("Nowa notatka", height=100)
@@ -430,41 +163,46 @@ with st.sidebar:
         if submitted and note_text.strip():
             add_note(st.session_state.user_id, note_text.strip())
             st.success("Notatka dodana")
-            st.rerun()
-    
+            st.rerun(scope="fragment")
+
     # Wyszukiwanie notatek
     search_term = st.text_input("Szukaj w notatkach")
-    
+
     # Opcje sortowania
     sort_option = st.selectbox(
         "Sortuj według",
-        ["Najnowsze", "Najstarsze", "Alfabetycznie"],
-        index=0
+        list(SORT_ORDERS),
+        index=0,
+        on_change=reset_pages,
+        args=("notes",)
     )
 
-    # Pobierz notatki użytkownika
-    notes = get_notes(st.session_state.user_id)
-    
-    # Sortowanie notatek
-    if sort_option == "Najnowsze":
-        notes.sort(key=lambda x: x[2], reverse=True)
-    elif sort_option == "Najstarsze":
-        notes.sort(key=lambda x: x[2])
-    else:  # Alfabetycznie
-        notes.sort(key=lambda x: x[1].lower())
-    
+    # Fragmenty notatek z zaznaczonymi trafieniami (tylko przy wyszukiwaniu)
+    snippets = {}
+    shared_notes = None
+    next_notes_cursor = None
+
     if search_term:
-        notes = [n for n in notes if search_term.lower() in n[1].lower()]
-    
+        # Wyszukiwanie pełnotekstowe we własnych i udostępnionych notatkach,
+        # wyniki od najlepiej dopasowanych
+        results = search_notes(st.session_state.user_id, search_term)
+        notes = [(r[0], r[1], r[2]) for r in results if r[4] == st.session_state.user_id]
+        shared_notes = [(r[0], r[1], r[2], r[3]) for r in results if r[4] != st.session_state.user_id]
+        snippets = {r[0]: r[5] for r in results}
+    else:
+        # Pobierz bieżącą stronę notatek użytkownika (posortowaną w bazie)
+        notes, next_notes_cursor = get_notes_page(st.session_state.user_id, SORT_ORDERS[sort_option],
+                                                  page_cursor("notes"), PAGE_SIZE)
+
     if notes:
         st.subheader("Twoje notatki")
         for note_id, content, timestamp in notes:
             st.markdown(f"**{timestamp}**")
-            
+
             # Edycja notatki
             if f"edit_{note_id}" not in st.session_state:
                 st.session_state[f"edit_{note_id}"] = False
-            
+
             if st.session_state[f"edit_{note_id}"]:
                 edited_content = st.text_area("Edytuj notatkę", value=content, key=f"edit_area_{note_id}")
                 col1, col2 = st.columns([1,1])
@@ -473,27 +211,30 @@ with st.sidebar:
                         if edit_note(note_id, st.session_state.user_id, edited_content):
                             st.success("Notatka zaktualizowana")
                             st.session_state[f"edit_{note_id}"] = False
-                            st.rerun()
+                            st.rerun(scope="fragment")
                 with col2:
                     if st.button("Anuluj", key=f"cancel_{note_id}"):
                         st.session_state[f"edit_{note_id}"] = False
-                        st.rerun()
+                        st.rerun(scope="fragment")
             else:
-                st.markdown(content)
+                st.markdown(snippets.get(note_id, content))
                 col1, col2 = st.columns([2,1])
                 with col1:
                     if st.button("✏️ Edytuj", key=f"edit_btn_{note_id}"):
                         st.session_state[f"edit_{note_id}"] = True
-                        st.rerun()
+                        st.rerun(scope="fragment")
                 with col2:
                     if st.button("🗑️ Usuń", key=f"del_{note_id}"):
                         delete_note(note_id, st.session_state.user_id)
-                        st.rerun()
+                        st.rerun(scope="fragment")
             st.markdown("---")
 
     else:
         st.info("Brak notatek")
 
+    if not search_term:
+        page_controls("notes", next_notes_cursor)
+
     # Udostępnianie notatki
     st.subheader("📤 Udostępnij notatkę")
 
@@ -505,26 +246,27 @@ with st.sidebar:
         target_user = st.text_input("Udostępnij użytkownikowi (login)")
 
         if st.button("📤 Udostępnij"):
-            success, msg = share_note_with_user(note_ids[selected_note_idx], target_user.strip())
+            success, msg = share_note_with_user(note_ids[selected_note_idx], st.session_state.user_id, target_user.strip())
             if success:
                 st.success(msg)
             else:
                 st.error(msg)
 
     # Notatki udostępnione dla użytkownika
-    shared_notes = get_shared_notes(st.session_state.user_id)
+    if shared_notes is None:
+        shared_notes = get_shared_notes(st.session_state.user_id)
     if shared_notes:
         st.subheader("📨 Notatki udostępnione dla Ciebie")
         for note_id, content, timestamp, owner_username in shared_notes:
             st.markdown(f"**{timestamp}** – od `{owner_username}`")
-            st.markdown(content)
+            st.markdown(snippets.get(note_id, content))
             st.markdown("---")
 
-# Dodaj sekcję ustawień konta na samym dole sidebara
-with st.sidebar.expander("⚙️ Ustawienia konta", expanded=False):
+@fragment
+def account_settings():
     st.markdown("### Usuń konto")
     st.warning("⚠️ Uwaga: Usunięcie konta jest nieodwracalne. Wszystkie Twoje pliki i notatki zostaną usunięte.")
-    
+
     confirm_delete = st.checkbox("Potwierdzam, że chcę usunąć swoje konto")
     if st.button("🗑️ Usuń konto", type="primary", disabled=not confirm_delete):
         success, message = delete_account(st.session_state.user_id)
@@ -532,32 +274,34 @@ with st.sidebar.expander("⚙️ Ustawienia konta", expanded=False):
             st.success(message)
             st.session_state.user_id = None
             st.session_state.username = None
-            st.rerun()
+            st.rerun(scope="app")
         else:
             st.error(message)
 
-# Główne zakładki
-tab1, tab2 = st.tabs(["📁 Pliki", "📊 Analiza danych"])
-
-with tab1:
+# -------------------------------
+# Pliki
+# -------------------------------
+@fragment
+def files_panel():
     st.header("Zarządzanie plikami")
-    
+
     # Wczytywanie pliku
     uploaded_file = st.file_uploader("Wybierz plik CSV", type=["csv"])
     if uploaded_file is not None:
-        file_data = uploaded_file.getvalue()
-        success, message = save_file(st.session_state.user_id, uploaded_file.name, file_data)
-        if success:
-            st.success(f"✅ {message}")
-        else:
-            st.error(f"❌ {message}")
-    
+        # Każdy wgrany plik trafia do zapisu w tle dokładnie raz, mimo że
+        # pozostaje w polu wyboru przy kolejnych przeładowaniach strony
+        ingest_jobs = st.session_state.setdefault("ingest_jobs", {})
+        if uploaded_file.file_id not in ingest_jobs:
+            ingest_jobs[uploaded_file.file_id] = submit_upload(st.session_state.user_id, uploaded_file.name,
+                                                               uploaded_file)
+        show_ingest_status(ingest_jobs[uploaded_file.file_id])
+
     # Lista plików
     st.subheader("Twoje pliki")
-    files = get_user_files(st.session_state.user_id)
+    files, next_files_cursor = get_user_files_page(st.session_state.user_id, page_cursor("files"), PAGE_SIZE)
     if files:
         for file_id, filename, upload_date in files:
-            col1, col2, col3, col4 = st.columns([3,1,1,1])
+            col1, col2, col3, col4, col5 = st.columns([3,1,1,1,1])
             with col1:
                 st.markdown(f"**{filename}**")
                 st.caption(f"Data dodania: {upload_date}")
@@ -568,14 +312,17 @@ with tab1:
                 if st.button("🗑️ Usuń", key=f"del_file_{file_id}"):
                     if delete_file(file_id, st.session_state.user_id):
                         st.success("Plik usunięty")
-                        st.rerun()
+                        # Plik znika też z wyboru w zakładce analizy
+                        st.rerun(scope="app")
             with col4:
                 if st.button("📤 Udostępnij", key=f"share_file_{file_id}"):
                     st.session_state[f"sharing_file_{file_id}"] = True
-            
+            with col5:
+                download_file_button(file_id, filename, f"download_file_{file_id}")
+
             if st.session_state.get(f"renaming_file_{file_id}", False):
-                new_filename = st.text_input("Nowa nazwa pliku (musi kończyć się na .csv)", 
-                                           value=filename, 
+                new_filename = st.text_input("Nowa nazwa pliku (musi kończyć się na .csv)",
+                                           value=filename,
                                            key=f"new_filename_{file_id}")
                 col1, col2 = st.columns([1,1])
                 with col1:
@@ -592,17 +339,18 @@ with tab1:
                                 else:
                                     st.error(msg)
                                 st.session_state[f"renaming_file_{file_id}"] = False
-                                st.rerun()
+                                # Nowa nazwa ma być widoczna także w zakładce analizy
+                                st.rerun(scope="app")
                         else:
                             st.error("Nazwa pliku nie może być pusta")
                 with col2:
                     if st.button("Anuluj", key=f"cancel_rename_{file_id}"):
                         st.session_state[f"renaming_file_{file_id}"] = False
-                        st.rerun()
-            
+                        st.rerun(scope="fragment")
+
             if st.session_state.get(f"sharing_file_{file_id}", False):
                 target_user = st.text_input("Udostępnij użytkownikowi (login)", key=f"share_user_{file_id}")
-                
+
                 col1, col2 = st.columns([1,1])
                 with col1:
                     if st.button("Potwierdź", key=f"confirm_share_{file_id}"):
@@ -612,129 +360,435 @@ with tab1:
                             elif not check_user_exists(target_user.strip()):
                                 st.error("Nie znaleziono takiego użytkownika")
                             else:
-                                success, msg = share_file_with_user(file_id, target_user.strip())
+                                success, msg = share_file_with_user(file_id, st.session_state.user_id, target_user.strip())
                                 if success:
                                     st.success(msg)
                                 else:
                                     st.error(msg)
                                 st.session_state[f"sharing_file_{file_id}"] = False
-                                st.rerun()
+                                st.rerun(scope="fragment")
                         else:
                             st.error("Wprowadź nazwę użytkownika")
                 with col2:
                     if st.button("Anuluj", key=f"cancel_share_{file_id}"):
                         st.session_state[f"sharing_file_{file_id}"] = False
-                        st.rerun()
+                        st.rerun(scope="fragment")
             st.markdown("---")
     else:
         st.info("Brak zapisanych plików")
+    page_controls("files", next_files_cursor)
 
     # Udostępnione pliki
     st.subheader("📨 Pliki udostępnione dla Ciebie")
-    shared_files = get_shared_files(st.session_state.user_id)
+    shared_files, next_shared_cursor = get_shared_files_page(st.session_state.user_id,
+                                                             page_cursor("shared_files"), PAGE_SIZE)
     if shared_files:
         for file_id, filename, upload_date, owner_username, share_date in shared_files:
             st.markdown(f"**{filename}**")
             st.caption(f"Udostępniony przez: {owner_username}")
             st.caption(f"Data udostępnienia: {share_date}")
             st.caption(f"Data dodania: {upload_date}")
+            download_file_button(file_id, filename, f"download_shared_{file_id}")
             st.markdown("---")
     else:
         st.info("Nie masz żadnych udostępnionych plików")
+    page_controls("shared_files", next_shared_cursor)
 
-with tab2:
+# -------------------------------
+# Analiza danych
+# -------------------------------
+# Zakresy osi dla dużych plików bierzemy z profilu (bez dodatkowego przebiegu)
+def profile_range(profile, col):
+    stats = column_stats(profile, col)
+    return (stats["min"], stats["max"])
+
+# -------------------------------
+# Zadania analizy (pula procesów)
+# -------------------------------
+def analysis_result(task, file_id, *args):
+    # Wynik zadania z analysis_tasks albo None (komunikat już pokazany).
+    # Czekając odświeżamy komunikat o postępie: każde odświeżenie to punkt,
+    # w którym Streamlit przerywa przebieg po zmianie wyboru - zadanie jest
+    # wtedy anulowane, zamiast liczyć wynik, którego nikt nie zobaczy.
+    status = st.empty()
+    try:
+        # Czas zadania w procesie roboczym trafia do pomiarów z procesu
+        # (absorb); w sekcji "pool" zostaje kolejka i przesłanie wyniku
+        with timing.section("pool", f"{task.__name__} (pula)"):
+            job = analysis_tasks.submit(task, file_id, st.session_state.user_id, *args)
+            try:
+                while not job.wait(ANALYSIS_POLL_INTERVAL):
+                    status.caption(f"⏳ Obliczanie… {job.elapsed():.0f} s")
+                result = job.result()
+            finally:
+                analysis_pool.cancel(job)
+                timing.absorb(job.timings)
+    except AnalysisError as e:
+        status.warning(str(e))
+        return None
+    status.empty()
+    return result
+
+# Grupy wykresów dostają id pliku i spec filtra (dane liczy zadanie analizy);
+# zmiana wyboru w jednej grupie przelicza tylko jej wykres
+@fragment
+def preview_panel(file_id, total_rows, columns):
+    # Do przeglądarki trafia tylko bieżąca strona; stronicowanie i sortowanie
+    # liczy serwer, a liczba wierszy pochodzi z profilu pliku
+    key = f"preview_{file_id}"
+    pages = max((total_rows + PREVIEW_ROWS - 1) // PREVIEW_ROWS, 1)
+    col1, col2, col3 = st.columns([2, 2, 1])
+    with col1:
+        sort_col = st.selectbox("Sortuj według", [None, *columns], key=f"{key}_sort",
+                                format_func=lambda col: "(kolejność w pliku)" if col is None else col)
+    with col2:
+        ascending = st.radio("Kierunek", ["Rosnąco", "Malejąco"], horizontal=True, key=f"{key}_order",
+                             disabled=sort_col is None) == "Rosnąco"
+    with col3:
+        page = st.number_input("Strona", min_value=1, max_value=pages, step=1, key=f"{key}_page")
+    offset = (page - 1) * PREVIEW_ROWS
+    window = analysis_result(analysis_tasks.preview, file_id, offset, PREVIEW_ROWS, sort_col, ascending)
+    if window is not None:
+        st.dataframe(window)
+        st.caption(f"Wiersze {offset + 1}–{offset + len(window)} z {total_rows} (strona {page} z {pages})")
+
+@fragment
+def export_panel(file_id, filter_spec, content_hash):
+    # Plik eksportu powstaje dopiero po kliknięciu (i trafia do cache eksportów).
+    # Budujemy go w przebiegu fragmentu, a nie w funkcji przycisku pobierania:
+    # ta działa poza skryptem, więc błąd zadania nie trafiłby na stronę.
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        fmt = st.selectbox("Format eksportu", export.available_formats(),
+                           format_func=lambda f: export.FORMATS[f][0])
+    with col2:
+        if st.button("📦 Przygotuj plik eksportu", key=f"export_{file_id}"):
+            payload = export.cached(content_hash, filter_spec, fmt, lambda: analysis_result(
+                analysis_tasks.export_file, file_id, filter_spec, fmt))
+            if payload is not None:
+                # Bez ponownego przebiegu po pobraniu: przycisk zostaje do kolejnej zmiany
+                st.download_button("⬇️ Pobierz przefiltrowane dane", payload, on_click="ignore",
+                                   file_name=export.file_name("filtered_data", fmt), mime=export.mime_type(fmt))
+
+def show_chart(chart):
+    # chart: (wykres, podpis) z zadania analizy albo None
+    if chart is None:
+        return
+    fig, caption = chart
+    with timing.section("plotly", "plotly_chart"):
+        st.plotly_chart(fig, use_container_width=True)
+    if caption:
+        st.caption(caption)
+
+def chart_result(task, file_id, approximate, *args):
+    # W trybie przybliżonym wykres z próbki i przycisk, który liczy dokładny
+    # wynik dla bieżących ustawień (po zmianie ustawień wracamy do próbki)
+    key = f"exact_{task.__name__}_{file_id}"
+    if not approximate or st.session_state.get(key) == args:
+        show_chart(analysis_result(task, file_id, *args))
+        return
+    show_chart(analysis_result(analysis_tasks.APPROXIMATE[task], file_id, *args))
+    if st.button("🎯 Oblicz dokładnie", key=f"{key}_button"):
+        st.session_state[key] = args
+        st.rerun(scope="fragment")
+
+# W trybie przybliżonym zakresy osi też bierzemy z profilu: próbka może
+# nie zawierać wartości skrajnych, a wynik dokładny ma mieć te same przedziały
+@fragment
+def histogram_chart(file_id, numeric_cols, profile, large_file, filter_spec, approximate):
+    col_to_plot = st.selectbox("Kolumna numeryczna", numeric_cols)
+    if col_to_plot:
+        value_range = profile_range(profile, col_to_plot) if large_file or approximate else None
+        chart_result(analysis_tasks.histogram_chart, file_id, approximate, filter_spec, col_to_plot, value_range)
+
+@fragment
+def category_chart(file_id, categorical_cols, filter_spec, approximate):
+    col_cat = st.selectbox("Kolumna kategoryczna", categorical_cols)
+    if col_cat:
+        chart_result(analysis_tasks.category_chart, file_id, approximate, filter_spec, col_cat)
+
+@fragment
+def scatter_chart(file_id, numeric_cols, profile, large_file, filter_spec, approximate):
+    st.subheader("📉 Scatterplot (2 kolumny)")
+    cols_scatter = st.multiselect("Wybierz 2 kolumny", numeric_cols, max_selections=2)
+    if len(cols_scatter) == 2:
+        ranges = (tuple(profile_range(profile, col) for col in cols_scatter)
+                  if large_file or approximate else None)
+        chart_result(analysis_tasks.scatter_chart, file_id, approximate, filter_spec, *cols_scatter, ranges)
+
+@fragment
+def groupby_chart(file_id, categorical_cols, numeric_cols, filter_spec, approximate):
+    st.subheader("📊 Grupowanie i agregacja")
+    group_col = st.selectbox("Grupuj wg", categorical_cols)
+    agg_col = st.selectbox("Agreguj kolumnę", numeric_cols)
+    agg_func = st.selectbox("Funkcja agregująca", ["sum", "mean", "count"])
+
+    if group_col and agg_col:
+        chart_result(analysis_tasks.groupby_chart, file_id, approximate, filter_spec, group_col, agg_col, agg_func)
+
+@fragment
+def analysis_panel():
     st.header("Analiza danych")
-    
+
     # Wybór pliku do analizy
     files = get_user_files(st.session_state.user_id)
     shared_files = get_shared_files(st.session_state.user_id)
-    
+
     # Przygotuj listę wszystkich dostępnych plików
     all_files = []
     for file_id, filename, upload_date in files:
         all_files.append((file_id, filename, upload_date, "Moje pliki"))
     for file_id, filename, upload_date, owner_username, share_date in shared_files:
         all_files.append((file_id, filename, upload_date, f"Udostępnione przez: {owner_username}"))
-    
-    if all_files:
-        selected_file = st.selectbox(
-            "Wybierz plik do analizy",
-            options=all_files,
-            format_func=lambda x: f"{x[1]} ({x[3]})"
-        )
-        
-        if selected_file:
-            file_data = get_file_data_shared(selected_file[0], st.session_state.user_id)
-            if file_data:
-                df = pd.read_csv(pd.io.common.BytesIO(file_data))
-                st.session_state.current_df = df
-                st.session_state.current_filename = selected_file[1]
-                
-                # Analiza wybranego pliku
-                st.subheader(f"Analiza pliku: {st.session_state.current_filename}")
-                
-                st.subheader("🔍 Podgląd danych")
-                st.dataframe(df)
-
-                st.subheader("📊 Statystyki ogólne")
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.metric("Liczba wierszy", len(df))
-                with col2:
-                    st.metric("Liczba kolumn", len(df.columns))
 
-                st.write(df.describe())
+    if not all_files:
+        st.info("Najpierw wgraj plik CSV w zakładce 'Pliki'")
+        return
 
-                numeric_cols = df.select_dtypes(include='number').columns.tolist()
-                categorical_cols = df.select_dtypes(include='object').columns.tolist()
+    selected_file = st.selectbox(
+        "Wybierz plik do analizy",
+        options=all_files,
+        format_func=lambda x: f"{x[1]} ({x[3]})"
+    )
+    if not selected_file:
+        return
+
+    file_id = selected_file[0]
+    storage = get_file_storage_shared(file_id, st.session_state.user_id)
+    if storage is None:
+        return
+    # Duże pliki analizujemy kawałkami, bez wczytywania całości do pamięci
+    large_file = analysis.is_large(storage[0])
+
+    st.session_state.current_filename = selected_file[1]
+    content_hash = get_file_hash_shared(file_id, st.session_state.user_id)
+
+    # Analiza wybranego pliku
+    st.subheader(f"Analiza pliku: {st.session_state.current_filename}")
+    if large_file:
+        st.info(f"Duży plik ({storage[0] / 1024 ** 2:.0f} MB) – analiza kawałkami")
+
+    # Statystyki kolumn policzone przy zapisie pliku
+    profile = get_file_profile_shared(file_id, st.session_state.user_id)
+    if profile is None:
+        # Plik zapisany przed wprowadzeniem profili
+        profile = analysis_result(analysis_tasks.profile, file_id)
+        if profile is None:
+            return
+    columns = [stats["name"] for stats in profile["columns"]]
+
+    st.subheader("🔍 Podgląd danych")
+    preview_panel(file_id, profile["rows"], columns)
+
+    st.subheader("📊 Statystyki ogólne")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Liczba wierszy", profile["rows"])
+    with col2:
+        st.metric("Liczba kolumn", len(profile["columns"]))
+
+    st.write(describe_frame(profile))
+    memory = None if large_file else analysis_result(analysis_tasks.memory, file_id)
+    if memory is not None:
+        default_bytes, loaded_bytes = memory
+        st.caption(f"Pamięć: {format_size(loaded_bytes)} "
+                   f"(w domyślnych typach ok. {format_size(default_bytes)}, "
+                   f"{default_bytes / max(loaded_bytes, 1):.1f}× mniej)")
+
+    numeric_cols = columns_of_kind(profile, "number")
+    categorical_cols = columns_of_kind(profile, "object")
+
+    # Filtrowanie danych (zmiana filtra przelicza całą analizę: od niego zależą wszystkie wykresy)
+    st.subheader("🔎 Filtrowanie danych")
+    filter_count = st.session_state.setdefault("filter_count", 1)
+    mode = FILTER_MODES[st.radio("Łączenie warunków", list(FILTER_MODES), horizontal=True)]
+
+    predicates = []
+    for i in range(filter_count):
+        key = f"filter_{file_id}_{i}"
+        selected_col = st.selectbox("Wybierz kolumnę do filtrowania", columns, key=f"{key}_col")
+        selected_stats = column_stats(profile, selected_col)
+
+        if selected_stats["kind"] == "object":
+            selected_vals = st.multiselect("Wybierz wartości", selected_stats["values"],
+                                           key=f"{key}_vals_{selected_col}")
+            if selected_stats["values_truncated"]:
+                # distinct jest None dla kolumn z bardzo wieloma wartościami (analysis._BoundedCounts)
+                total = selected_stats["distinct"]
+                st.caption(f"Pokazano pierwsze {len(selected_stats['values'])} "
+                           + (f"z {total} wartości" if total is not None else "wartości"))
+            if selected_vals:
+                predicates.append(filters.isin(selected_col, selected_vals))
+        else:
+            min_val, max_val = float(selected_stats["min"]), float(selected_stats["max"])
+            selected_range = st.slider("Zakres", min_val, max_val, (min_val, max_val),
+                                       key=f"{key}_range_{selected_col}")
+            # Nieruszony suwak nie jest warunkiem (inaczej przy OR przepuszczałby wszystko)
+            if selected_range != (min_val, max_val):
+                predicates.append(filters.between(selected_col, *selected_range))
+
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("➕ Dodaj warunek"):
+            st.session_state.filter_count += 1
+            st.rerun(scope="fragment")
+    with col2:
+        if filter_count > 1 and st.button("➖ Usuń ostatni warunek"):
+            st.session_state.filter_count -= 1
+            st.rerun(scope="fragment")
+
+    # Filtr trafia do zadań analizy jako spec; maski warunków dla całego
+    # pliku w pamięci są tam cache'owane, dla dużych plików filtr idzie do
+    # SQL albo jest liczony na kawałkach
+    where = filters.build_filter(predicates, mode)
+    filter_spec = where.spec if where is not None else None
+
+    export_panel(file_id, filter_spec, content_hash)
+
+    # Wykresy
+    st.subheader("📈 Wykresy")
+    # Tryb przybliżony: wykresy z próbki zapisanej razem z plikiem (domyślnie dla dużych plików)
+    sample_rows = get_file_sample_rows_shared(file_id, st.session_state.user_id)
+    approximate = False
+    if sample_rows is not None and sample_rows < profile["rows"]:
+        approximate = st.toggle("⚡ Tryb przybliżony (próbka)", value=large_file, key=f"approx_{file_id}",
+                                help=f"Wykresy z losowej próbki {sample_rows} z {profile['rows']} wierszy "
+                                     "z 95% przedziałami ufności; dokładny wynik na żądanie")
+    if approximate and filter_spec is not None:
+        rows = analysis_result(analysis_tasks.approx_rows, file_id, filter_spec)
+        if rows is not None:
+            st.caption(f"≈ {rows[0]:.0f} ± {rows[1]:.0f} wierszy spełnia filtr (szacunek z próbki)")
+    col1, col2 = st.columns(2)
+    with col1:
+        histogram_chart(file_id, numeric_cols, profile, large_file, filter_spec, approximate)
+    with col2:
+        category_chart(file_id, categorical_cols, filter_spec, approximate)
+    scatter_chart(file_id, numeric_cols, profile, large_file, filter_spec, approximate)
+    groupby_chart(file_id, categorical_cols, numeric_cols, filter_spec, approximate)
 
-                # Filtrowanie danych
-                st.subheader("🔎 Filtrowanie danych")
-                selected_col = st.selectbox("Wybierz kolumnę do filtrowania", df.columns)
+# -------------------------------
+# Panel czasów wykonania (administratorzy)
+# -------------------------------
+def timing_panel():
+    # Rozkład czasu ostatnich przebiegów tej sesji na kategorie (czasy własne)
+    with st.expander("⏱️ Czasy wykonania", expanded=False):
+        if not timing.ENABLED:
+            st.info("Pomiar czasu jest wyłączony (TIMING=0)")
+            return
+        st.checkbox("Profil cProfile (kolejne przebiegi)", key="timing_profile")
+        st.checkbox("Pamięć – tracemalloc (kolejne przebiegi)", key="timing_memory")
+        runs = st.session_state.get("timing_runs")
+        if not runs:
+            st.caption("Brak pomiarów")
+            return
+
+        last = runs[0]
+        st.metric(f"Ostatni przebieg: {last.name}", f"{last.duration * 1000:.0f} ms")
+        categories = last.categories()
+        st.dataframe(pd.DataFrame(
+            [(category, own * 1000, own / max(last.duration, 1e-9) * 100)
+             for category, own in sorted(categories.items(), key=lambda item: -item[1])],
+            columns=["Kategoria", "Czas [ms]", "Udział [%]"]).round(1), hide_index=True)
+        st.dataframe(pd.DataFrame(
+            [(name, category, count, total * 1000, own * 1000)
+             for name, (category, count, total, own) in sorted(last.entries.items(), key=lambda item: -item[1][3])],
+            columns=["Funkcja / sekcja", "Kategoria", "Wywołania", "Łącznie [ms]", "Własny [ms]"]).round(1),
+            hide_index=True)
+
+        st.markdown("**Ostatnie przebiegi**")
+        history = []
+        for run in runs:
+            run_categories = run.categories()
+            history.append([run.name, pd.Timestamp(run.started, unit="s").strftime("%H:%M:%S"),
+                            run.duration * 1000,
+                            *(run_categories.get(category, 0.0) * 1000 for category in TIMING_CATEGORIES)])
+        st.dataframe(pd.DataFrame(history, columns=["Przebieg", "Start", "Razem [ms]", *TIMING_CATEGORIES]).round(1),
+                     hide_index=True)
+
+        if last.profile:
+            st.markdown("**Profil cProfile**")
+            st.code(last.profile, language=None)
+        if last.memory:
+            st.markdown("**Pamięć (tracemalloc)**")
+            if "error" in last.memory:
+                st.caption(last.memory["error"])
+            else:
+                st.caption(f"Szczyt: {format_size(last.memory['peak'])}, "
+                           f"na końcu przebiegu: {format_size(last.memory['current'])}")
+                st.dataframe(pd.DataFrame(last.memory["top"], columns=["Miejsce", "Bajty", "Bloki"]),
+                             hide_index=True)
+        st.caption("Podsumowania przebiegów trafiają też do logu (logger \"timing\")")
+
+# -------------------------------
+# Streamlit App
+# -------------------------------
+st.set_page_config(page_title="Mini BI", layout="wide")
 
-                if df[selected_col].dtype == 'object':
-                    selected_vals = st.multiselect("Wybierz wartości", df[selected_col].unique())
-                    if selected_vals:
-                        df = df[df[selected_col].isin(selected_vals)]
+# Cały przebieg skryptu jest mierzony (panel czasów i log)
+with measured_run("skrypt"):
+    # Autoryzacja
+    if "user_id" not in st.session_state:
+        st.session_state.user_id = None
+        st.session_state.username = None
+
+    if st.session_state.user_id is None:
+        st.title("🔐 Zaloguj się lub zarejestruj")
+
+        tab1, tab2 = st.tabs(["🔑 Logowanie", "📝 Rejestracja"])
+
+        with tab1:
+            username = st.text_input("Login")
+            password = st.text_input("Hasło", type="password")
+            if st.button("Zaloguj"):
+                user_id = login_user(username, password)
+                if user_id:
+                    st.session_state.user_id = user_id
+                    st.session_state.username = username
+                    st.success(f"✅ Zalogowano jako {username}")
+                    st.rerun()
+                else:
+                    st.error("❌ Błędny login lub hasło")
+
+        with tab2:
+            new_user = st.text_input("Nowa nazwa użytkownika")
+            new_pass = st.text_input("Nowe hasło", type="password")
+            if st.button("Zarejestruj"):
+                if register_user(new_user, new_pass):
+                    st.success("✅ Konto utworzone. Możesz się zalogować.")
                 else:
-                    min_val, max_val = float(df[selected_col].min()), float(df[selected_col].max())
-                    selected_range = st.slider("Zakres", min_val, max_val, (min_val, max_val))
-                    df = df[(df[selected_col] >= selected_range[0]) & (df[selected_col] <= selected_range[1])]
+                    st.error("❌ Użytkownik już istnieje")
 
-                st.download_button("⬇️ Pobierz przefiltrowane dane CSV", df.to_csv(index=False), file_name="filtered_data.csv")
+        st.stop()
 
-                # Wykresy
-                st.subheader("📈 Wykresy")
+    # Główna aplikacja po zalogowaniu
+    st.title("📊 Mini BI – przeglądarka danych i notatki")
+    st.sidebar.markdown(f"👤 Zalogowany jako: `{st.session_state.username}`")
+    if st.sidebar.button("🚪 Wyloguj", use_container_width=True):
+        st.session_state.user_id = None
+        st.session_state.username = None
+        st.rerun()
 
-                col1, col2 = st.columns(2)
-                with col1:
-                    col_to_plot = st.selectbox("Kolumna numeryczna", numeric_cols)
-                    if col_to_plot:
-                        fig = px.histogram(df, x=col_to_plot)
-                        st.plotly_chart(fig, use_container_width=True)
+    # Dodaj separator
+    st.sidebar.markdown("---")
 
-                with col2:
-                    col_cat = st.selectbox("Kolumna kategoryczna", categorical_cols)
-                    if col_cat:
-                        value_counts_df = df[col_cat].value_counts().reset_index()
-                        value_counts_df.columns = [col_cat, "count"]
-                        fig = px.bar(value_counts_df, x=col_cat, y="count")
-                        st.plotly_chart(fig, use_container_width=True)
-
-                st.subheader("📉 Scatterplot (2 kolumny)")
-                cols_scatter = st.multiselect("Wybierz 2 kolumny", numeric_cols, max_selections=2)
-                if len(cols_scatter) == 2:
-                    fig = px.scatter(df, x=cols_scatter[0], y=cols_scatter[1])
-                    st.plotly_chart(fig, use_container_width=True)
-
-                st.subheader("📊 Grupowanie i agregacja")
-                group_col = st.selectbox("Grupuj wg", categorical_cols)
-                agg_col = st.selectbox("Agreguj kolumnę", numeric_cols)
-                agg_func = st.selectbox("Funkcja agregująca", ["sum", "mean", "count"])
-
-                if group_col and agg_col:
-                    grouped_df = df.groupby(group_col)[agg_col].agg(agg_func).reset_index()
-                    fig = px.bar(grouped_df, x=group_col, y=agg_col)
-                    st.plotly_chart(fig, use_container_width=True)
-    else:
-        st.info("Najpierw wgraj plik CSV w zakładce 'Pliki'")
+    # Notatki i udostępnianie w sidebar
+    with st.sidebar:
+        notes_panel()
+
+    # Dodaj sekcję ustawień konta na samym dole sidebara
+    with st.sidebar.expander("⚙️ Ustawienia konta", expanded=False):
+        account_settings()
+
+    # Główne zakładki
+    tab1, tab2 = st.tabs(["📁 Pliki", "📊 Analiza danych"])
+
+    with tab1:
+        files_panel()
+
+    with tab2:
+        analysis_panel()
+
+# Panel czasów pokazujemy po zakończeniu pomiaru, więc obejmuje cały przebieg
+if st.session_state.username in ADMIN_USERS:
+    with st.sidebar:
+        timing_panel()
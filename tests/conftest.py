@@ -0,0 +1,74 @@
+import os
+import sys
+import tempfile
+
+# Moduły czytają konfigurację ze zmiennych środowiska przy imporcie: baza w
+# katalogu tymczasowym (nigdy notes.db), zadania analizy w wątku testu
+os.environ.setdefault("NOTES_DB", os.path.join(tempfile.mkdtemp(), "notes.db"))
+os.environ.setdefault("ANALYSIS_WORKERS", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+import pytest  # noqa: E402
+
+import analysis  # noqa: E402
+import db  # noqa: E402
+import file_tables  # noqa: E402
+from frame_cache import frame_cache  # noqa: E402
+from query_cache import query_cache  # noqa: E402
+
+
+@pytest.fixture
+def database(tmp_path):
+    # Świeża, zmigrowana baza dla każdego testu
+    file_tables.close()
+    db.configure(path=str(tmp_path / "notes.db"))
+    query_cache.clear()
+    frame_cache.clear()
+    db.init_db()
+    yield db.DB_PATH
+    file_tables.close()
+    db.configure()
+    query_cache.clear()
+
+
+@pytest.fixture
+def user(database):
+    import data
+    data.register_user("ala", "haslo")
+    return data.login_user("ala", "haslo")
+
+
+# -------------------------------
+# Ten sam plik w pamięci i czytany kawałkami (porównania wyników analizy)
+# -------------------------------
+SOURCE_ROWS = 1000
+SOURCE_CHUNK_ROWS = 97
+
+
+def make_csv():
+    rng = np.random.default_rng(7)
+    frame = pd.DataFrame({
+        "id": np.arange(SOURCE_ROWS),
+        "grupa": rng.choice(["a", "b", "c", "d"], SOURCE_ROWS, p=[0.4, 0.3, 0.2, 0.1]),
+        "liczba": rng.integers(0, 50, SOURCE_ROWS).astype("float64"),
+        "pomiar": rng.normal(10, 3, SOURCE_ROWS).round(3),
+    })
+    frame.loc[rng.random(SOURCE_ROWS) < 0.1, "liczba"] = np.nan
+    frame.loc[rng.random(SOURCE_ROWS) < 0.05, "grupa"] = None
+    return frame.to_csv(index=False).encode()
+
+
+@pytest.fixture(params=["chunks", "duckdb"])
+def sources(request, user, monkeypatch):
+    # (cały plik w pamięci, ten sam plik czytany kawałkami - z tabelą DuckDB albo bez)
+    if request.param == "duckdb" and file_tables.duckdb is None:
+        pytest.skip("brak duckdb")
+    monkeypatch.setattr(file_tables, "ENABLED", request.param == "duckdb")
+    import data
+    assert data.save_file(user, "dane.csv", make_csv())[0]
+    file_id = data.get_user_files(user)[0][0]
+    chunked = analysis.ChunkedSource(file_id, user, chunk_rows=SOURCE_CHUNK_ROWS)
+    assert (chunked.table is not None) == (request.param == "duckdb")
+    return data.load_file_dataframe(file_id, user), chunked
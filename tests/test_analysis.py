@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import analysis
+import analysis_tasks
+import data
+import file_tables
+import filters
+
+# Ramka w pamięci ma zawężone typy (frame_dtypes, np. float32), kawałki - float64
+RTOL = 1e-6
+WHERE = filters.build_filter([filters.isin("grupa", ["a", "c"]), filters.between("pomiar", 8, 14)])
+
+
+@pytest.mark.parametrize("where", [None, WHERE])
+def test_describe(sources, where):
+    frame, chunked = sources
+    pd.testing.assert_frame_equal(analysis.describe(chunked, where), analysis.describe(frame, where),
+                                  check_exact=False, rtol=RTOL)
+
+
+@pytest.mark.parametrize("where", [None, WHERE])
+def test_value_counts(sources, where):
+    frame, chunked = sources
+    expected = analysis.value_counts(frame, "grupa", where)
+    got = analysis.value_counts(chunked, "grupa", where)
+    assert list(got.items()) == list(expected.items())
+
+
+@pytest.mark.parametrize("where", [None, WHERE])
+def test_histogram(sources, where):
+    frame, chunked = sources
+    expected_counts, expected_edges = analysis.histogram(frame, "pomiar", 20, (0, 20), where)
+    counts, edges = analysis.histogram(chunked, "pomiar", 20, (0, 20), where)
+    np.testing.assert_array_equal(counts, expected_counts)
+    np.testing.assert_array_equal(edges, expected_edges)
+
+
+@pytest.mark.parametrize("agg_func", ["sum", "mean", "count"])
+def test_groupby_agg(sources, agg_func):
+    frame, chunked = sources
+    expected = analysis.groupby_agg(frame, "grupa", "liczba", agg_func)
+    got = analysis.groupby_agg(chunked, "grupa", "liczba", agg_func)
+    expected = expected.assign(grupa=expected["grupa"].astype(str)).sort_values("grupa", ignore_index=True)
+    got = got.assign(grupa=got["grupa"].astype(str)).sort_values("grupa", ignore_index=True)
+    np.testing.assert_array_equal(got["grupa"], expected["grupa"])
+    np.testing.assert_allclose(got["liczba"].astype("float64"), expected["liczba"].astype("float64"), rtol=RTOL)
+
+
+def test_profile_quantiles(sources):
+    frame, chunked = sources
+    profile = analysis.build_profile(chunked)
+    for column in profile["columns"]:
+        if column["kind"] != "number":
+            continue
+        for q, value in column["quantiles"].items():
+            assert value == pytest.approx(frame[column["name"]].quantile(float(q)), rel=1e-12)
+
+
+def test_value_counts_memory_is_bounded(user, monkeypatch):
+    monkeypatch.setattr(file_tables, "ENABLED", False)
+    monkeypatch.setattr(analysis, "SCAN_MAX_DISTINCT", 20)
+    # Dwie częste wartości i 500 unikalnych identyfikatorów
+    values = ["czesta"] * 300 + ["druga"] * 200 + [f"id{i}" for i in range(500)]
+    csv = "kod\n" + "\n".join(values) + "\n"
+    data.save_file(user, "kody.csv", csv.encode())
+    file_id = data.get_user_files(user)[0][0]
+    counts = analysis.value_counts(analysis.ChunkedSource(file_id, user, chunk_rows=97), "kod")
+
+    assert len(counts) <= 20
+    assert list(counts.index[:2]) == ["czesta", "druga"]
+    error = counts.attrs["error"]
+    assert 300 - error <= counts["czesta"] <= 300 and 200 - error <= counts["druga"] <= 200
+
+    # Wykres dużego pliku (liczony kawałkami) nie podaje liczby kategorii
+    monkeypatch.setattr(analysis, "CHUNKED_THRESHOLD_BYTES", 0)
+    fig, caption = analysis_tasks.category_chart(file_id, user, None, "kod")
+    assert "najczęstszych kategorii" in caption
@@ -0,0 +1,81 @@
+import os
+import time
+
+import pytest
+
+import analysis
+import analysis_pool
+import data
+import db
+from analysis_pool import AnalysisPool, JobCancelled, JobTimeout, TaskFailed
+
+
+# Zadania muszą być funkcjami modułu (proces roboczy importuje je po nazwie)
+def worker_pid():
+    return os.getpid()
+
+
+def slow_scan(file_id, user_id):
+    # Przebieg kawałkami: przerywalny między kawałkami
+    for _ in analysis.ChunkedSource(file_id, user_id, chunk_rows=5).chunks():
+        time.sleep(0.05)
+    return os.getpid()
+
+
+def sleep(seconds):
+    # Bez kawałków: nie sprawdza anulowania
+    time.sleep(seconds)
+
+
+def missing_column():
+    raise KeyError("kolumna")
+
+
+@pytest.fixture
+def pool(user, monkeypatch):
+    # Procesy robocze czytają bazę testu ze zmiennej środowiska
+    monkeypatch.setenv("NOTES_DB", db.DB_PATH)
+    pool = AnalysisPool(workers=1, max_pending=4, timeout=30)
+    pool.start()
+    return pool
+
+
+def test_task_errors_become_analysis_errors():
+    job = AnalysisPool(workers=0).submit(missing_column)
+    with pytest.raises(TaskFailed, match="Brak kolumny w pliku: kolumna"):
+        job.result()
+
+
+def test_cancel_interrupts_chunked_job_and_keeps_worker(pool, user):
+    data.save_file(user, "a.csv", ("x\n" + "1\n" * 500).encode())
+    file_id = data.get_user_files(user)[0][0]
+    first_pid = pool.submit(worker_pid).result()
+
+    job = pool.submit(slow_scan, file_id, user)
+    time.sleep(0.5)
+    pool.cancel(job)
+    with pytest.raises(JobCancelled):
+        job.result()
+    # Przerwane między kawałkami: proces wolny od razu, ten sam (ciepły cache)
+    started = time.monotonic()
+    assert pool.submit(worker_pid).result() == first_pid
+    assert time.monotonic() - started < 2
+
+
+def test_cancel_replaces_worker_that_does_not_stop(pool, monkeypatch):
+    monkeypatch.setattr(analysis_pool, "CANCEL_GRACE", 0.2)
+    first_pid = pool.submit(worker_pid).result()
+
+    job = pool.submit(sleep, 60)
+    time.sleep(0.3)
+    pool.cancel(job)
+    started = time.monotonic()
+    assert pool.submit(worker_pid).result() != first_pid
+    assert time.monotonic() - started < 10
+
+
+def test_timeout_replaces_worker(pool):
+    pool.timeout = 0.5
+    with pytest.raises(JobTimeout):
+        pool.submit(sleep, 60).result()
+    assert pool.stats()["timeouts"] == 1
@@ -0,0 +1,34 @@
+import os
+
+import pytest
+
+import data
+
+AppTest = pytest.importorskip("streamlit.testing.v1").AppTest
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "script.py")
+
+
+def run_app(user):
+    at = AppTest.from_file(SCRIPT, default_timeout=60)
+    at.session_state["user_id"] = user
+    at.session_state["username"] = "ala"
+    at.run()
+    assert not at.exception
+    return at
+
+
+def test_logged_in_page(user):
+    app = run_app(user)
+    assert app.title[0].value == "📊 Mini BI – przeglądarka danych i notatki"
+    assert [tab.label for tab in app.tabs] == ["📁 Pliki", "📊 Analiza danych"]
+
+
+def test_page_with_file(user):
+    # AppTest przelicza zawsze cały skrypt (także po kliknięciu we fragmencie),
+    # więc sprawdzamy, że wszystkie fragmenty rysują się w jednym przebiegu
+    data.add_note(user, "pierwsza notatka")
+    assert data.save_file(user, "dane.csv", b"grupa,wartosc\na,1\nb,2\na,3\n")[0]
+    at = run_app(user)
+    assert "pierwsza notatka" in [element.value for element in at.sidebar.markdown]
+    assert any("dane.csv" in element.value for element in at.main.markdown)
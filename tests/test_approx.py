@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import approx
+import artifacts
+import columnar
+import data
+from db import connection, transaction
+
+
+def chunks(frame, rows):
+    return [frame.iloc[start:start + rows] for start in range(0, len(frame), rows)]
+
+
+def test_reservoir_does_not_depend_on_chunking():
+    frame = pd.DataFrame({"v": np.arange(1000)})
+    samples = [approx.reservoir_sample(chunks(frame, rows), k=50)[0] for rows in (1, 7, 100, 1000)]
+    assert all(sample.equals(samples[0]) for sample in samples)
+    sample = samples[0]
+    assert len(sample) == 50 and sample.index.is_monotonic_increasing
+    assert list(sample["v"]) == list(sample.index)
+
+
+def test_reservoir_is_uniform():
+    # Każdy wiersz trafia do próbki z prawdopodobieństwem k / n
+    n, k, trials = 40, 10, 1000
+    frame = pd.DataFrame({"v": np.arange(n)})
+    hits = np.zeros(n)
+    for seed in range(trials):
+        hits[approx.reservoir_sample(chunks(frame, 15), k=k, seed=seed)[0]["v"].to_numpy()] += 1
+    np.testing.assert_allclose(hits / trials, k / n, atol=0.06)
+
+
+def test_small_file_has_no_sample(monkeypatch):
+    monkeypatch.setattr(approx, "SAMPLE_ROWS", 10)
+    assert approx.build_sample(pd.DataFrame({"v": range(10)})) is None
+    fmt, payload, rows = approx.build_sample(pd.DataFrame({"v": range(11)}))
+    assert rows == 10 and len(columnar.read_columnar(payload)) == 10
+
+
+def test_full_sample_is_exact():
+    sample = approx.Sample(pd.DataFrame({"v": range(10)}), total_rows=10)
+    assert sample.exact
+    assert sample.rows(lambda frame: frame["v"] < 3) == (3.0, 0.0)
+
+
+def test_estimate_with_confidence_interval():
+    sample = approx.Sample(pd.DataFrame({"v": range(100)}), total_rows=10_000)
+    estimate, error = sample.rows(lambda frame: frame["v"] < 30)
+    assert estimate == pytest.approx(3000)
+    assert 0 < error < 1000
+
+
+def test_backfill_builds_sample_from_columnar_copy(user, monkeypatch):
+    # Warunek NEEDED_WHEN ma próg wpisany przy imporcie
+    monkeypatch.setitem(artifacts.NEEDED_WHEN, "file_samples",
+                        artifacts.NEEDED_WHEN["file_samples"].replace(f"> {approx.SAMPLE_ROWS}", "> 20"))
+    monkeypatch.setattr(approx, "SAMPLE_ROWS", 20)
+    monkeypatch.setattr(approx, "SAMPLE_CHUNK_ROWS", 7)
+    csv = "v,w\n" + "".join(f"{i},{i % 3}\n" for i in range(100))
+    data.save_file(user, "a.csv", csv.encode())
+    file_id = data.get_user_files(user)[0][0]
+    with transaction() as conn:
+        conn.execute("DELETE FROM file_samples")
+    # Brakuje tylko próbki: backfill nie wczytuje całego CSV
+    monkeypatch.setattr(artifacts.pd, "read_csv", None)
+
+    assert artifacts.backfill() == (1, [])
+    with connection() as conn:
+        rows, payload = conn.execute("SELECT rows, data FROM file_samples WHERE file_id = ?", (file_id,)).fetchone()
+    sample = columnar.read_columnar(payload)
+    assert rows == 20 and list(sample.columns) == ["v", "w"]
+    assert (sample["w"] == sample["v"] % 3).all()
@@ -0,0 +1,49 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(REPO, "benchmarks", "bench_suite.py")
+sys.path.insert(0, os.path.join(REPO, "benchmarks"))
+
+import bench_suite  # noqa: E402
+
+SMALL = ["--users", "4", "--notes-per-user", "3", "--share-fanout", "2", "--csv-sizes", "20KB",
+         "--calls", "2", "--repeat", "1"]
+
+
+def run(*args):
+    return subprocess.run([sys.executable, SCRIPT, *SMALL, *args], cwd=REPO, capture_output=True, text=True,
+                          timeout=300)
+
+
+@pytest.mark.parametrize("text, size", [("500", 500), ("100KB", 100 * 1024), ("10M", 10 * 1024 ** 2),
+                                        ("1.5GB", int(1.5 * 1024 ** 3))])
+def test_parse_size(text, size):
+    assert bench_suite.parse_size(text) == size
+
+
+def test_size_label():
+    assert [bench_suite.size_label(size) for size in (100 * 1024, 1024 ** 3, 1500)] == ["100KB", "1GB", "1500B"]
+
+
+def test_small_run_and_compare(tmp_path):
+    results = tmp_path / "wyniki.json"
+    done = run("--json", str(results))
+    assert done.returncode == 0, done.stderr
+    report = json.loads(results.read_text())
+    assert report["config"]["users"] == 4
+    assert {"data.get_notes", "data.save_file", "csv_20KB.load_file_dataframe", "csv_20KB.groupby"} <= set(
+        report["results"])
+
+    # Baseline wielokrotnie szybszy: każdy pomiar to regresja, kod wyjścia 1
+    for result in report["results"].values():
+        result["median_ms"] = result["median_ms"] / 1000 or 1e-6
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps(report))
+    done = run("--compare", str(baseline))
+    assert done.returncode == 1
+    assert "REGRESJA" in done.stdout
@@ -0,0 +1,112 @@
+import io
+import os
+
+import pytest
+
+import blob_store
+import data
+from db import connection, transaction
+
+CSV = b"kategoria,wartosc\na,1\nb,2\na,3\n"
+
+
+def count(sql, params=()):
+    with connection() as conn:
+        return conn.execute(sql, params).fetchone()[0]
+
+
+def read(hash_):
+    with connection() as conn:
+        with blob_store.open_content(conn, hash_) as stream:
+            return None if stream is None else stream.read()
+
+
+def test_same_content_is_stored_once(user):
+    data.save_file(user, "a.csv", CSV)
+    data.save_file(user, "b.csv", CSV)
+    assert count("SELECT COUNT(*) FROM blobs") == 1
+    assert count("SELECT ref_count FROM blobs") == 2
+
+    first, second = [row[0] for row in data.get_user_files(user)]
+    assert data.delete_file(first, user)
+    assert count("SELECT ref_count FROM blobs") == 1
+    assert data.get_file_data(second, user) == CSV
+    assert data.delete_file(second, user)
+    assert count("SELECT COUNT(*) FROM blobs") == 0
+
+
+@pytest.mark.parametrize("codec", ["gzip", "zstd"])
+def test_compressed_roundtrip(database, monkeypatch, codec):
+    if codec == "zstd" and blob_store.zstandard is None:
+        pytest.skip("brak zstandard")
+    monkeypatch.setattr(blob_store, "CODEC", codec)
+    content = b"id,opis\n" + b"".join(b"%d,powtarzalny opis wiersza\n" % i for i in range(5000))
+    hash_ = blob_store.hash_stream(io.BytesIO(content))
+    with transaction() as conn:
+        blob_store.put(conn, hash_, io.BytesIO(content))
+        # Druga próba zapisu tej samej zawartości nic nie zmienia
+        blob_store.put(conn, hash_, io.BytesIO(content))
+    assert count("SELECT codec FROM blobs") == codec
+    assert count("SELECT length(data) FROM blobs") < len(content) / 4
+    assert read(hash_) == content
+
+
+def test_incompressible_content_is_stored_raw(database):
+    # Losowe bajty po kompresji nie są mniejsze
+    content = os.urandom(4096)
+    hash_ = blob_store.hash_stream(io.BytesIO(content))
+    with transaction() as conn:
+        blob_store.put(conn, hash_, io.BytesIO(content))
+        assert blob_store.stats(conn) == (1, len(content), len(content), 0)
+    assert count("SELECT codec FROM blobs") == "raw"
+    assert read(hash_) == content
+    assert read("brak") is None
+
+
+# -------------------------------
+# Zapis i odczyt kawałkami
+# -------------------------------
+class CountingReader(io.BytesIO):
+    # Zapamiętuje rozmiary odczytów
+    def __init__(self, content):
+        super().__init__(content)
+        self.sizes = []
+
+    def read(self, size=-1):
+        self.sizes.append(size)
+        return super().read(size)
+
+
+def big_csv(rows=50_000):
+    return b"id,opis\n" + b"".join(b"%d,opis %d\n" % (i, i * 7919 % 1000) for i in range(rows))
+
+
+def test_spooled_content_is_read_in_chunks(monkeypatch):
+    monkeypatch.setattr(blob_store, "CHUNK_SIZE", 4096)
+    monkeypatch.setattr(blob_store, "SPOOL_MEMORY", 1024)
+    content = big_csv()
+    source = CountingReader(content)
+    spooled = blob_store.SpooledContent(source)
+    try:
+        assert all(0 < size <= 4096 for size in source.sizes)
+        # Powyżej SPOOL_MEMORY skompresowana zawartość czeka w pliku tymczasowym
+        assert spooled.file._rolled
+        assert (spooled.size, spooled.file.tell()) == (len(content), 0)
+        assert spooled.stored_size < len(content)
+    finally:
+        spooled.close()
+
+
+def test_file_stream_roundtrip(user, monkeypatch):
+    monkeypatch.setattr(blob_store, "CHUNK_SIZE", 4096)
+    content = big_csv()
+    assert data.save_file(user, "duzy.csv", CountingReader(content))[0]
+    file_id = data.get_user_files(user)[0][0]
+    with data.open_file_stream(file_id, user) as stream:
+        parts = list(iter(lambda: stream.read(10_000), b""))
+    assert len(parts) > 1
+    assert b"".join(parts) == content
+
+    data.register_user("ola", "haslo")
+    with data.open_file_stream(file_id, data.login_user("ola", "haslo")) as stream:
+        assert stream is None
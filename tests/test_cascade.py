@@ -0,0 +1,74 @@
+import os
+
+import data
+import file_tables
+import maintenance
+from db import connection
+
+CSV = b"kategoria,wartosc\na,1\nb,2\na,3\n"
+
+
+def count(sql, params=()):
+    with connection() as conn:
+        return conn.execute(sql, params).fetchone()[0]
+
+
+# -------------------------------
+# Kaskady usuwania
+# -------------------------------
+def test_delete_file_removes_artifacts_and_shares(user):
+    data.register_user("ola", "haslo")
+    data.save_file(user, "a.csv", CSV)
+    file_id = data.get_user_files(user)[0][0]
+    data.share_file_with_user(file_id, user, "ola")
+    for table in ("file_columnar", "file_profiles"):
+        assert count(f"SELECT COUNT(*) FROM {table} WHERE file_id = ?", (file_id,)) == 1
+
+    assert data.delete_file(file_id, user)
+    for table in ("shared_files", "file_columnar", "file_profiles", "file_tables", "file_samples"):
+        assert count(f"SELECT COUNT(*) FROM {table} WHERE file_id = ?", (file_id,)) == 0
+    assert file_tables.get_table(file_id) is None
+
+
+def test_delete_account_cascades(user):
+    data.register_user("ola", "haslo")
+    other = data.login_user("ola", "haslo")
+    data.add_note(user, "notatka")
+    note_id = data.get_notes(user)[0][0]
+    data.share_note_with_user(note_id, user, "ola")
+    data.save_file(user, "a.csv", CSV)
+    data.save_file(other, "b.csv", CSV)
+    file_id = data.get_user_files(user)[0][0]
+    data.share_file_with_user(file_id, user, "ola")
+
+    assert data.delete_account(user)[0]
+    assert count("SELECT COUNT(*) FROM notes") == 0
+    assert count("SELECT COUNT(*) FROM shared_notes") == 0
+    assert count("SELECT COUNT(*) FROM shared_files") == 0
+    assert count("SELECT COUNT(*) FROM files WHERE user_id = ?", (user,)) == 0
+    assert count("SELECT COUNT(*) FROM file_profiles WHERE file_id = ?", (file_id,)) == 0
+    # Zawartość zostaje dla pliku drugiego użytkownika
+    assert count("SELECT ref_count FROM blobs") == 1
+    assert data.get_shared_files(other) == []
+    with connection() as conn:
+        assert conn.execute("PRAGMA foreign_key_check").fetchall() == []
+
+
+# -------------------------------
+# Utrzymanie bazy
+# -------------------------------
+def test_maintenance_reclaims_deleted_pages(user):
+    content = b"id,opis\n" + b"".join(b"%d,%s\n" % (i, os.urandom(16).hex().encode()) for i in range(20_000))
+    data.save_file(user, "duzy.csv", content)
+    file_id = data.get_user_files(user)[0][0]
+    with connection() as conn:
+        assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        pages = conn.execute("PRAGMA page_count").fetchone()[0]
+
+    assert data.delete_file(file_id, user)
+    report = maintenance.run()
+    assert report["freed_pages"] > 0
+    assert report["after"]["freelist_count"] == 0
+    assert report["after"]["page_count"] < pages
+    assert maintenance.last_report is report
+    assert "Zwolnione strony" in maintenance.format_report(report)
@@ -0,0 +1,67 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+import charts
+
+
+def frame(rows=200):
+    rng = np.random.default_rng(3)
+    return pd.DataFrame({"x": rng.uniform(0, 10, rows), "y": rng.normal(5, 2, rows),
+                         "kat": rng.choice(list("abcdefgh"), rows)})
+
+
+def test_histogram_matches_numpy():
+    df = frame()
+    counts, edges = charts.histogram_data(df, "x", bins=10)
+    expected, expected_edges = np.histogram(df["x"], bins=10, range=(df["x"].min(), df["x"].max()))
+    np.testing.assert_array_equal(counts, expected)
+    np.testing.assert_allclose(edges, expected_edges)
+
+
+def test_histogram_of_empty_column():
+    df = pd.DataFrame({"x": [math.nan, math.nan]})
+    counts, edges = charts.histogram_data(df, "x", bins=5)
+    assert counts.sum() == 0
+    assert (edges[0], edges[-1]) == (0.0, 1.0)
+
+
+def test_scatter_keeps_points_within_budget():
+    df = frame(100)
+    df.loc[3, "y"] = math.nan
+    points, density = charts.scatter_data(df, "x", "y", max_points=100)
+    assert density is None
+    assert len(points) == 99
+
+    fig, caption = charts.scatter_figure("x", "y", points, density)
+    assert caption is None
+    assert len(fig.data[0].x) == 99
+
+
+def test_scatter_above_budget_is_binned():
+    df = frame(500)
+    points, density = charts.scatter_data(df, "x", "y", max_points=100, bins=20)
+    assert points is None
+    counts, edges_x, edges_y = density
+    assert counts.shape == (20, 20)
+    assert counts.sum() == 500
+    expected = np.histogram2d(df["x"], df["y"], bins=(edges_x, edges_y))[0]
+    np.testing.assert_array_equal(counts, expected)
+
+    fig, caption = charts.scatter_figure("x", "y", points, density)
+    assert caption.startswith("500 punktów")
+    # Do przeglądarki trafia siatka, nie punkty
+    assert np.asarray(fig.data[0].z).shape == (20, 20)
+
+
+def test_bar_figure_keeps_largest():
+    df = pd.DataFrame({"kat": list("abcdef"), "v": [1, -9, 3, 8, 2, 7]})
+    fig, caption = charts.bar_figure(df, "kat", "v", max_bars=3)
+    assert caption == "Pokazano 3 z 6 kategorii (największe wartości)"
+    # Największe co do modułu, w dotychczasowej kolejności
+    assert list(fig.data[0].x) == ["b", "d", "f"]
+
+    fig, caption = charts.bar_figure(df, "kat", "v")
+    assert caption is None
+    assert len(fig.data[0].x) == 6
@@ -0,0 +1,68 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import column_profile
+import data
+
+CSV = (
+    "miasto,temp,opady\n"
+    "Kraków,12.5,3\n"
+    "Gdańsk,9.0,\n"
+    "Kraków,14.25,1\n"
+    ",11.0,7\n"
+    "Poznań,13.5,0\n"
+)
+
+
+def original():
+    return pd.read_csv(io.StringIO(CSV))
+
+
+def test_describe_roundtrip():
+    df = original()
+    profile = column_profile.loads(column_profile.dumps(column_profile.build_profile(df)))
+    pd.testing.assert_frame_equal(column_profile.describe_frame(profile), df.describe())
+
+
+def test_column_stats():
+    df = original()
+    profile = column_profile.build_profile(df)
+    assert profile["rows"] == 5
+    assert column_profile.columns_of_kind(profile, "number") == ["temp", "opady"]
+    assert column_profile.columns_of_kind(profile, "object") == ["miasto"]
+
+    city = column_profile.column_stats(profile, "miasto")
+    assert (city["count"], city["nulls"], city["distinct"]) == (4, 1, 3)
+    assert city["top"][0] == ["Kraków", 2]
+    assert "min" not in city
+
+    rain = column_profile.column_stats(profile, "opady")
+    assert (rain["min"], rain["max"], rain["nulls"]) == (0.0, 7.0, 1)
+    assert rain["quantiles"]["0.5"] == df["opady"].quantile(0.5)
+
+    with pytest.raises(KeyError):
+        column_profile.column_stats(profile, "brak")
+
+
+def test_values_truncated(monkeypatch):
+    monkeypatch.setattr(column_profile, "MAX_VALUES", 3)
+    profile = column_profile.build_profile(pd.DataFrame({"x": ["a", "b", "c", "d"]}))
+    stats = column_profile.column_stats(profile, "x")
+    assert stats["values"] == ["a", "b", "c"]
+    assert stats["values_truncated"]
+
+
+def test_profile_stored_at_upload(user):
+    assert data.save_file(user, "pogoda.csv", CSV.encode())[0]
+    file_id = data.get_user_files(user)[0][0]
+    profile = data.get_file_profile_shared(file_id, user)
+    assert profile is not None
+    df = original()
+    assert profile["rows"] == len(df)
+    np.testing.assert_allclose(column_profile.describe_frame(profile).to_numpy(), df.describe().to_numpy())
+    # Cudzy plik nie zdradza profilu
+    data.register_user("ola", "haslo")
+    assert data.get_file_profile_shared(file_id, data.login_user("ola", "haslo")) is None
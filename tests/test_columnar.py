@@ -0,0 +1,49 @@
+import io
+
+import pandas as pd
+
+import columnar
+import data
+from db import connection
+
+CSV = b"id,nazwa,kwota,data\n1,a,1.5,2024-01-01\n2,b,,2024-01-02\n3,,3.25,2024-01-03\n"
+
+
+def test_roundtrip_keeps_read_csv_types():
+    frame = pd.read_csv(io.BytesIO(CSV))
+    restored = columnar.read_columnar(columnar.to_columnar(frame))
+    # Brak tekstu wraca jako None, a nie NaN - porównujemy maski braków osobno
+    assert restored.dtypes.equals(frame.dtypes)
+    assert restored.isna().equals(frame.isna())
+    assert restored.fillna(0).equals(frame.fillna(0))
+
+
+def test_iter_columnar_in_chunks():
+    frame = pd.DataFrame({"v": range(10), "w": list("abcdefghij")})
+    parts = list(columnar.iter_columnar(io.BytesIO(columnar.to_columnar(frame)), 4, columns=["v"]))
+    assert [len(part) for part in parts] == [4, 4, 2]
+    assert pd.concat(parts, ignore_index=True).equals(frame[["v"]])
+
+
+def test_saved_file_has_columnar_copy(user):
+    data.save_file(user, "a.csv", CSV)
+    file_id = data.get_user_files(user)[0][0]
+    with connection() as conn:
+        fmt = conn.execute("SELECT format FROM file_columnar WHERE file_id = ?", (file_id,)).fetchone()[0]
+    assert fmt == columnar.FORMAT
+    assert data.get_file_storage_shared(file_id, user) == (len(CSV), True)
+
+
+def test_load_only_requested_columns(user):
+    data.save_file(user, "a.csv", CSV)
+    file_id = data.get_user_files(user)[0][0]
+    frame = data.load_file_dataframe(file_id, user, ["kwota", "id", "kwota"])
+    assert sorted(frame.columns) == ["id", "kwota"]
+    assert frame["kwota"].isna().tolist() == [False, True, False]
+    # Bez kopii kolumnowej ten sam wynik daje CSV
+    with connection() as conn:
+        conn.execute("DELETE FROM file_columnar")
+    data.query_cache.clear()
+    data.frame_cache.clear()
+    from_csv = data.load_file_dataframe(file_id, user, ["id", "kwota"])
+    pd.testing.assert_frame_equal(from_csv[frame.columns], frame)
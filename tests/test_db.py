@@ -0,0 +1,46 @@
+import pytest
+
+import db
+
+
+def test_connection_pragmas(database):
+    with db.connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == db.BUSY_TIMEOUT_MS
+
+
+def test_pool_reuses_connections(database):
+    with db.connection() as first:
+        pass
+    with db.connection() as second:
+        assert second is first
+
+
+def test_pool_timeout(tmp_path):
+    pool = db.ConnectionPool(str(tmp_path / "pool.db"), size=1, timeout=0.1)
+    conn = pool.acquire()
+    try:
+        with pytest.raises(db.PoolTimeout):
+            pool.acquire()
+    finally:
+        pool.release(conn)
+        pool.close()
+
+
+def test_transaction_rolls_back_on_error(database):
+    with pytest.raises(RuntimeError):
+        with db.transaction() as conn:
+            conn.execute("INSERT INTO users (username, password) VALUES ('ala', 'x')")
+            raise RuntimeError
+    with db.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 0
+
+
+def test_release_rolls_back_open_transaction(database):
+    with db.connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("INSERT INTO users (username, password) VALUES ('ala', 'x')")
+    with db.connection() as conn:
+        assert not conn.in_transaction
+        assert conn.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 0
@@ -0,0 +1,81 @@
+import gzip
+import io
+import re
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import analysis
+import data
+import export
+import file_tables
+import filters
+
+CSV = b"grupa,wartosc\n" + b"".join(b"%s,%d\n" % (b"ab"[i % 2:i % 2 + 1], i) for i in range(250))
+
+
+@pytest.mark.skipif(export.EXCEL_ENGINE is None, reason="brak xlsxwriter i openpyxl")
+def test_excel_splits_rows_into_sheets(monkeypatch):
+    monkeypatch.setattr(export, "EXCEL_MAX_ROWS", 5)
+    frame = pd.DataFrame({"id": range(11)})
+    payload = export.build(frame, None, "xlsx")
+
+    with zipfile.ZipFile(io.BytesIO(payload)) as workbook:
+        names = re.findall(r'<sheet name="([^"]+)"', workbook.read("xl/workbook.xml").decode())
+        rows = [len(re.findall(r"<row ", workbook.read(f"xl/worksheets/sheet{i}.xml").decode()))
+                for i in range(1, len(names) + 1)]
+    # Każdy arkusz: nagłówek i najwyżej EXCEL_MAX_ROWS - 1 wierszy danych
+    assert names == ["dane_1", "dane_2", "dane_3"]
+    assert rows == [5, 5, 4]
+
+
+def test_csv_roundtrip():
+    frame = pd.DataFrame({"a": [1, 2, 3], "b": ["x", "y", np.nan]})
+    payload = export.build(frame, None, "csv")
+    pd.testing.assert_frame_equal(pd.read_csv(io.BytesIO(payload)), frame)
+
+
+def read(payload, fmt):
+    if fmt == "csv.gz":
+        return pd.read_csv(io.BytesIO(gzip.decompress(payload)))
+    if fmt == "parquet":
+        return pd.read_parquet(io.BytesIO(payload))
+    return pd.read_csv(io.BytesIO(payload))
+
+
+@pytest.mark.parametrize("fmt", ["csv", "csv.gz", "parquet"])
+def test_filtered_export_in_chunks(user, monkeypatch, fmt):
+    # Plik czytany kawałkami: eksport składa wynik z wielu kawałków
+    monkeypatch.setattr(file_tables, "ENABLED", False)
+    monkeypatch.setattr(export, "CHUNK_ROWS", 40)
+    assert data.save_file(user, "dane.csv", CSV)[0]
+    file_id = data.get_user_files(user)[0][0]
+    where = filters.build_filter([filters.isin("grupa", ["a"]), filters.between("wartosc", 10, 200)])
+    source = analysis.ChunkedSource(file_id, user, chunk_rows=40)
+
+    got = read(export.build(source, where, fmt), fmt)
+    expected = pd.read_csv(io.BytesIO(CSV))
+    expected = expected[(expected["grupa"] == "a") & expected["wartosc"].between(10, 200)]
+    pd.testing.assert_frame_equal(got, expected.reset_index(drop=True), check_dtype=False)
+
+
+def test_empty_result_keeps_header():
+    frame = pd.DataFrame({"a": [1, 2]})
+    payload = export.build(frame, filters.build_filter([filters.between("a", 5, 6)]), "csv")
+    assert payload.decode().strip() == "a"
+
+
+def test_cached_skips_failed_builds(monkeypatch):
+    monkeypatch.setattr(export, "export_cache", export.ExportCache())
+    calls = []
+
+    def builder():
+        calls.append(1)
+        return None if len(calls) == 1 else b"plik"
+    assert export.cached("hash", None, "csv", builder) is None
+    assert export.cached("hash", None, "csv", builder) == b"plik"
+    assert export.cached("hash", None, "csv", builder) == b"plik"
+    assert len(calls) == 2
+    assert export.file_name("dane", "csv.gz") == "dane.csv.gz"
@@ -0,0 +1,75 @@
+import time
+
+import pandas as pd
+import pytest
+
+import data
+import db
+import file_tables
+import filters
+
+pytestmark = pytest.mark.skipif(file_tables.duckdb is None, reason="brak duckdb")
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(file_tables, "ENABLED", True)
+
+
+def duckdb_tables():
+    return sorted(row[0] for row in file_tables._query(
+        "SELECT table_name FROM information_schema.tables WHERE table_name LIKE 'file_rows_%'", []))
+
+
+def upload(user, csv, name="dane.csv"):
+    assert data.save_file(user, name, csv.encode())[0]
+    return next(row[0] for row in data.get_user_files(user) if row[1] == name)
+
+
+def test_upload_creates_table(user, enabled):
+    # Nazwy kolumn różniące się tylko wielkością liter
+    file_id = upload(user, "A,a,tekst\n1,2,x\n3,,y\n5,6,x\n")
+    table = data.get_file_table_shared(file_id, user)
+    assert table.columns == ["A", "a", "tekst"]
+    assert duckdb_tables() == [file_tables.table_name(file_id)]
+
+    where = filters.build_filter([filters.isin("tekst", ["x"])])
+    assert list(file_tables.value_counts(table, "tekst").items()) == [("x", 2), ("y", 1)]
+    grouped = file_tables.groupby_agg(table, "tekst", "a", "sum", where)
+    assert grouped.to_dict("list") == {"tekst": ["x"], "a": [8.0]}
+    window = file_tables.window(table, 1, 2, sort_col="a", ascending=False)
+    assert list(window.index) == [0, 1]
+
+
+def test_delete_file_drops_table(user, enabled):
+    file_id = upload(user, "x\n1\n2\n")
+    assert data.delete_file(file_id, user)
+    assert duckdb_tables() == []
+    with db.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM file_tables").fetchone()[0] == 0
+
+
+def test_discard_drops_staging(database, enabled):
+    prepared = file_tables.prepare(pd.DataFrame({"x": [1, 2]}))
+    assert duckdb_tables() == [prepared[0]]
+    file_tables.discard(prepared)
+    assert duckdb_tables() == []
+
+
+def test_cleanup_drops_orphans_and_old_staging(user, enabled):
+    file_id = upload(user, "x\n1\n2\n")
+    fresh = file_tables.prepare(pd.DataFrame({"x": [1]}))
+    stale = f"{file_tables.STAGING_PREFIX}{int(time.time()) - 2 * file_tables.STAGING_MAX_AGE}_stary"
+    orphan = file_tables.table_name(file_id + 100)
+    file_tables._execute(f"CREATE TABLE {stale} AS SELECT 1 AS c0", f"CREATE TABLE {orphan} AS SELECT 1 AS c0")
+
+    assert file_tables.cleanup() == 2
+    # Zostaje tabela z wierszem w rejestrze i świeża tabela robocza (trwający zapis)
+    assert duckdb_tables() == sorted([file_tables.table_name(file_id), fresh[0]])
+
+
+def test_disabled_falls_back_to_chunks(user, monkeypatch):
+    monkeypatch.setattr(file_tables, "ENABLED", False)
+    file_id = upload(user, "x\n1\n2\n")
+    assert data.get_file_table_shared(file_id, user) is None
+    assert file_tables.cleanup() == 0
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import filters
+
+FRAME = pd.DataFrame({
+    "kolor": ["czerwony", "zielony", "niebieski", "zielony", None, "czerwony", "zielony", "niebieski", "czerwony"],
+    "cena": [5.0, 12.0, 7.5, 20.0, 3.0, None, 9.0, 15.0, 10.0],
+})
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = filters.MaskCache()
+    monkeypatch.setattr(filters, "mask_cache", cache)
+    return cache
+
+
+def test_no_predicates():
+    assert filters.build_filter([]) is None
+    assert filters.from_spec(None) is None
+
+
+@pytest.mark.parametrize("mode", ["and", "or"])
+def test_combined_filter_matches_pandas(mode):
+    color = FRAME["kolor"].isin(["zielony", "czerwony"])
+    price = (FRAME["cena"] >= 6) & (FRAME["cena"] <= 12)
+    expected = (color & price) if mode == "and" else (color | price)
+    where = filters.build_filter([filters.isin("kolor", ["zielony", "czerwony"]), filters.between("cena", 6, 12)],
+                                 mode)
+    np.testing.assert_array_equal(where(FRAME), expected.to_numpy())
+    assert where.columns == ["kolor", "cena"]
+
+
+def test_nested_spec():
+    spec = ("or", (filters.isin("kolor", ["niebieski"]),
+                   ("and", (filters.between("cena", 0, 6), filters.isin("kolor", ["czerwony"])))))
+    where = filters.from_spec(spec)
+    assert list(np.flatnonzero(where(FRAME))) == [0, 2, 7]
+    assert where.columns == ["kolor", "cena"]
+
+
+def test_masks_are_cached_per_condition(cache):
+    color = filters.isin("kolor", ["zielony"])
+    where = filters.build_filter([color, filters.between("cena", 6, 12)], cache_key=(1, "hash"))
+    first = where(FRAME)
+    assert cache.stats()["misses"] == 2
+    # Zmiana jednego warunku liczy tylko jego maskę
+    other = filters.build_filter([color, filters.between("cena", 0, 6)], cache_key=(1, "hash"))
+    other(FRAME)
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 3, 3)
+    np.testing.assert_array_equal(where(FRAME), first)
+
+
+def test_chunks_are_not_cached(cache):
+    filters.build_filter([filters.isin("kolor", ["zielony"])])(FRAME)
+    assert cache.stats()["entries"] == 0
+
+
+def test_invalidate_and_budget():
+    cache = filters.MaskCache(max_bytes=4)
+    for i in range(3):
+        cache.put((i, "hash", ("in", "x", ())), np.zeros(2, dtype=np.uint8))
+    # Budżet 4 bajty: najstarsza maska wypada
+    assert cache.get((0, "hash", ("in", "x", ()))) is None
+    assert cache.stats()["bytes"] == 4
+    cache.invalidate(1)
+    assert cache.stats()["entries"] == 1
@@ -0,0 +1,52 @@
+import pandas as pd
+
+import data
+from frame_cache import FrameCache, frame_cache
+
+CSV = b"a,b,c\n1,x,0.5\n2,y,1.5\n3,x,2.5\n"
+
+
+def counters():
+    stats = frame_cache.stats()
+    return stats["hits"], stats["misses"]
+
+
+def test_lru_eviction():
+    cache = FrameCache(max_bytes=8_000)
+    frames = [pd.DataFrame({"v": range(400)}) for _ in range(3)]
+    for file_id, frame in enumerate(frames):
+        cache.put(file_id, "h", frame)
+    assert cache.get(0, "h") is None
+    assert cache.get(2, "h") is frames[2]
+    assert cache.stats()["evictions"] >= 1
+
+
+def test_projected_load_counts_one_lookup(user):
+    data.save_file(user, "a.csv", CSV)
+    file_id = data.get_user_files(user)[0][0]
+    hits, misses = counters()
+
+    frame = data.load_file_dataframe(file_id, user, ["a"])
+    assert list(frame.columns) == ["a"]
+    # Sprawdzenie całej ramki nie jest chybieniem: jedno chybienie (wariant)
+    assert counters() == (hits, misses + 1)
+    assert data.load_file_dataframe(file_id, user, ["a"]) is frame
+    assert counters() == (hits + 1, misses + 1)
+
+
+def test_projected_load_uses_cached_full_frame(user):
+    data.save_file(user, "a.csv", CSV)
+    file_id = data.get_user_files(user)[0][0]
+    full = data.load_file_dataframe(file_id, user)
+    hits, misses = counters()
+    assert data.load_file_dataframe(file_id, user, ["b", "a"]) is full
+    assert counters() == (hits + 1, misses)
+
+
+def test_delete_invalidates(user):
+    data.save_file(user, "a.csv", CSV)
+    file_id = data.get_user_files(user)[0][0]
+    data.load_file_dataframe(file_id, user)
+    assert frame_cache.stats()["entries"] == 1
+    data.delete_file(file_id, user)
+    assert frame_cache.stats()["entries"] == 0
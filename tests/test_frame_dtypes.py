@@ -0,0 +1,52 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+import column_profile
+import data
+import frame_dtypes
+
+CSV = "male,duze,ulamek,dokladny,kolor,opis\n" + "".join(
+    f"{i % 100},{i * 100_000},{i / 4},{i / 3},{['b', 'a', 'c'][i % 3]},wiersz {i}\n" for i in range(60))
+
+
+def original():
+    return pd.read_csv(io.StringIO(CSV))
+
+
+def test_plan_from_profile():
+    dtypes = frame_dtypes.plan(column_profile.build_profile(original()))
+    assert dtypes == {"male": "int8", "duze": "int32", "ulamek": "float32", "dokladny": "float32",
+                      "kolor": "category"}
+
+
+def test_plan_disabled(monkeypatch):
+    monkeypatch.setattr(frame_dtypes, "OPTIMIZE", False)
+    assert frame_dtypes.plan(column_profile.build_profile(original())) == {}
+    assert frame_dtypes.plan(None) == {}
+
+
+def test_finish_keeps_values():
+    df = original()
+    dtypes = frame_dtypes.plan(column_profile.build_profile(df))
+    narrow = frame_dtypes.finish(df.astype({"kolor": "category"}), dtypes)
+    # float32 tylko bez utraty dokładności (i/3 nie da się zapisać dokładnie)
+    assert narrow["ulamek"].dtype == "float32"
+    assert narrow["dokladny"].dtype == "float64"
+    assert list(narrow["kolor"].cat.categories) == ["a", "b", "c"]
+
+
+def test_loaded_frame_is_smaller_and_equal(user):
+    assert data.save_file(user, "dane.csv", CSV.encode())[0]
+    file_id = data.get_user_files(user)[0][0]
+    df = data.load_file_dataframe(file_id, user)
+    expected = original()
+    assert str(df["male"].dtype) == "int8"
+    assert isinstance(df["kolor"].dtype, pd.CategoricalDtype)
+    for col in expected.columns:
+        np.testing.assert_array_equal(df[col].astype(expected[col].dtype).to_numpy(), expected[col].to_numpy())
+    assert df.memory_usage(deep=True).sum() < expected.memory_usage(deep=True).sum()
+    assert frame_dtypes.default_size(df) > df.memory_usage(deep=True).sum()
+    # groupby po kategorii w tej samej kolejności co po tekście
+    assert list(df.groupby("kolor", observed=True).size().index) == sorted(expected["kolor"].unique())
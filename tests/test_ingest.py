@@ -0,0 +1,63 @@
+import io
+import threading
+import time
+
+import data
+import ingest
+
+CSV = b"a,b\n1,2\n3,4\n"
+
+
+def wait(job_id, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = ingest.get_job(job_id)
+        if job.finished:
+            return job
+        time.sleep(0.01)
+    raise AssertionError("zadanie nie skończyło się na czas")
+
+
+def test_upload_in_background(user):
+    job = wait(ingest.submit_upload(user, "dane.csv", io.BytesIO(CSV)))
+    assert job.status == ingest.DONE
+    assert job.progress == 1.0
+    assert [row[1] for row in data.get_user_files(user)] == ["dane.csv"]
+
+
+def test_failed_upload(user, monkeypatch):
+    def broken(*args, **kwargs):
+        raise ValueError("zepsuty plik")
+    monkeypatch.setattr(ingest, "save_file", broken)
+    job = wait(ingest.submit_upload(user, "zly.csv", io.BytesIO(CSV)))
+    assert job.status == ingest.FAILED
+    assert "zepsuty plik" in job.message
+
+
+def test_same_file_while_running_reuses_job(user, monkeypatch):
+    release = threading.Event()
+
+    def slow(*args, **kwargs):
+        release.wait(10)
+        return True, "ok"
+    monkeypatch.setattr(ingest, "save_file", slow)
+    first = ingest.submit_upload(user, "dane.csv", io.BytesIO(CSV))
+    try:
+        assert ingest.submit_upload(user, "dane.csv", io.BytesIO(CSV)) == first
+        assert ingest.submit_upload(user, "inne.csv", io.BytesIO(CSV)) != first
+    finally:
+        release.set()
+    assert wait(first).status == ingest.DONE
+    # Po zakończeniu ponowne wysłanie to nowe zadanie
+    assert ingest.submit_upload(user, "dane.csv", io.BytesIO(CSV)) != first
+
+
+def test_finished_jobs_are_pruned(user, monkeypatch):
+    monkeypatch.setattr(ingest, "MAX_FINISHED_JOBS", 2)
+    monkeypatch.setattr(ingest, "save_file", lambda *args, **kwargs: (True, "ok"))
+    job_ids = []
+    for i in range(4):
+        job_ids.append(wait(ingest.submit_upload(user, f"plik{i}.csv", io.BytesIO(CSV))).id)
+        time.sleep(0.01)
+    # Zostają dwa ostatnie zakończone i bieżące
+    assert [ingest.get_job(job_id) is not None for job_id in job_ids] == [False, True, True, True]
@@ -0,0 +1,78 @@
+import hashlib
+import sqlite3
+
+import pytest
+
+import migrations
+
+
+def migrated(path):
+    conn = sqlite3.connect(path, isolation_level=None)
+    migrations.migrate(conn)
+    return conn
+
+
+@pytest.fixture(scope="module")
+def fresh(tmp_path_factory):
+    conn = migrated(str(tmp_path_factory.mktemp("plans") / "notes.db"))
+    yield conn
+    conn.close()
+
+
+def test_query_plans_use_indexes(fresh):
+    assert migrations.schema_version(fresh) == migrations.SCHEMA_VERSION
+    assert migrations.check_query_plans(fresh) == []
+
+
+@pytest.mark.parametrize("name, sql, params, index", migrations.PLAN_CHECKS,
+                         ids=[check[0] for check in migrations.PLAN_CHECKS])
+def test_query_plan(fresh, name, sql, params, index):
+    plan = " | ".join(row[3] for row in fresh.execute("EXPLAIN QUERY PLAN " + sql, params))
+    assert index in plan
+    # Żadne z tych zapytań nie przegląda całej tabeli
+    assert "SCAN" not in plan.replace("SCAN CONSTANT ROW", "")
+
+
+def test_migrate_is_idempotent(tmp_path):
+    conn = migrated(str(tmp_path / "notes.db"))
+    try:
+        assert migrations.migrate(conn) == []
+    finally:
+        conn.close()
+
+
+def test_upgrade_from_schema_before_migrations(tmp_path):
+    # Baza sprzed migracji: zawartość plików w files.file_data, bez indeksów i kaskad
+    conn = sqlite3.connect(str(tmp_path / "old.db"), isolation_level=None)
+    conn.executescript("""
+        CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE NOT NULL,
+                            password TEXT NOT NULL);
+        CREATE TABLE notes (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, content TEXT NOT NULL,
+                            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP);
+        CREATE TABLE files (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL,
+                            filename TEXT NOT NULL, file_data BLOB NOT NULL,
+                            upload_date DATETIME DEFAULT CURRENT_TIMESTAMP);
+        INSERT INTO users (username, password) VALUES ('ala', 'x');
+        INSERT INTO notes (user_id, content) VALUES (1, 'pierwsza notatka');
+        -- sierota: notatka usuniętego użytkownika
+        INSERT INTO notes (user_id, content) VALUES (2, 'bez właściciela');
+    """)
+    payloads = [b"a,b\n1,2\n", b"x\n" * 100_000, b"a,b\n1,2\n"]
+    for i, payload in enumerate(payloads):
+        conn.execute("INSERT INTO files (user_id, filename, file_data) VALUES (1, ?, ?)", (f"f{i}.csv", payload))
+    try:
+        applied = migrations.migrate(conn)
+        # Stara baza bez auto_vacuum przechodzi też VACUUM
+        assert applied == [migration.__name__ for migration in migrations.MIGRATIONS] + ["auto_vacuum"]
+        assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == migrations.AUTO_VACUUM_INCREMENTAL
+        assert migrations.schema_version(conn) == migrations.SCHEMA_VERSION
+        assert migrations.check_query_plans(conn) == []
+
+        hashes = conn.execute("SELECT id, content_hash FROM files ORDER BY id").fetchall()
+        assert hashes == [(i + 1, hashlib.sha256(payload).hexdigest()) for i, payload in enumerate(payloads)]
+        # Ta sama zawartość jest zapisana raz, z licznikiem odwołań
+        assert conn.execute("SELECT COUNT(*), SUM(ref_count) FROM blobs").fetchone() == (2, 3)
+        assert conn.execute("SELECT content FROM notes").fetchall() == [("pierwsza notatka",)]
+        assert conn.execute("PRAGMA foreign_key_check").fetchall() == []
+    finally:
+        conn.close()
@@ -0,0 +1,57 @@
+import pytest
+
+import data
+from db import transaction
+
+CSV = b"kategoria,wartosc\na,1\nb,2\na,3\n"
+
+
+def all_pages(fetch):
+    rows, cursor = fetch(None)
+    pages = [rows]
+    while cursor is not None:
+        rows, cursor = fetch(cursor)
+        pages.append(rows)
+    return pages
+
+
+@pytest.mark.parametrize("order", ["newest", "oldest", "alpha"])
+def test_notes_pages_with_ties(user, order):
+    for i in range(11):
+        data.add_note(user, "Ta sama treść" if i % 2 else "ta sama treść")
+    with transaction() as conn:
+        conn.execute("UPDATE notes SET timestamp = '2024-01-01 12:00:00'")
+
+    pages = all_pages(lambda after: data.get_notes_page(user, order, after, limit=3))
+    ids = [row[0] for page in pages for row in page]
+    assert [len(page) for page in pages] == [3, 3, 3, 2]
+    # Remisy rozstrzyga id: każda notatka raz, w kolejności klucza
+    assert ids == sorted(ids, reverse=(order == "newest"))
+    assert sorted(ids) == sorted(row[0] for row in data.get_notes(user))
+
+
+def test_file_pages_with_ties(user):
+    for i in range(7):
+        assert data.save_file(user, f"plik{i}.csv", CSV)[0]
+    with transaction() as conn:
+        conn.execute("UPDATE files SET upload_date = '2024-01-01 12:00:00'")
+
+    pages = all_pages(lambda after: data.get_user_files_page(user, after, limit=2))
+    ids = [row[0] for page in pages for row in page]
+    assert ids == sorted(ids, reverse=True) and len(ids) == 7
+
+
+def test_shared_file_pages_with_ties(user):
+    data.register_user("ola", "haslo")
+    target = data.login_user("ola", "haslo")
+    for i in range(5):
+        data.save_file(user, f"plik{i}.csv", CSV)
+    # Udostępnienia w kolejności id plików: id udostępnienia rośnie razem z id pliku
+    for file_id in sorted(row[0] for row in data.get_user_files(user)):
+        assert data.share_file_with_user(file_id, user, "ola")[0]
+    with transaction() as conn:
+        conn.execute("UPDATE shared_files SET share_date = '2024-01-01 12:00:00'")
+
+    pages = all_pages(lambda after: data.get_shared_files_page(target, after, limit=2))
+    file_ids = [row[0] for page in pages for row in page]
+    assert file_ids == sorted(file_ids, reverse=True) and len(file_ids) == 5
@@ -0,0 +1,44 @@
+import pytest
+
+import analysis
+import analysis_tasks
+import data
+
+
+@pytest.mark.parametrize("sort_col", [None, "liczba", "grupa", "pomiar"])
+@pytest.mark.parametrize("ascending", [True, False])
+@pytest.mark.parametrize("deep", [False, True])
+def test_preview_window(sources, monkeypatch, sort_col, ascending, deep):
+    frame, chunked = sources
+    if deep:
+        # Głębokie strony: wyszukiwanie po kluczu sortowania, z zawężaniem przedziału
+        monkeypatch.setattr(analysis, "PREVIEW_SORT_ROWS", 0)
+        monkeypatch.setattr(analysis, "MAX_CANDIDATES", 50)
+        monkeypatch.setattr(analysis, "SEEK_SAMPLE", 64)
+    for offset in (0, 95, 480, 900, 990, 1000):
+        expected = analysis.preview_window(frame, offset, 40, sort_col, ascending)
+        got = analysis.preview_window(chunked, offset, 40, sort_col, ascending)
+        assert list(got.index) == list(expected.index)
+        assert list(got["id"]) == list(expected["id"])
+
+
+def test_sorted_page_matches_pandas(user):
+    assert data.save_file(user, "dane.csv", b"k,v\n3,a\n1,b\n,c\n2,d\n1,e\n")[0]
+    file_id = data.get_user_files(user)[0][0]
+    page = analysis_tasks.preview(file_id, user, 1, 3, "k", True)
+    # Remisy w kolejności pliku, puste na końcu; indeks to numer wiersza w pliku
+    assert list(page.index) == [4, 3, 0]
+    page = analysis_tasks.preview(file_id, user, 3, 10, "k", False)
+    assert list(page.index) == [4, 2]
+
+
+def test_sort_order_is_cached(user, monkeypatch):
+    monkeypatch.setattr(analysis, "sort_cache", analysis.SortCache())
+    assert data.save_file(user, "dane.csv", b"k\n3\n1\n2\n")[0]
+    file_id = data.get_user_files(user)[0][0]
+    for offset in (0, 1):
+        analysis_tasks.preview(file_id, user, offset, 1, "k", True)
+    assert len(analysis.sort_cache._entries) == 1
+    # Inny kierunek sortowania to osobna kolejność
+    analysis_tasks.preview(file_id, user, 0, 1, "k", False)
+    assert len(analysis.sort_cache._entries) == 2
@@ -0,0 +1,84 @@
+import data
+import query_cache
+from query_cache import QueryCache
+
+CSV = b"a,b\n1,2\n"
+
+
+# -------------------------------
+# QueryCache
+# -------------------------------
+def test_invalidate_drops_tagged_entries():
+    cache = QueryCache()
+    for key, tag in (("a", ("notes", 1)), ("b", ("notes", 2))):
+        cache.put(key, key.upper(), (tag,), cache.generations((tag,)))
+    cache.invalidate(("notes", 1))
+    assert cache.get("a") == (False, None)
+    assert cache.get("b") == (True, "B")
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_result_computed_before_invalidation_is_not_stored():
+    cache = QueryCache()
+    tags = (("files", 1),)
+    generations = cache.generations(tags)
+    # Zapis zatwierdzony w trakcie zapytania
+    cache.invalidate(*tags)
+    cache.put("stary", [], tags, generations)
+    assert cache.get("stary") == (False, None)
+
+
+def test_ttl_and_max_entries():
+    cache = QueryCache(max_entries=2, ttl=60)
+    for key in "abc":
+        cache.put(key, key, (), ())
+    assert cache.get("a") == (False, None)
+    assert cache.stats()["entries"] == 2
+    cache.ttl = -1
+    assert cache.get("c") == (False, None)
+    # max_entries=0 wyłącza cache
+    disabled = QueryCache(max_entries=0)
+    disabled.put("a", 1, (), ())
+    assert disabled.get("a") == (False, None)
+
+
+# -------------------------------
+# Unieważnianie przez zapisy w data.py
+# -------------------------------
+def test_writes_invalidate_own_lists(user):
+    assert data.get_notes(user) == []
+    data.add_note(user, "pierwsza")
+    assert [note[1] for note in data.get_notes(user)] == ["pierwsza"]
+    note_id = data.get_notes(user)[0][0]
+    data.edit_note(note_id, user, "poprawiona")
+    assert [note[1] for note in data.get_notes(user)] == ["poprawiona"]
+
+    assert data.get_user_files(user) == []
+    data.save_file(user, "a.csv", CSV)
+    file_id = data.get_user_files(user)[0][0]
+    data.rename_file(file_id, user, "b.csv")
+    assert [row[1] for row in data.get_user_files(user)] == ["b.csv"]
+
+
+def test_writes_invalidate_recipients(user):
+    data.register_user("ola", "haslo")
+    other = data.login_user("ola", "haslo")
+    data.save_file(user, "a.csv", CSV)
+    file_id = data.get_user_files(user)[0][0]
+    data.add_note(user, "notatka")
+    note_id = data.get_notes(user)[0][0]
+    assert data.get_shared_files(other) == [] and data.get_shared_notes(other) == []
+
+    data.share_file_with_user(file_id, user, "ola")
+    data.share_note_with_user(note_id, user, "ola")
+    assert len(data.get_shared_files(other)) == 1
+    assert data.get_file_hash_shared(file_id, other) is not None
+    assert len(data.get_shared_notes(other)) == 1
+
+    # Usunięcie u właściciela znika też z list odbiorcy
+    assert data.delete_file(file_id, user)
+    data.delete_note(note_id, user)
+    assert data.get_shared_files(other) == []
+    assert data.get_file_hash_shared(file_id, other) is None
+    assert data.get_shared_notes(other) == []
+    assert query_cache.query_cache.stats()["hits"] > 0
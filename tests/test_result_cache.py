@@ -0,0 +1,88 @@
+import os
+
+import pytest
+
+import analysis_tasks
+import data
+from result_cache import ResultCache
+
+CSV = b"grupa,wartosc\na,1\nb,2\na,3\nc,4\n"
+
+
+def test_memory_level_returns_copies():
+    cache = ResultCache(max_bytes=10_000)
+    value = {"liczności": [1, 2, 3]}
+    cache.put("klucz", value)
+    found, cached = cache.get("klucz")
+    assert found and cached == value
+    cached["liczności"].append(4)
+    assert cache.get("klucz")[1] == value
+    assert cache.get("brak") == (False, None)
+    # Wyniku, którego nie da się zapisać, po prostu nie ma w cache
+    cache.put("lambda", lambda: None)
+    assert cache.get("lambda") == (False, None)
+
+
+def test_memory_budget():
+    cache = ResultCache(max_bytes=300)
+    for key in range(3):
+        cache.put(key, bytes(100))
+    assert cache.get(0) == (False, None)
+    assert cache.get(2)[0]
+    assert cache.stats()["bytes"] <= 300
+
+
+def test_disk_level_survives_restart(tmp_path):
+    ResultCache(directory=str(tmp_path)).put(("hash", None, "histogram_chart"), [1, 2])
+    cache = ResultCache(directory=str(tmp_path))
+    assert cache.get(("hash", None, "histogram_chart")) == (True, [1, 2])
+    assert cache.stats()["disk_hits"] == 1
+    # Drugi odczyt już z pamięci
+    cache.get(("hash", None, "histogram_chart"))
+    assert cache.stats()["hits"] == 1
+
+
+def test_disk_eviction_keeps_recent_entries(tmp_path):
+    cache = ResultCache(directory=str(tmp_path), disk_max_bytes=2_500)
+    for key in range(5):
+        cache.put(key, bytes(1000))
+        os.utime(cache._path(key), (key, key))
+    files = os.listdir(tmp_path)
+    assert len(files) <= 2
+    assert os.path.basename(cache._path(4)) in files
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = ResultCache()
+    monkeypatch.setattr(analysis_tasks, "result_cache", cache)
+    return cache
+
+
+def test_shared_file_result_is_computed_once(user, cache):
+    data.register_user("ola", "haslo")
+    other = data.login_user("ola", "haslo")
+    data.save_file(user, "a.csv", CSV)
+    file_id = data.get_user_files(user)[0][0]
+    data.share_file_with_user(file_id, user, "ola")
+
+    first = analysis_tasks.submit(analysis_tasks.category_chart, file_id, user, None, "grupa").result()
+    assert cache.stats()["misses"] == 1
+    # Odbiorca pliku i ta sama zawartość pod inną nazwą trafiają w ten sam wpis
+    second = analysis_tasks.submit(analysis_tasks.category_chart, file_id, other, None, "grupa").result()
+    data.save_file(user, "kopia.csv", CSV)
+    copy_id = max(row[0] for row in data.get_user_files(user))
+    analysis_tasks.submit(analysis_tasks.category_chart, copy_id, user, None, "grupa").result()
+    assert cache.stats()["hits"] == 2
+    # Wykres wraca jako słownik specyfikacji (szybsze odtworzenie niż go.Figure z pickle)
+    assert second[0]["data"][0]["y"] == first[0].to_dict()["data"][0]["y"]
+
+    # Inny filtr to inny klucz
+    analysis_tasks.submit(analysis_tasks.category_chart, file_id, user, ("in", "grupa", ("a",)), "grupa").result()
+    assert cache.stats()["misses"] == 2
+
+
+def test_no_access_is_not_cached(user, cache):
+    data.save_file(user, "a.csv", CSV)
+    file_id = data.get_user_files(user)[0][0]
+    assert analysis_tasks._cache_key(analysis_tasks.category_chart, file_id, user + 1, (None, "grupa")) is None
@@ -0,0 +1,39 @@
+import data
+
+
+def ids(rows):
+    return sorted(row[0] for row in rows)
+
+
+def test_prefix_search_own_and_shared_notes(user):
+    data.register_user("ola", "haslo")
+    other = data.login_user("ola", "haslo")
+    data.add_note(user, "Zakupy: mleko i chleb")
+    data.add_note(user, "Spotkanie w poniedziałek")
+    data.add_note(other, "Mleko dla kota")
+    data.add_note(other, "Mleczarnia prywatna")
+    shared = [row[0] for row in data.get_notes(other) if row[1].startswith("Mleko")][0]
+    data.share_note_with_user(shared, other, "ala")
+
+    results = data.search_notes(user, "mle")
+    assert [row[1] for row in sorted(results, key=lambda row: row[0])] == [
+        "Zakupy: mleko i chleb", "Mleko dla kota"]
+    assert all("**" in row[5] for row in results)
+
+
+def test_search_follows_edits_and_deletes(user):
+    data.add_note(user, "stara treść")
+    note_id = data.get_notes(user)[0][0]
+    assert ids(data.search_notes(user, "stara")) == [note_id]
+
+    data.edit_note(note_id, user, "nowa treść")
+    assert data.search_notes(user, "stara") == []
+    assert ids(data.search_notes(user, "nowa")) == [note_id]
+    data.delete_note(note_id, user)
+    assert data.search_notes(user, "nowa") == []
+
+
+def test_operators_are_treated_as_text(user):
+    data.add_note(user, "plan NEAR rynku - wersja: 2")
+    assert len(data.search_notes(user, 'NEAR "wersja: 2')) == 1
+    assert data.search_notes(user, "  -:*  ") == []
@@ -0,0 +1,76 @@
+import json
+import logging
+import threading
+import time
+
+import pytest
+
+import timing
+
+pytestmark = pytest.mark.skipif(not timing.ENABLED, reason="TIMING=0")
+
+
+@timing.timed("sqlite")
+def query(seconds):
+    time.sleep(seconds)
+
+
+@timing.timed("analysis", "policz")
+def compute():
+    query(0.02)
+    time.sleep(0.02)
+
+
+def test_own_time_excludes_nested_measurements():
+    with timing.run("test", log=False) as run:
+        compute()
+        with timing.section("plotly", "wykres"):
+            time.sleep(0.01)
+    category, count, total, own = run.entries["policz"]
+    assert (category, count) == ("analysis", 1)
+    assert total >= 0.04 and 0.015 <= own < total
+    assert run.entries["query"][1] == 1
+    categories = run.categories()
+    # Czasy własne kategorii sumują się do czasu przebiegu
+    assert sum(categories.values()) == pytest.approx(run.duration)
+    assert categories["sqlite"] >= 0.02
+
+
+def test_nested_run_and_background_threads_are_not_measured():
+    with timing.run("skrypt", log=False) as outer:
+        with timing.run("fragment", log=False) as inner:
+            assert inner is None
+        thread = threading.Thread(target=query, args=(0,))
+        thread.start()
+        thread.join()
+    assert "query" not in outer.entries
+
+
+def test_absorb_moves_worker_time_out_of_open_measurement():
+    with timing.run("worker", log=False) as worker:
+        query(0.01)
+    with timing.run("skrypt", log=False) as run:
+        with timing.section("pool", "czekanie"):
+            time.sleep(0.02)
+            timing.absorb(worker.summary(), "zadanie.")
+    assert run.entries["zadanie.query"][0] == "sqlite"
+    assert run.entries["czekanie"][3] == pytest.approx(run.entries["czekanie"][2] - worker.entries["query"][3])
+
+
+def test_slow_runs_are_logged_as_warnings(monkeypatch, caplog):
+    monkeypatch.setattr(timing, "SLOW_MS", 0)
+    with caplog.at_level(logging.INFO, logger="timing"):
+        with timing.run("wolny"):
+            query(0)
+    record = caplog.records[-1]
+    assert record.levelno == logging.WARNING
+    summary = json.loads(record.getMessage().split(" ", 1)[1])
+    assert summary["run"] == "wolny"
+    assert "query" in timing.stats()
+
+
+def test_profile_and_memory_on_request():
+    with timing.run("profil", profile=True, trace_memory=True, log=False) as run:
+        [bytes(1000) for _ in range(100)]
+    assert "function calls" in run.profile
+    assert run.memory["peak"] > 0
@@ -0,0 +1,233 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+# -------------------------------
+# Pomiar czasu przebiegów strony (funkcje danych i sekcje analizy)
+# -------------------------------
+# Przebieg (run) to jedno wykonanie skryptu albo samodzielne przeliczenie
+# fragmentu. Funkcje danych (@timed) i sekcje skryptu (section) zapisują w
+# bieżącym przebiegu wątku liczbę wywołań, czas całkowity i czas własny (bez
+# zagnieżdżonych pomiarów), więc czasy własne kategorii (sqlite, blob,
+# read_csv, duckdb, cache, analysis, pool, plotly) sumują się najwyżej do
+# czasu przebiegu.
+# Poza przebiegiem (wątki w tle) pomiar nic nie robi. Podsumowanie przebiegu
+# trafia do logu jako JSON (logger "timing"; wolne przebiegi jako WARNING).
+# Na żądanie przebieg zbiera też profil cProfile i szczyt pamięci
+# (tracemalloc). TIMING=0 wyłącza pomiar: dekoratory zwracają niezmienione
+# funkcje, a sekcje są pustym kontekstem.
+ENABLED = os.environ.get("TIMING", "1") != "0"
+# Przebiegi dłuższe niż tyle ms logujemy jako WARNING (krótsze jako INFO)
+SLOW_MS = float(os.environ.get("TIMING_SLOW_MS", "1000"))
+# Ile funkcji pokazuje profil cProfile i ile miejsc alokacji tracemalloc
+PROFILE_LINES = 25
+TRACEMALLOC_LINES = 10
+
+logger = logging.getLogger("timing")
+
+_local = threading.local()
+# tracemalloc działa na cały proces - naraz mierzy go najwyżej jeden przebieg
+_tracemalloc_lock = threading.Lock()
+_totals = {}
+_totals_lock = threading.Lock()
+
+
+class Run:
+    def __init__(self, name, profile=False, trace_memory=False):
+        self.name = name
+        self.started = time.time()
+        self.duration = None
+        # nazwa -> [kategoria, liczba wywołań, czas całkowity, czas własny]
+        self.entries = {}
+        # Otwarte pomiary: [początek, czas zagnieżdżonych]
+        self._stack = []
+        self._start = time.perf_counter()
+        self.profile = None
+        self.memory = None
+        self._profiler = None
+        self._tracing = False
+        if profile:
+            self._profiler = cProfile.Profile()
+            try:
+                self._profiler.enable()
+            except ValueError:
+                # Inny profiler jest już aktywny (Python 3.12+: jeden na proces)
+                self._profiler = None
+                self.profile = "Profil niedostępny: działa inny profiler"
+        if trace_memory:
+            if _tracemalloc_lock.acquire(blocking=False):
+                self._tracing = not tracemalloc.is_tracing()
+                if self._tracing:
+                    tracemalloc.start()
+                else:
+                    _tracemalloc_lock.release()
+            if not self._tracing:
+                self.memory = {"error": "tracemalloc jest już używany"}
+
+    def enter(self):
+        self._stack.append([time.perf_counter(), 0.0])
+
+    def exit(self, name, category):
+        start, children = self._stack.pop()
+        elapsed = time.perf_counter() - start
+        self._add(name, category, 1, elapsed, elapsed - children)
+        if self._stack:
+            self._stack[-1][1] += elapsed
+
+    def _add(self, name, category, count, total, own):
+        entry = self.entries.get(name)
+        if entry is None:
+            self.entries[name] = [category, count, total, own]
+        else:
+            entry[1] += count
+            entry[2] += total
+            entry[3] += own
+
+    def absorb(self, summary, prefix=""):
+        # Dołącza pomiary z innego procesu (np. zadania w analysis_pool);
+        # ich czas przestaje być czasem własnym otwartego pomiaru
+        if not summary:
+            return
+        accounted = 0.0
+        for name, category, count, total, own in summary["entries"]:
+            self._add(prefix + name, category, count, total, own)
+            accounted += own
+        if self._stack:
+            self._stack[-1][1] += accounted
+
+    def finish(self):
+        self.duration = time.perf_counter() - self._start
+        if self._profiler is not None:
+            self._profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(self._profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_LINES)
+            self.profile = out.getvalue()
+            self._profiler = None
+        if self._tracing:
+            try:
+                current, peak = tracemalloc.get_traced_memory()
+                top = tracemalloc.take_snapshot().statistics("lineno")[:TRACEMALLOC_LINES]
+                self.memory = {"current": current, "peak": peak,
+                               "top": [(str(stat.traceback), stat.size, stat.count) for stat in top]}
+            finally:
+                tracemalloc.stop()
+                self._tracing = False
+                _tracemalloc_lock.release()
+
+    def categories(self):
+        # kategoria -> czas własny (s); "other" to czas poza pomiarami (np. budowanie widżetów)
+        totals = {}
+        for category, _, _, own in self.entries.values():
+            totals[category] = totals.get(category, 0.0) + own
+        totals["other"] = max(self.duration - sum(totals.values()), 0.0)
+        return totals
+
+    def summary(self):
+        # Słownik gotowy do JSON (log, przesłanie między procesami)
+        return {
+            "run": self.name,
+            "started": self.started,
+            "duration_ms": self.duration * 1000,
+            "categories_ms": {category: own * 1000 for category, own in self.categories().items()},
+            "entries": [(name, *entry) for name, entry in self.entries.items()],
+        }
+
+
+@contextmanager
+def run(name, profile=False, trace_memory=False, log=True):
+    # with timing.run("skrypt") as r: ... - r to Run albo None (pomiar
+    # wyłączony albo przebieg już trwa w tym wątku, np. fragment wykonywany
+    # w ramach przebiegu całego skryptu). log=False: bez wpisu w logu (np.
+    # zadanie w procesie roboczym - jego pomiary loguje przebieg skryptu)
+    if not ENABLED or getattr(_local, "run", None) is not None:
+        yield None
+        return
+    current_run = _local.run = Run(name, profile, trace_memory)
+    try:
+        yield current_run
+    finally:
+        _local.run = None
+        current_run.finish()
+        _merge_totals(current_run)
+        if log:
+            _log(current_run)
+
+
+class Section:
+    __slots__ = ("category", "name", "run")
+
+    def __init__(self, category, name):
+        self.category = category
+        self.name = name
+
+    def __enter__(self):
+        self.run = getattr(_local, "run", None)
+        if self.run is not None:
+            self.run.enter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.run is not None:
+            self.run.exit(self.name, self.category)
+        return False
+
+
+def section(category, name):
+    # with timing.section("plotly", "plotly_chart"): ...
+    return Section(category, name) if ENABLED else nullcontext()
+
+
+def timed(category, name=None):
+    # Dekorator funkcji danych; nad @cached, żeby liczyć też trafienia w cache
+    def decorate(func):
+        if not ENABLED:
+            return func
+        label = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            current = getattr(_local, "run", None)
+            if current is None:
+                return func(*args, **kwargs)
+            current.enter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                current.exit(label, category)
+        return wrapper
+    return decorate
+
+
+def absorb(summary, prefix=""):
+    current_run = getattr(_local, "run", None)
+    if current_run is not None:
+        current_run.absorb(summary, prefix)
+
+
+def _merge_totals(finished):
+    with _totals_lock:
+        for name, (category, count, total, own) in finished.entries.items():
+            entry = _totals.setdefault(name, [category, 0, 0.0, 0.0])
+            entry[1] += count
+            entry[2] += total
+            entry[3] += own
+
+
+def _log(finished):
+    level = logging.WARNING if finished.duration * 1000 > SLOW_MS else logging.INFO
+    if logger.isEnabledFor(level):
+        logger.log(level, "timing %s", json.dumps(finished.summary(), ensure_ascii=False))
+
+
+def stats():
+    # Sumy wszystkich przebiegów procesu: nazwa -> (kategoria, wywołania, czas całkowity, czas własny)
+    with _totals_lock:
+        return {name: tuple(entry) for name, entry in _totals.items()}